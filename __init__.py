@@ -2,37 +2,124 @@ import logging
 
 from .coordinator import InkbirdCoordinator
 
-from .inkbird_ble_custom import InkbirdIamT1Device
+from .inkbird_ble_custom import DEVICE_FIELD, InkbirdIamT1Device, READING
+from .inkbird_ble_custom.adaptive import InkbirdAdaptiveSampling
+from .inkbird_ble_custom.filters import HEARTBEAT, InkbirdReadingFilter
+from .inkbird_ble_custom.timeseries import InkbirdTimeSeries
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from .const import DOMAIN
+from .const import (
+    CONF_ADAPTIVE_SAMPLING,
+    CONF_CONNECTION_MODE,
+    CONF_DEADBAND,
+    CONF_HEARTBEAT,
+    CONF_MIN_INTERVAL,
+    CONNECTION_MODE_DUTY_CYCLE,
+    DATA_HUB,
+    DATA_SNAPSHOTS,
+    DOMAIN,
+    TIMESERIES_DIRECTORY,
+)
+from .hub import InkbirdHub
+from .services import async_setup_services
+from .snapshots import InkbirdSnapshots
+from .websocket_api import async_setup_websocket
 
-PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.SELECT]
+PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.SELECT, Platform.BUTTON]
 
 _LOGGER = logging.getLogger(DOMAIN)
 type InkbirdConfigEntry = ConfigEntry[InkbirdIamT1Device]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+def _reading_filter(options: dict) -> InkbirdReadingFilter | None:
+    """The filter configured in the options, None if every change is published."""
+    deadband = [options.get(f"{CONF_DEADBAND}_{reading.name.lower()}", 0) for reading in READING]
+    min_interval = [options.get(f"{CONF_MIN_INTERVAL}_{reading.name.lower()}", 0) for reading in READING]
+    if not any(deadband) and not any(min_interval):
+        return None
+    return InkbirdReadingFilter(deadband, min_interval, options.get(CONF_HEARTBEAT, HEARTBEAT))
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the INKBIRD services and load the last known state of the devices."""
+    async_setup_services(hass)
+    async_setup_websocket(hass)
+    snapshots = InkbirdSnapshots(hass)
+    await snapshots.async_load()
+    hass.data[DATA_SNAPSHOTS] = snapshots
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: InkbirdConfigEntry) -> bool:
     """Set up INKBIRD BLE device from a config entry."""
-    device: InkbirdIamT1Device | None = entry.data.get("device")
-    assert device is not None
+    data: dict | None = entry.data.get("device")
+    assert data is not None
     _LOGGER.debug("Setting up %s entry", DOMAIN)
 
-    coordinator: DataUpdateCoordinator = InkbirdCoordinator(hass, _LOGGER, DOMAIN, device)
+    if DATA_HUB not in hass.data:
+        hass.data[DATA_HUB] = InkbirdHub(hass, _LOGGER)
+    snapshots: InkbirdSnapshots = hass.data[DATA_SNAPSHOTS]
+    device = snapshots.restore(InkbirdIamT1Device.from_dict(data))
+    duty_cycle = entry.options.get(CONF_CONNECTION_MODE) == CONNECTION_MODE_DUTY_CYCLE
+    timeseries = InkbirdTimeSeries(hass.config.path(TIMESERIES_DIRECTORY, device.address.replace(":", "").lower()))
+    adaptive_sampling = InkbirdAdaptiveSampling() if entry.options.get(CONF_ADAPTIVE_SAMPLING) else None
+    coordinator: DataUpdateCoordinator = InkbirdCoordinator(
+        hass,
+        _LOGGER,
+        DOMAIN,
+        device,
+        hass.data[DATA_HUB],
+        duty_cycle,
+        timeseries=timeseries,
+        adaptive_sampling=adaptive_sampling,
+        reading_filter=_reading_filter(entry.options),
+    )
 
-    await coordinator.async_config_entry_first_refresh()
+    # Don't wait for the device, it may well be out of range. Its entities start with the restored state.
+    coordinator.async_start()
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    entry.async_on_unload(lambda: _async_shutdown(hass, entry.entry_id, coordinator))
+    # Any change of a value or setting
+    entry.async_on_unload(coordinator.async_add_listener(
+        lambda: snapshots.async_update(coordinator.data), ~DEVICE_FIELD(0)
+    ))
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: InkbirdConfigEntry) -> None:
+    """Apply changed options."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: InkbirdConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
\ No newline at end of file
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unloaded:
+        hass.data[DOMAIN].pop(entry.entry_id)
+    return unloaded
+
+
+async def _async_shutdown(hass: HomeAssistant, entry_id: str, coordinator: InkbirdCoordinator) -> None:
+    """Stop the coordinator of an entry, and the hub with the last one."""
+    await coordinator.async_shutdown()
+    coordinators: dict = hass.data.get(DOMAIN, {})
+    coordinators.pop(entry_id, None)
+    if not coordinators and DATA_HUB in hass.data:
+        hass.data.pop(DATA_HUB).async_close()
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: InkbirdConfigEntry) -> None:
+    """Forget the last known state of a removed device."""
+    snapshots: InkbirdSnapshots | None = hass.data.get(DATA_SNAPSHOTS)
+    if snapshots is not None:
+        snapshots.async_remove(entry.data["device"]["address"])
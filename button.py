@@ -0,0 +1,43 @@
+from .coordinator import InkbirdCoordinator
+
+from .inkbird_ble_custom import DEVICE_FIELD, InkbirdIamT1Device
+
+from homeassistant.components.button import ButtonEntity
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .sensor import SENSOR_DESCRIPTIONS, sensor_unique_id
+from . import InkbirdConfigEntry
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: InkbirdConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the INKBIRD BLE buttons."""
+    coordinator: InkbirdCoordinator = hass.data[DOMAIN][entry.entry_id]
+    async_add_entities([InkbirdSyncHistoryButtonEntity(coordinator, coordinator.data)])
+
+class InkbirdSyncHistoryButtonEntity(CoordinatorEntity[InkbirdCoordinator], ButtonEntity):
+    def __init__(self, coordinator: InkbirdCoordinator, device: InkbirdIamT1Device):
+        # The button has no state depending on the device values.
+        super().__init__(coordinator, context=DEVICE_FIELD(0))
+        self._attr_name = f"{device.model} Sync History"
+        self._attr_unique_id = f"{device.model}_{device.address}_sync_history"
+        self._attr_icon = "mdi:history"
+        co2_description = next(desc for desc in SENSOR_DESCRIPTIONS if desc.device_class == SensorDeviceClass.CO2)
+        self._co2_unique_id = sensor_unique_id(device, co2_description)
+
+    async def async_press(self) -> None:
+        """Fill the long-term statistics of the co2 sensor with the history stored on the device."""
+        statistic_id = er.async_get(self.hass).async_get_entity_id(Platform.SENSOR, DOMAIN, self._co2_unique_id)
+        if statistic_id is None:
+            raise HomeAssistantError("No co2 sensor found to import the history into")
+        await self.coordinator.async_sync_history(statistic_id)
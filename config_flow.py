@@ -1,7 +1,11 @@
+import asyncio
+import copy
 import logging
+import time
 from typing import Any
 
-from .inkbird_ble_custom import InkbirdIamT1Device, InkbirdIamT1DeviceData
+from .inkbird_ble_custom import InkbirdIamT1Device, InkbirdIamT1DeviceData, READING
+from .inkbird_ble_custom.filters import HEARTBEAT
 import voluptuous as vol
 
 from homeassistant.components import bluetooth
@@ -9,10 +13,23 @@ from homeassistant.components.bluetooth import (
     BluetoothServiceInfo,
     async_discovered_service_info,
 )
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import AbortFlow, FlowResult
 
-from .const import DOMAIN
+from .const import (
+    CONF_ADAPTIVE_SAMPLING,
+    CONF_CONNECTION_MODE,
+    CONF_DEADBAND,
+    CONF_HEARTBEAT,
+    CONF_MIN_INTERVAL,
+    CONNECTION_MODE_AUTO,
+    CONNECTION_MODE_DUTY_CYCLE,
+    DATA_PROBE_CACHE,
+    DOMAIN,
+    MAX_CONCURRENT_PROBES,
+    PROBE_CACHE_TTL,
+)
 
 _LOGGER = logging.getLogger(DOMAIN)
 
@@ -25,24 +42,57 @@ class InspectorBLEConfigFlow(ConfigFlow, domain=DOMAIN):
         """Initialize the config flow."""
         self._discovered_devices: dict[str, InkbirdIamT1Device] = {}
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        return InkbirdOptionsFlow(config_entry)
+
     async def _get_device_data(self, service_info: BluetoothServiceInfo) -> InkbirdIamT1Device:
+        """Connect to the device to read its info, unless it was probed recently."""
+        cache: dict[str, tuple[float, InkbirdIamT1Device]] = self.hass.data.setdefault(DATA_PROBE_CACHE, {})
+        now = time.monotonic()
+        # Forget expired entries, so the cache doesn't grow with every device ever probed.
+        for address in [address for address, (probed, _) in cache.items() if now - probed >= PROBE_CACHE_TTL]:
+            del cache[address]
+        cached = cache.get(service_info.address)
+        if cached is not None:
+            _LOGGER.debug("Using cached device info for %s", service_info.address)
+            return copy.deepcopy(cached[1])
+
         ble_device = bluetooth.async_ble_device_from_address(self.hass, service_info.address)
         if ble_device is None:
             raise AbortFlow("cannot_connect")
 
         deviceData = InkbirdIamT1DeviceData(_LOGGER)
-        return await deviceData.update_device_only(ble_device)
+        device = await deviceData.update_device_only(ble_device)
+        cache[service_info.address] = (time.monotonic(), copy.deepcopy(device))
+        return device
     
-    async def _update_device_data(self, service_info: BluetoothServiceInfo):
+    async def _update_device_data(self, service_info: BluetoothServiceInfo) -> InkbirdIamT1Device:
+        """Probe the device. Raises AbortFlow if that fails."""
         try:
             device = await self._get_device_data(service_info)
         except AbortFlow:
-            return self.async_abort(reason="cannot_connect")
-        except Exception:
-            return self.async_abort(reason="unknown")
+            raise
+        except Exception as e:
+            _LOGGER.debug("Failed to probe %s: %s", service_info.address, e)
+            raise AbortFlow("unknown")
 
         self._discovered_devices[device.address] = device
-        self.context["title_placeholders"] = {"name": device.name()}
+        return device
+
+    async def _update_devices_data(self, service_infos: list[BluetoothServiceInfo]):
+        """Probe several devices concurrently. Devices that can't be probed are skipped."""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
+
+        async def probe(service_info: BluetoothServiceInfo):
+            async with semaphore:
+                try:
+                    await self._update_device_data(service_info)
+                except AbortFlow as e:
+                    _LOGGER.debug("Skipping %s: %s", service_info.address, e.reason)
+
+        await asyncio.gather(*(probe(service_info) for service_info in service_infos))
     
     def _show_selection_form(self, step_id: str) -> FlowResult:
         default_address = next(iter(self._discovered_devices.values())).address if self._discovered_devices else None
@@ -63,7 +113,9 @@ class InspectorBLEConfigFlow(ConfigFlow, domain=DOMAIN):
         await self.async_set_unique_id(discovery_info.address)
         self._abort_if_unique_id_configured()
         
-        await self._update_device_data(discovery_info)
+        device = await self._update_device_data(discovery_info)
+        # Named after its own device only, probes of other devices must not rename it.
+        self.context["title_placeholders"] = {"name": device.name()}
         return await self.async_step_bluetooth_confirm()
 
     async def async_step_bluetooth_confirm(self, user_input: dict[str, Any] | None = None) -> FlowResult:
@@ -73,12 +125,13 @@ class InspectorBLEConfigFlow(ConfigFlow, domain=DOMAIN):
             return self._show_selection_form("bluetooth_confirm")
         else:
             address = user_input[SELECTION_TITLE]
-            return self.async_create_entry(title=address, data={"device": self._discovered_devices[address]})
+            return self.async_create_entry(title=address, data={"device": self._discovered_devices[address].as_dict()})
 
     async def async_step_user(self, user_input: dict[str, Any] | None = None) -> FlowResult:
         """Handle the user step to pick discovered device."""
         if user_input is None or SELECTION_TITLE not in user_input:
             current_addresses = self._async_current_ids()
+            candidates = []
             for discovery_info in async_discovered_service_info(self.hass):
                 address = discovery_info.address
                 if address in current_addresses or address in self._discovered_devices:
@@ -90,7 +143,9 @@ class InspectorBLEConfigFlow(ConfigFlow, domain=DOMAIN):
                 if not discovery_info.advertisement.local_name.startswith("Ink@IAM-T"):
                     continue
 
-                await self._update_device_data(discovery_info)
+                candidates.append(discovery_info)
+
+            await self._update_devices_data(candidates)
 
             if not self._discovered_devices:
                 return self.async_abort(reason="no_devices_found")
@@ -103,4 +158,41 @@ class InspectorBLEConfigFlow(ConfigFlow, domain=DOMAIN):
             self._abort_if_unique_id_configured()
             device = self._discovered_devices[address]
             self.context["title_placeholders"] = {"name": device.name()}
-            return self.async_create_entry(title=address, data={"device": device})
\ No newline at end of file
+            return self.async_create_entry(title=address, data={"device": device.as_dict()})
+
+
+class InkbirdOptionsFlow(OptionsFlow):
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input: dict[str, Any] | None = None) -> FlowResult:
+        """Choose how the device is connected and sampled, and which changes are published."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        filters: dict[Any, Any] = {}
+        for prefix in (CONF_DEADBAND, CONF_MIN_INTERVAL):
+            for reading in READING:
+                key = f"{prefix}_{reading.name.lower()}"
+                filters[vol.Required(key, default=options.get(key, 0))] = vol.All(vol.Coerce(float), vol.Range(min=0))
+        filters[vol.Required(CONF_HEARTBEAT, default=options.get(CONF_HEARTBEAT, HEARTBEAT))] = vol.All(
+            vol.Coerce(int), vol.Range(min=60)
+        )
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_CONNECTION_MODE, default=options.get(CONF_CONNECTION_MODE, CONNECTION_MODE_AUTO)
+                    ): vol.In({
+                        CONNECTION_MODE_AUTO: "Stay connected",
+                        CONNECTION_MODE_DUTY_CYCLE: "Connect only for each sensor update",
+                    }),
+                    vol.Required(
+                        CONF_ADAPTIVE_SAMPLING, default=options.get(CONF_ADAPTIVE_SAMPLING, False)
+                    ): bool,
+                    **filters,
+                }
+            ),
+        )
@@ -1,2 +1,50 @@
 # Overrides the default 'inkbird' integration. Change to something else to keep it separate.
 DOMAIN = "inkbird"
+
+# Connections a single Bluetooth adapter or proxy is allowed to hold at the same time.
+# Devices beyond that take turns connecting.
+MAX_CONNECTIONS_PER_ADAPTER = 3
+
+# The InkbirdHub shared by all devices, see hub.py.
+DATA_HUB = f"{DOMAIN}_hub"
+
+CONF_CONNECTION_MODE = "connection_mode"
+# Stay connected, unless the adapter runs out of connection slots.
+CONNECTION_MODE_AUTO = "auto"
+# Only connect around each sensor update, to free adapter slots and airtime.
+CONNECTION_MODE_DUTY_CYCLE = "duty_cycle"
+
+# Let the dynamics of the readings choose the sampling interval, see inkbird_ble_custom/adaptive.py.
+CONF_ADAPTIVE_SAMPLING = "adaptive_sampling"
+
+# Reading changes published to the entities, see inkbird_ble_custom/filters.py.
+# Options per reading are named e.g. deadband_temperature, 0 publishes every change.
+CONF_DEADBAND = "deadband"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_HEARTBEAT = "heartbeat"
+
+# Devices probed at the same time while looking for new devices.
+MAX_CONCURRENT_PROBES = 3
+# Probed device info is reused for this long, e.g. when the config flow is opened again (seconds).
+PROBE_CACHE_TTL = 300
+
+DATA_PROBE_CACHE = f"{DOMAIN}_probe_cache"
+
+# Devices starting at the same time, e.g. on Home Assistant startup, connect this far apart (seconds).
+STARTUP_STAGGER = 2
+
+# Last known state of every device, restored on startup until the device has been reached.
+DATA_SNAPSHOTS = f"{DOMAIN}_snapshots"
+SNAPSHOT_STORAGE_KEY = f"{DOMAIN}.snapshots"
+SNAPSHOT_STORAGE_VERSION = 1
+# Changes are written to disk at most this often, and on shutdown (seconds).
+SNAPSHOT_SAVE_DELAY = 60
+
+# Running profiling and capture of the notifications by service, see services.py.
+DATA_RECORDINGS = f"{DOMAIN}_recordings"
+
+# Dispatched with the InkbirdIamT1Device of every sensor update, see websocket_api.py.
+SIGNAL_READINGS = f"{DOMAIN}_readings"
+
+# Readings of every device are recorded here, one directory per device, relative to the configuration directory.
+TIMESERIES_DIRECTORY = f"{DOMAIN}_timeseries"
@@ -1,73 +1,633 @@
-from datetime import timedelta
+import asyncio
+from contextlib import suppress
+import cProfile
+from datetime import timezone, tzinfo
+import logging
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Sequence
 from bleak import BleakClient
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+from bleak_retry_connector import BleakClientWithServiceCache, establish_connection
+from homeassistant.components import bluetooth
+from homeassistant.components.recorder.const import DOMAIN as RECORDER_DOMAIN
+from homeassistant.components.recorder.models import StatisticMetaData
+from homeassistant.components.recorder.statistics import async_import_statistics
+from homeassistant.const import CONCENTRATION_PARTS_PER_MILLION
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from .inkbird_ble_custom.parser import ALARM_MODE, InkbirdIamT1Device, SAMPLING_INTERVAL
+from .inkbird_ble_custom.parser import (
+    ALARM_MODE,
+    DEVICE_FIELD,
+    InkbirdIamT1Device,
+    InkbirdNotification,
+    NOTIFICATION_TYPES,
+    READING,
+    SAMPLING_INTERVAL,
+)
+from .inkbird_ble_custom.adaptive import InkbirdAdaptiveSampling
+from .inkbird_ble_custom.analytics import CO2_LEVELS, co2_analytics
+from .inkbird_ble_custom.capture import InkbirdCapture
+from .inkbird_ble_custom.filters import InkbirdReadingFilter
+from .inkbird_ble_custom.framing import InkbirdFrameDecoder
+from .inkbird_ble_custom.commands import SETTING_FRAME_TYPES, InkbirdCommandQueue
+from .inkbird_ble_custom.metrics import InkbirdDeviceMetrics
+from .inkbird_ble_custom.rolling import InkbirdRollingStats
+from .inkbird_ble_custom.timeseries import InkbirdTimeSeries, Record, as_readings
+from .inkbird_ble_custom.history import HISTORY_FRAME_TYPE, InkbirdHistoryDecoder
 
-from .inkbird_ble_custom.const import CHAR_NOTIFY_UUID, CHAR_WRITE_UUID, CONNECT_WRITE_DATA
+from .inkbird_ble_custom.const import (
+    CHAR_NOTIFY_UUID,
+    CHAR_WRITE_UUID,
+    CONNECT_WRITE_DATA,
+    HISTORY_WRITE_DATA,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_BACKOFF_MIN,
+    SENSOR_FRAME_TYPE,
+    WATCHDOG_INTERVALS,
+)
+from .const import SIGNAL_READINGS
+from .hub import InkbirdHub
+from .scheduler import COLLECT_WINDOW
+
+# Give up on a history download if the device stops sending frames for this long (seconds).
+HISTORY_FRAME_TIMEOUT = 10
+# Connect attempts per reconnect, bleak_retry_connector may switch adapters or proxies in between.
+CONNECT_ATTEMPTS = 3
+# Connections that drop earlier than this count as failed, so flapping devices back off (seconds).
+STABLE_CONNECTION = 30
+# Longest time to wait for the state after connecting, when devices take turns (seconds).
+COLLECT_TIMEOUT = COLLECT_WINDOW - 5
+
+# Readings are written to the time series in batches, at least this often (seconds) ...
+TIMESERIES_FLUSH_INTERVAL = 300
+# ... or once this many are buffered.
+TIMESERIES_FLUSH_RECORDS = 500
+
+# Context of the listeners interested in InkbirdDeviceMetrics, next to the DEVICE_FIELD flags.
+METRICS_CHANGED = 1 << 16
+# Context of the listeners interested in InkbirdRollingStats.
+ROLLING_CHANGED = 1 << 17
+# DEVICE_FIELD flags of the readings
+_READINGS = (1 << len(READING)) - 1
+
+# Sensor data, sampling interval, alarm mode and temperature unit. All of them are notified after connecting.
+WINDOW_FRAME_TYPES = {SENSOR_FRAME_TYPE, 0x02, 0x04, 0x05}
 
 class InkbirdCoordinator(DataUpdateCoordinator[InkbirdIamT1Device]):
-    def __init__(self, hass, logger, name, device: InkbirdIamT1Device):
+    def __init__(
+        self,
+        hass,
+        logger,
+        name,
+        device: InkbirdIamT1Device,
+        hub: InkbirdHub,
+        duty_cycle: bool = False,
+        client_factory: Callable[..., BleakClient] | None = None,
+        timeseries: InkbirdTimeSeries | None = None,
+        adaptive_sampling: InkbirdAdaptiveSampling | None = None,
+        reading_filter: InkbirdReadingFilter | None = None,
+    ):
         """
         Initialize the coordinator. 
-        The udpate_interval is not used to poll updates,
-        but for checking whether the device is still connected.
+        There is no update_interval: the device pushes its updates and disconnects are reported by bleak.
+        The timers of the connection and the entity updates go through the hub shared by all devices.
+        With duty_cycle the device is only connected around each sensor update.
+        Connects through the adapter or proxy Home Assistant's Bluetooth stack picks for the device.
+        client_factory instead creates the client for an address once, e.g. a simulated one.
+        Every reading, including downloaded history, is recorded to timeseries if given.
+        adaptive_sampling, if given, switches the sampling interval with the dynamics of the readings.
+        reading_filter, if given, holds back the reading changes not worth updating the entities for.
         """
-        super().__init__(hass, logger, name=name, update_interval=timedelta(minutes=1))
+        super().__init__(hass, logger, name=name)
         logger.info("Initializing InkbirdCoordinator with %s", device)
-        # For some reason the ConfigEntry data is provided as a dict sometimes
+        # Config entries store the device as_dict
         if isinstance(device, dict):
             device = InkbirdIamT1Device.from_dict(device)
         logger.info("initialized coordinator with %s", device)
-        self.client = BleakClient(device.address)
+        # Established on every connect, unless it comes from client_factory.
+        self._client_factory = client_factory
+        self.client: BleakClient | None = None
+        if client_factory is not None:
+            self.client = client_factory(device.address, disconnected_callback=self._on_disconnected)
         self.data = device
+        self.hub = hub
+        self.scheduler = hub.scheduler
+        self.duty_cycle = duty_cycle
 
-    async def _async_setup(self) -> None:
-        """Establish connection and listen to notifications."""
-        try:
-            await self.client.connect()
-            await self.client.start_notify(CHAR_NOTIFY_UUID, self._notification_handler)
-            # Set device into "connected" state. Also leads to the current state being notified.
-            await self.client.write_gatt_char(CHAR_WRITE_UUID, CONNECT_WRITE_DATA)
-            self.logger.info("Connected to device and started notifications.")
-        except Exception as e:
-            self.logger.error(f"Failed to connect: {e}")
-            raise UpdateFailed(f"Failed to connect: {e}")
+        self._connection_task: asyncio.Task | None = None
+        # Set whenever the connection loop has to re-evaluate its state.
+        self._wake = asyncio.Event()
+        self._pending: list[tuple[Callable[[], Awaitable[Any]], asyncio.Future]] = []
+        self._last_sensor_frame: float | None = None
+        self._window_frames: set[int] = set()
+        self._window_complete = asyncio.Event()
+        self._disconnecting = False
+        # Set by the hub once a held connection fell silent.
+        self._silent = False
+        self.metrics = InkbirdDeviceMetrics()
+        self._frames = InkbirdFrameDecoder(self.metrics)
+        self.rolling = InkbirdRollingStats()
+        self.commands = InkbirdCommandQueue(
+            logger,
+            device,
+            self._async_write_setting,
+            self._async_schedule_update,
+            self.metrics,
+            create_task=hass.async_create_background_task,
+        )
+        # Set to profile the notification handling, see the profile_notifications service.
+        self.profiler: cProfile.Profile | None = None
+        # Set to record the raw notifications, see the capture_notifications service.
+        self.capture: InkbirdCapture | None = None
+
+        self._changed = 0
+
+        self._history: InkbirdHistoryDecoder | None = None
+        self._history_metadata: StatisticMetaData | None = None
+        self._history_frame = asyncio.Event()
+
+        self.timeseries = timeseries
+        self.adaptive_sampling = adaptive_sampling
+        self.reading_filter = reading_filter
+        # time.monotonic() the rolling statistics were last published while filtering
+        self._rolling_published = 0.0
+        self._records: list[Record] = []
+        # Samples of a history download, only the gaps of the recorded readings are filled with them.
+        self._history_records: list[Record] = []
+        self._records_flushed = time.monotonic()
+        self._records_write: asyncio.Future[None] | None = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.client is not None and self.client.is_connected
+
+    @property
+    def sampling_seconds(self) -> int:
+        interval = self.data.sampling_interval
+        return (interval.value if interval else SAMPLING_INTERVAL.ONE.value) * 60
+
+    def staleness(self, now: float) -> float:
+        """Age of the sensor data relative to the sampling interval."""
+        if self._last_sensor_frame is None:
+            return math.inf
+        return (now - self._last_sensor_frame) / self.sampling_seconds
+
+    def watchdog_deadline(self, connected_at: float) -> float:
+        """When a connection held since connected_at counts as silent, unless sensor data arrives before."""
+        last_frame = max(self._last_sensor_frame or connected_at, connected_at)
+        return last_frame + WATCHDOG_INTERVALS * self.sampling_seconds
+
+    @property
+    def duty_cycle_ratio(self) -> float:
+        """Share of the time the device has been connected."""
+        return self.metrics.duty_cycle_ratio()
+
+    def connection_diagnostics(self) -> dict[str, Any]:
+        last_frame = self._last_sensor_frame
+        return {
+            "connected": self.is_connected,
+            "duty_cycle": self.duty_cycle,
+            "adaptive_sampling": self.adaptive_sampling is not None,
+            "takes_turns": self.scheduler.rotating(self),
+            "duty_cycle_ratio": round(self.duty_cycle_ratio, 4),
+            "windows": self.metrics.windows,
+            "reconnects": self.metrics.reconnects,
+            "seconds_since_sensor_data": None if last_frame is None else round(time.monotonic() - last_frame, 1),
+            "worst_case_data_age": self.scheduler.worst_case_data_age(self),
+        }
+
+    def _on_disconnected(self, _: BleakClient) -> None:
+        """Called by bleak. Wakes up the connection loop to reconnect right away."""
+        if not self._disconnecting:
+            self.logger.info("Device disonnected. Reconnecting...")
+        self._wake.set()
+        # Don't wait for the rest of a window that can't arrive anymore.
+        self._window_complete.set()
+
+    @callback
+    def async_reschedule(self) -> None:
+        """Let the connection loop re-evaluate whether to stay connected."""
+        self._wake.set()
+
+    @callback
+    def async_connection_silent(self) -> None:
+        """Called by the hub, no sensor data arrived for WATCHDOG_INTERVALS sampling intervals."""
+        self._silent = True
+        self._wake.set()
+
+    @callback
+    def async_start(self) -> None:
+        """
+        Register with the scheduler and connect in the background.
+        Doesn't wait for the device, until it is reached the entities show the restored state.
+        """
+        self.scheduler.async_register(self)
+        delay = self.scheduler.async_startup_delay()
+        self._connection_task = self.hass.async_create_background_task(
+            self._async_connection_loop(delay), f"{self.name} {self.data.address} connection"
+        )
 
     async def async_shutdown(self) -> None:
         """Disconnect and stop notifications."""
+        await self._async_stop()
+        return await super().async_shutdown()
+
+    async def _async_stop(self) -> None:
+        # The connection loop first, it must not ask the scheduler for a slot once unregistered.
+        if self._connection_task is not None:
+            self._connection_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._connection_task
+            self._connection_task = None
+        self.hub.async_unregister(self)
+        await self.commands.async_stop()
+        await self._async_flush_records()
+        await self._async_disconnect()
+
+    async def _async_connection_loop(self, delay: float = 0) -> None:
+        """Connect either permanently or once per sampling interval, as decided by the scheduler."""
+        if delay:
+            self.logger.debug("Connecting to %s in %.0f s", self.data.address, delay)
+            await self.hub.timers.sleep(delay)
+        failures = 0
+        while True:
+            if self.scheduler.rotating(self):
+                await self._async_wait_for_window()
+            healthy = False
+            try:
+                async with self.scheduler.async_slot(self):
+                    try:
+                        await self._async_connect()
+                        await self._async_run_pending()
+                        if self.scheduler.rotating(self):
+                            self.metrics.windows += 1
+                            await self._async_collect()
+                            healthy = SENSOR_FRAME_TYPE in self._window_frames
+                        else:
+                            healthy = await self._async_hold()
+                    finally:
+                        await self._async_disconnect()
+            except Exception as e:
+                self.logger.warning("Connection to %s failed: %s", self.data.address, e)
+                self._fail_pending(e)
+
+            if healthy:
+                failures = 0
+                continue
+            failures += 1
+            self.metrics.reconnects += 1
+            await self.hub.timers.sleep(self._backoff(failures))
+
+    def _backoff(self, failures: int) -> float:
+        """Exponential backoff with jitter, so flapping devices neither hog the loop nor retry in lockstep."""
+        delay = min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_MIN * 2 ** (failures - 1))
+        delay *= random.uniform(0.5, 1)
+        self.logger.debug("Reconnecting in %.1f s after %s failed attempts", delay, failures)
+        return delay
+
+    async def _async_connect(self) -> None:
+        started = time.monotonic()
+        if self._client_factory is None:
+            self.client = await self._async_establish_connection()
+        else:
+            await self.client.connect()
+        self.metrics.record_connected(time.monotonic() - started)
+        # A frame cut off by the last disconnect won't be completed.
+        self._frames.reset()
+        try:
+            await self.client.start_notify(CHAR_NOTIFY_UUID, self._notification_handler)
+        except BleakError:
+            # The cached services may be outdated, e.g. after a firmware update.
+            if isinstance(self.client, BleakClientWithServiceCache):
+                await self.client.clear_cache()
+            raise
+        self._window_frames.clear()
+        self._window_complete.clear()
+        # Set device into "connected" state. Also leads to the current state being notified.
+        await self.client.write_gatt_char(CHAR_WRITE_UUID, CONNECT_WRITE_DATA)
+        # Devices taking turns connect every sampling interval, don't flood the log with that.
+        self.logger.log(self._connection_log_level(), "Connected to device and started notifications.")
+
+    def _ble_device(self) -> BLEDevice | None:
+        """The device as seen by the connectable adapter or proxy with the best signal and a free slot."""
+        return bluetooth.async_ble_device_from_address(self.hass, self.data.address, connectable=True)
+
+    async def _async_establish_connection(self) -> BleakClient:
+        ble_device = self._ble_device()
+        if ble_device is None:
+            raise UpdateFailed(f"{self.data.address} is not in range of a connectable adapter or proxy")
+        # Retries on another adapter or proxy if one fails, and reuses the services discovered before.
+        return await establish_connection(
+            BleakClientWithServiceCache,
+            ble_device,
+            self.data.address,
+            disconnected_callback=self._on_disconnected,
+            max_attempts=CONNECT_ATTEMPTS,
+            ble_device_callback=lambda: self._ble_device() or ble_device,
+        )
+
+    async def _async_disconnect(self) -> None:
+        self._disconnecting = True
         try:
-            if self.client.is_connected:
+            if self.is_connected:
                 await self.client.stop_notify(CHAR_NOTIFY_UUID)
                 await self.client.disconnect()
-                self.logger.info("Disconnected from Bluetooth device.")
+                self.logger.log(self._connection_log_level(), "Disconnected from Bluetooth device.")
         except Exception as e:
             self.logger.error(f"Error during disconnect: {e}")
-        return await super().async_shutdown()
+        finally:
+            self._disconnecting = False
+        self.metrics.record_disconnected()
+
+    def _connection_log_level(self) -> int:
+        return logging.DEBUG if self.scheduler.rotating(self) else logging.INFO
+
+    async def _async_hold(self) -> bool:
+        """
+        Stay connected until the connection drops, falls silent or the device has to take turns.
+        Returns whether the connection was healthy.
+        """
+        connected_at = time.monotonic()
+        self._silent = False
+        self.hub.async_track_connection(self, connected_at)
+        try:
+            while self.is_connected and not self.scheduler.rotating(self):
+                await self._wake.wait()
+                self._wake.clear()
+                if self._silent:
+                    last_frame = max(self._last_sensor_frame or connected_at, connected_at)
+                    self.logger.warning("No data received for %.0f s. Reconnecting...", time.monotonic() - last_frame)
+                    return False
+                await self._async_run_pending()
+        finally:
+            self.hub.async_untrack_connection(self)
+        return self.is_connected or time.monotonic() - connected_at >= STABLE_CONNECTION
+
+    async def _async_collect(self) -> None:
+        """Wait until the state notified after connecting has been received."""
+        try:
+            async with asyncio.timeout(COLLECT_TIMEOUT):
+                await self._window_complete.wait()
+        except TimeoutError:
+            self.logger.debug("Window closed with frames %s", self._window_frames)
+
+    async def _async_wait_for_window(self) -> None:
+        """Sleep until the next sampling interval, unless something has to be written earlier."""
+        if self._last_sensor_frame is None:
+            return
+        delay = self._last_sensor_frame + self.sampling_seconds - time.monotonic()
+        self._wake.clear()
+        if delay <= 0 or self._pending:
+            return
+        timer = self.hub.timers.call_later(delay, self._wake.set)
+        try:
+            await self._wake.wait()
+        finally:
+            timer.cancel()
+
+    async def _async_when_connected(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func on the connected device.
+        Devices that take turns are only connected during their window, so an early window is requested.
+        """
+        if self.is_connected:
+            return await func()
+        future = self.hass.loop.create_future()
+        self._pending.append((func, future))
+        self._wake.set()
+        return await future
+
+    async def _async_run_pending(self) -> None:
+        while self._pending:
+            func, future = self._pending.pop(0)
+            if future.done():
+                # Cancelled, e.g. a write that ran out of time while waiting for the connection
+                continue
+            try:
+                result = await func()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    def _fail_pending(self, error: Exception) -> None:
+        pending, self._pending = self._pending, []
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
 
     def _notification_handler(self, _: int, data: bytearray):
         """Handle incoming notifications from the device."""
-        self.logger.debug(f"Received notification : {data.hex()}")
-        self.data.update(data)
-        self.async_update_listeners()
+        capture = self.capture
+        if capture is not None:
+            capture.record(self.data.address, data)
+        profiler = self.profiler
+        if profiler is None:
+            self._handle_notification(data)
+        else:
+            profiler.runcall(self._handle_notification, data)
 
-    async def _async_update_data(self) -> InkbirdIamT1Device:
-        """Reconnect if device disconnected."""
-        if not self.client.is_connected:
-            self.logger.info("Device disonnected. Reconnecting...")
-            await self._async_setup()
+    def _handle_notification(self, data: bytearray):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Received notification : %s", data.hex())
+        metrics = self.metrics
+        dropped = metrics.dropped_frames + metrics.corrupt_frames
+        for frame in self._frames.feed(data):
+            self._handle_frame(frame)
+        if metrics.dropped_frames + metrics.corrupt_frames != dropped:
+            self.logger.info("Dropped corrupt data  : %s", data.hex())
+
+    def _handle_frame(self, data: memoryview):
+        frame_type = data[2]
+        if frame_type not in NOTIFICATION_TYPES:
+            self.metrics.unknown_frames += 1
+        if self._history is not None and frame_type == HISTORY_FRAME_TYPE:
+            started = time.perf_counter_ns()
+            self._import_history(self._history.feed(data))
+            self.metrics.record_frame(frame_type, time.perf_counter_ns() - started)
+            self._history_frame.set()
+            return
+
+        started = time.perf_counter_ns()
+        changed = self.data.update(data)
+        self.metrics.record_frame(frame_type, time.perf_counter_ns() - started)
+        setting = SETTING_FRAME_TYPES.get(frame_type)
+        if setting is not None and self.commands.async_notified(setting):
+            changed &= ~setting
+        self._window_frames.add(frame_type)
+        if frame_type == SENSOR_FRAME_TYPE:
+            self._last_sensor_frame = self.metrics.last_frame
+            self.rolling.push(self.data)
+            changed |= ROLLING_CHANGED
+            # Every sample, before any filtering
+            async_dispatcher_send(self.hass, SIGNAL_READINGS, self.data)
+            if self.timeseries is not None:
+                self._record_readings()
+            if self.adaptive_sampling is not None:
+                interval = self.adaptive_sampling.update(self.data)
+                if interval is not None:
+                    self.logger.debug("Adapting interval     : %s", interval)
+                    self.commands.async_set(DEVICE_FIELD.SAMPLING_INTERVAL, interval)
+            if self.reading_filter is not None:
+                # Statistics and time series above still get every reading.
+                changed = self.reading_filter.apply(self.data, changed)
+                # The statistics are only published with a reading or the heartbeat, not to undo the filter.
+                now = time.monotonic()
+                if changed & _READINGS or now - self._rolling_published >= self.reading_filter.heartbeat:
+                    self._rolling_published = now
+                else:
+                    changed &= ~ROLLING_CHANGED
+        if WINDOW_FRAME_TYPES <= self._window_frames:
+            self._window_complete.set()
+        self._async_schedule_update(changed | METRICS_CHANGED)
 
+    @callback
+    def _async_schedule_update(self, changed: int) -> None:
+        """Collect the changes of a burst of notifications and write them in one go."""
+        self._changed |= changed
+        self.hub.async_schedule_update(self)
+
+    @callback
+    def async_flush_updates(self) -> None:
+        """Only update the entities whose DEVICE_FIELD context changed. Called by the hub."""
+        changed, self._changed = self._changed, 0
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context & changed:
+                update_callback()
+
+    async def _async_update_data(self) -> InkbirdIamT1Device:
+        """The device pushes its data, there is nothing to poll."""
         return self.data
     
     async def update_alarm_mode(self, mode: ALARM_MODE):
-        try:
-            self.logger.debug("Writing alarm mode    : %s", mode)
-            await self.data.write_alarm_mode(self.client, mode)
-        except Exception as e:
-            raise UpdateFailed(f"Failed to write alarm mode: {e}")
-        
+        """Shown right away, written in the background. See InkbirdCommandQueue."""
+        self.logger.debug("Writing alarm mode    : %s", mode)
+        self.commands.async_set(DEVICE_FIELD.ALARM_MODE, mode)
+
     async def update_sampling_interval(self, interval: SAMPLING_INTERVAL):
+        """Shown right away, written in the background. See InkbirdCommandQueue."""
+        self.logger.debug("Writing interval      : %s", interval)
+        self.commands.async_set(DEVICE_FIELD.SAMPLING_INTERVAL, interval)
+
+    async def _async_write_setting(self, value: ALARM_MODE | SAMPLING_INTERVAL) -> None:
+        data = InkbirdNotification.create_response(value)
+        await self._async_when_connected(lambda: self.client.write_gatt_char(CHAR_WRITE_UUID, data))
+
+    async def async_sync_history(self, statistic_id: str) -> int:
+        """
+        Download the co2 history stored on the device and import it into the long-term statistics
+        of statistic_id. The frames are aggregated while they arrive and imported in a few bulk inserts.
+        Returns the number of downloaded samples.
+        """
+        if self._history is not None:
+            raise UpdateFailed("History download already in progress")
+        interval = self.data.sampling_interval
+        if interval is None:
+            raise UpdateFailed("Sampling interval of the device is not known yet")
+
+        decoder = InkbirdHistoryDecoder(
+            time.time(),
+            interval.value * 60,
+            on_sample=self._record_history_sample if self.timeseries is not None else None,
+        )
+        self._history_metadata = StatisticMetaData(
+            has_mean=True,
+            has_sum=False,
+            name=None,
+            source=RECORDER_DOMAIN,
+            statistic_id=statistic_id,
+            unit_of_measurement=CONCENTRATION_PARTS_PER_MILLION,
+        )
+        self._history = decoder
         try:
-            self.logger.debug("Writing interval      : %s", interval)
-            await self.data.write_sampling_interval(self.client, interval)
+            await self._async_when_connected(lambda: self._async_download_history(decoder))
         except Exception as e:
-            raise UpdateFailed(f"Failed to write sampling inteval: {e}")
\ No newline at end of file
+            raise UpdateFailed(f"Failed to download history: {e}")
+        finally:
+            self._history = None
+            self._import_history(decoder.flush())
+            await self._async_fill_history(interval.value * 60)
+
+        self.logger.info("Downloaded %s history samples, %s frames missed", decoder.samples, decoder.missed_frames)
+        return decoder.samples
+
+    async def _async_download_history(self, decoder: InkbirdHistoryDecoder):
+        self.logger.debug("Requesting co2 history")
+        await self.client.write_gatt_char(CHAR_WRITE_UUID, HISTORY_WRITE_DATA)
+        while not decoder.done:
+            self._history_frame.clear()
+            try:
+                async with asyncio.timeout(HISTORY_FRAME_TIMEOUT):
+                    await self._history_frame.wait()
+            except TimeoutError:
+                self.logger.warning("History download stopped after %s samples", decoder.samples)
+                return
+
+    def _record_readings(self) -> None:
+        device = self.data
+        self._records.append((int(max(device.updated)), *device.values, device.valid))
+        if (
+            len(self._records) >= TIMESERIES_FLUSH_RECORDS
+            or time.monotonic() - self._records_flushed >= TIMESERIES_FLUSH_INTERVAL
+        ) and self._records_write is None:
+            self._records_write = self.hass.async_create_task(self._async_flush_records())
+
+    def _record_history_sample(self, timestamp: float, co2: int) -> None:
+        self._history_records.append((int(timestamp), 0, 0, co2, 0, DEVICE_FIELD.CO2.value))
+
+    async def _async_fill_history(self, resolution: float) -> None:
+        """Write the downloaded samples the time series doesn't hold a co2 reading for yet."""
+        records, self._history_records = self._history_records, []
+        if not records or self.timeseries is None:
+            return
+        # Readings recorded live take precedence over the interpolated history timestamps.
+        await self._async_flush_records()
+        try:
+            added = await self.hass.async_add_executor_job(self.timeseries.fill, records, resolution)
+        except OSError as e:
+            self.logger.error("Failed to write the history to %s: %s", self.timeseries.directory, e)
+            return
+        self.logger.debug("Recorded %s of %s history samples, the others were recorded already", added, len(records))
+
+    async def _async_flush_records(self) -> None:
+        """Write the buffered readings to the time series, in the executor."""
+        records, self._records = self._records, []
+        self._records_flushed = time.monotonic()
+        try:
+            if records and self.timeseries is not None:
+                await self.hass.async_add_executor_job(self.timeseries.write, records)
+        except OSError as e:
+            self.logger.error("Failed to write %s readings to %s: %s", len(records), self.timeseries.directory, e)
+        finally:
+            self._records_write = None
+
+    async def async_get_readings(self, start: float, end: float) -> list[dict[str, Any]]:
+        """Readings recorded from start to end (timestamps), coarser the older they are."""
+        if self.timeseries is None:
+            return []
+        await self._async_flush_records()
+        records = await self.hass.async_add_executor_job(self.timeseries.query, start, end)
+        return as_readings(records)
+
+    async def async_co2_analytics(
+        self, start: float, end: float, levels: Sequence[int] = CO2_LEVELS, time_zone: tzinfo = timezone.utc
+    ) -> dict[str, Any]:
+        """Co2 exposure analytics of the readings recorded from start to end (timestamps), by day of time_zone."""
+        if self.timeseries is None:
+            return {"samples": 0}
+        await self._async_flush_records()
+
+        def analyse() -> dict[str, Any]:
+            return co2_analytics(self.timeseries.query_buffer(start, end), levels, time_zone=time_zone)
+
+        return await self.hass.async_add_executor_job(analyse)
+
+    def _import_history(self, statistics: list[dict[str, Any]] | None):
+        if statistics:
+            async_import_statistics(self.hass, self._history_metadata, statistics)
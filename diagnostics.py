@@ -0,0 +1,18 @@
+"""Diagnostics support for INKBIRD BLE devices."""
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .coordinator import InkbirdCoordinator
+from .const import DOMAIN
+from . import InkbirdConfigEntry
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: InkbirdConfigEntry) -> dict[str, Any]:
+    coordinator: InkbirdCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "options": dict(entry.options),
+        "device": coordinator.data.as_dict(),
+        "connection": coordinator.connection_diagnostics(),
+        "metrics": coordinator.metrics.as_dict(),
+        "hub": coordinator.hub.diagnostics(),
+    }
@@ -0,0 +1,101 @@
+"""One timer wheel and one update dispatch shared by all INKBIRD devices."""
+from __future__ import annotations
+
+import asyncio
+from logging import Logger
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .inkbird_ble_custom.timers import InkbirdTimer, InkbirdTimerWheel
+from .scheduler import InkbirdScheduler
+
+if TYPE_CHECKING:
+    from .coordinator import InkbirdCoordinator
+
+# Changes notified within this time are written to the entities at once, for all devices (seconds).
+UPDATE_COALESCE_DELAY = 0.2
+
+
+class InkbirdHub:
+    """
+    Owns what the coordinators of the devices have in common, so their number doesn't add up on the event loop:
+    the connection slots (see InkbirdScheduler), the timers of the connections on a single InkbirdTimerWheel,
+    the liveness watchdogs of the connected devices and the coalesced entity updates of all devices.
+    """
+
+    def __init__(self, hass: HomeAssistant, logger: Logger, scheduler: InkbirdScheduler | None = None):
+        self.hass = hass
+        self.logger = logger
+        self.scheduler = scheduler or InkbirdScheduler(hass, logger)
+        self.timers = InkbirdTimerWheel(hass.loop)
+        self._watchdogs: dict[InkbirdCoordinator, InkbirdTimer] = {}
+        self._dirty: dict[InkbirdCoordinator, None] = {}
+        self._dispatch_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def connected(self) -> int:
+        """Devices holding their connection."""
+        return len(self._watchdogs)
+
+    @callback
+    def async_unregister(self, coordinator: InkbirdCoordinator) -> None:
+        self.scheduler.async_unregister(coordinator)
+        self.async_untrack_connection(coordinator)
+        self._dirty.pop(coordinator, None)
+
+    @callback
+    def async_track_connection(self, coordinator: InkbirdCoordinator, connected_at: float) -> None:
+        """Watch a held connection, the coordinator is told once it falls silent."""
+        self.async_untrack_connection(coordinator)
+        self._watchdogs[coordinator] = self.timers.call_at(
+            coordinator.watchdog_deadline(connected_at), self._async_check_connection, coordinator, connected_at
+        )
+
+    @callback
+    def async_untrack_connection(self, coordinator: InkbirdCoordinator) -> None:
+        timer = self._watchdogs.pop(coordinator, None)
+        if timer is not None:
+            timer.cancel()
+
+    @callback
+    def _async_check_connection(self, coordinator: InkbirdCoordinator, connected_at: float) -> None:
+        # The deadline only moves on here, not with every sensor frame.
+        deadline = coordinator.watchdog_deadline(connected_at)
+        if deadline > self.hass.loop.time():
+            self._watchdogs[coordinator] = self.timers.call_at(
+                deadline, self._async_check_connection, coordinator, connected_at
+            )
+            return
+        del self._watchdogs[coordinator]
+        coordinator.async_connection_silent()
+
+    @callback
+    def async_schedule_update(self, coordinator: InkbirdCoordinator) -> None:
+        """Write the changes of the coordinator together with those of every other device."""
+        self._dirty[coordinator] = None
+        if self._dispatch_handle is None:
+            self._dispatch_handle = self.hass.loop.call_later(UPDATE_COALESCE_DELAY, self._async_dispatch_updates)
+
+    @callback
+    def _async_dispatch_updates(self) -> None:
+        self._dispatch_handle = None
+        dirty, self._dirty = self._dirty, {}
+        for coordinator in dirty:
+            coordinator.async_flush_updates()
+
+    @callback
+    def async_close(self) -> None:
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+        self._dirty.clear()
+        self._watchdogs.clear()
+        self.timers.close()
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "timers": len(self.timers),
+            "timer_wakeups": self.timers.wakeups,
+        }
@@ -1,2 +1,3 @@
-from .parser import InkbirdIamT1Device, ALARM_MODE, InkbirdIamT1DeviceData, SAMPLING_INTERVAL
-
+from .parser import InkbirdIamT1Device, ALARM_MODE, DEVICE_FIELD, InkbirdIamT1DeviceData, READING, SAMPLING_INTERVAL
+from .history import InkbirdHistoryDecoder, HISTORY_FRAME_TYPE
+from .metrics import InkbirdDeviceMetrics
@@ -0,0 +1,100 @@
+"""
+Sampling interval chosen from the dynamics of the readings.
+
+A device samples every minute while the co2 level rises quickly, and every ten minutes once co2 and temperature
+have been stable for a while. The thresholds for both directions are apart, and slowing down requires the readings
+to stay stable for STABLE_TIME, so the interval doesn't flap around a threshold.
+
+The rates are least squares slopes over the samples of the last RATE_WINDOW, not the step between two samples:
+a steady room still flickers by a quantisation step now and then, 0.1 °C within a minute is no change of 0.1 °C/min.
+"""
+from __future__ import annotations
+
+from collections import deque
+
+from .parser import READING, READING_SCALE, SAMPLING_INTERVAL, InkbirdIamT1Device
+
+# Switch to the fast interval when co2 rises at least this fast (ppm per minute) ...
+CO2_RISE = 20
+# ... or the temperature changes at least this fast (°C per minute).
+TEMPERATURE_CHANGE = 0.1
+# Readings are stable while co2 changes slower than this (ppm per minute) ...
+CO2_STABLE = 5
+# ... and the temperature slower than this (°C per minute).
+TEMPERATURE_STABLE = 0.02
+# Switch to the slow interval after the readings have been stable this long (seconds).
+STABLE_TIME = 20 * 60
+# The rates are fitted over the samples of this long (seconds), at least the last two.
+RATE_WINDOW = 10 * 60
+
+
+class InkbirdAdaptiveSampling:
+    def __init__(
+        self,
+        fast: SAMPLING_INTERVAL = SAMPLING_INTERVAL.ONE,
+        slow: SAMPLING_INTERVAL = SAMPLING_INTERVAL.TEN,
+        stable_time: float = STABLE_TIME,
+        rate_window: float = RATE_WINDOW,
+    ):
+        self.fast = fast
+        self.slow = slow
+        self.stable_time = stable_time
+        self.rate_window = rate_window
+        # (timestamp, co2, temperature) of the recent samples, in READING_SCALE units
+        self._samples: deque[tuple[float, int, int | None]] = deque()
+        # Start of the current stable period
+        self._stable_since: float | None = None
+
+    def update(self, device: InkbirdIamT1Device) -> SAMPLING_INTERVAL | None:
+        """
+        Add the current readings of the device. Call once per sensor frame, repeated readings are skipped.
+        Returns the interval to switch to, None to keep the current one.
+        """
+        timestamp = device.reading_updated(READING.CO2)
+        samples = self._samples
+        if timestamp is None or (samples and timestamp <= samples[-1][0]):
+            return None
+        temperature = device.values[READING.TEMPERATURE] if device.reading(READING.TEMPERATURE) is not None else None
+        samples.append((timestamp, device.values[READING.CO2], temperature))
+        while len(samples) > 2 and samples[0][0] < timestamp - self.rate_window:
+            samples.popleft()
+        if len(samples) < 2:
+            return None
+        previous = samples[-2][0]
+
+        co2_rate = _slope([(t, co2) for t, co2, _ in samples]) / READING_SCALE[READING.CO2]
+        temperatures = [(t, temperature) for t, _, temperature in samples if temperature is not None]
+        temperature_rate = 0.0
+        temperature_change = 0.0
+        if len(temperatures) >= 2:
+            slope = abs(_slope(temperatures))
+            temperature_rate = slope / READING_SCALE[READING.TEMPERATURE]
+            # Fitted change over the window, in quantisation steps
+            temperature_change = slope * (temperatures[-1][0] - temperatures[0][0]) / 60
+
+        if co2_rate >= CO2_RISE or (temperature_rate >= TEMPERATURE_CHANGE and temperature_change > 1):
+            self._stable_since = None
+            target = self.fast
+        elif abs(co2_rate) < CO2_STABLE and temperature_rate < TEMPERATURE_STABLE:
+            if self._stable_since is None:
+                self._stable_since = previous
+            if timestamp - self._stable_since < self.stable_time:
+                return None
+            target = self.slow
+        else:
+            # In between the thresholds: keep the current interval.
+            self._stable_since = None
+            return None
+
+        current = device.sampling_interval
+        return target if current is not None and current is not target else None
+
+
+def _slope(points: list[tuple[float, int]]) -> float:
+    """Least squares slope of the values per minute."""
+    count = len(points)
+    mean_time = sum(t for t, _ in points) / count
+    mean_value = sum(value for _, value in points) / count
+    covariance = sum((t - mean_time) * (value - mean_value) for t, value in points)
+    variance = sum((t - mean_time) ** 2 for t, _ in points)
+    return covariance / variance * 60 if variance else 0.0
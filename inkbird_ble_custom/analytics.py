@@ -0,0 +1,218 @@
+"""
+CO2 exposure analytics over the records of an InkbirdTimeSeries.
+
+The packed records are viewed as a numpy structured array and every statistic is computed with array operations,
+so a year of minute samples takes milliseconds. Each sample is taken to hold until the next one, for at most MAX_GAP.
+
+numpy is imported on first use, the package itself stays free of it.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone, tzinfo
+from typing import TYPE_CHECKING, Any, Sequence
+
+from .parser import DEVICE_FIELD
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Time spent above each of these levels is reported (ppm).
+CO2_LEVELS = (800, 1000, 1400)
+PERCENTILES = (50, 90, 95)
+# A sample holds for at most this long, longer gaps are outages (seconds).
+MAX_GAP = 3600
+# Outdoor co2 level the indoor level decays to when ventilating (ppm).
+OUTDOOR_CO2 = 420
+# Decays are fitted while the co2 level falls for at least this long (seconds) ...
+MIN_DECAY_DURATION = 20 * 60
+# ... and stays this far above the outdoor level (ppm).
+MIN_DECAY_EXCESS = 100
+# Whether the level falls is decided on a moving average of this many samples, against sensor noise.
+DECAY_SMOOTHING = 5
+# A room counts as occupied while the co2 level is at or above this level (ppm).
+OCCUPIED_CO2 = 800
+
+_DAY = 24 * 3600
+
+
+def _numpy():
+    import numpy
+
+    return numpy
+
+
+def records_array(buffer: bytes) -> np.ndarray:
+    """Structured array view of packed timeseries.RECORDs."""
+    np = _numpy()
+    dtype = np.dtype(
+        [
+            ("timestamp", "<u4"),
+            ("temperature", "<i2"),
+            ("humidity", "<u2"),
+            ("co2", "<u2"),
+            ("atmospheric_pressure", "<u2"),
+            ("valid", "u1"),
+            ("padding", "V3"),
+        ]
+    )
+    return np.frombuffer(buffer, dtype=dtype, count=len(buffer) // dtype.itemsize)
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indices of the runs of True in mask."""
+    np = _numpy()
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return edges[0::2], edges[1::2]
+
+
+def _range_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Sum of values[start:end] for every range."""
+    np = _numpy()
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return cumulative[ends] - cumulative[starts]
+
+
+def co2_analytics(
+    buffer: bytes,
+    levels: Sequence[float] = CO2_LEVELS,
+    percentiles: Sequence[float] = PERCENTILES,
+    time_zone: tzinfo = timezone.utc,
+    outdoor_co2: float = OUTDOOR_CO2,
+    occupied_co2: float = OCCUPIED_CO2,
+) -> dict[str, Any]:
+    """
+    Exposure, daily percentiles, ventilation decays and occupied periods of the co2 samples in buffer.
+    The days are local days of time_zone, with the offset in effect at each sample, e.g. 25 hours on the day daylight
+    saving time ends. Timestamps are returned as seconds since the epoch.
+    """
+    np = _numpy()
+    records = records_array(buffer)
+    records = records[(records["valid"] & DEVICE_FIELD.CO2.value) != 0]
+    if not len(records):
+        return {"samples": 0}
+    timestamps = records["timestamp"].astype(np.float64)
+    co2 = records["co2"].astype(np.float64)
+
+    # Seconds each sample holds, the last one as long as the one before
+    hold = np.diff(timestamps, append=timestamps[-1] + (timestamps[-1] - timestamps[-2] if len(timestamps) > 1 else 0))
+    hold = np.minimum(hold, MAX_GAP)
+    covered = float(hold.sum())
+
+    levels_array = np.asarray(levels, dtype=np.float64)
+    seconds_above = (co2[np.newaxis, :] > levels_array[:, np.newaxis]) @ hold
+
+    return {
+        "samples": len(records),
+        "start": int(timestamps[0]),
+        "end": int(timestamps[-1]),
+        "mean": round(float((co2 * hold).sum() / covered), 1) if covered else float(co2.mean()),
+        "max": int(co2.max()),
+        "seconds_above": {str(level): float(seconds) for level, seconds in zip(levels, seconds_above)},
+        "daily": _daily(timestamps, co2, percentiles, time_zone),
+        "decays": _decays(timestamps, co2, outdoor_co2),
+        "occupied": _occupied(timestamps, co2, hold, occupied_co2),
+    }
+
+
+def _utc_offsets(timestamps: np.ndarray, time_zone: tzinfo) -> np.ndarray:
+    """
+    UTC offset of time_zone at each timestamp (seconds). Looked up once per hour holding samples, and per sample
+    only within the hours the offset changes in.
+    """
+    np = _numpy()
+
+    def offset(timestamp: float) -> float:
+        return datetime.fromtimestamp(timestamp, time_zone).utcoffset().total_seconds()
+
+    hours, inverse = np.unique(timestamps // 3600, return_inverse=True)
+    at_start = np.array([offset(hour * 3600) for hour in hours])
+    at_end = np.array([offset(hour * 3600 + 3599) for hour in hours])
+    offsets = at_start[inverse]
+    for index in np.flatnonzero(at_start[inverse] != at_end[inverse]):
+        offsets[index] = offset(timestamps[index])
+    return offsets
+
+
+def _daily(timestamps: np.ndarray, co2: np.ndarray, percentiles: Sequence[float], time_zone: tzinfo) -> list[dict[str, Any]]:
+    """Nearest-rank percentiles and maximum of each local day."""
+    np = _numpy()
+    days = ((timestamps + _utc_offsets(timestamps, time_zone)) // _DAY).astype(np.int64)
+    # Sorted by day, then by value
+    order = np.lexsort((co2, days))
+    sorted_co2 = co2[order]
+    unique_days, starts, counts = np.unique(days[order], return_index=True, return_counts=True)
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100
+    indices = starts[:, np.newaxis] + np.rint(fractions[np.newaxis, :] * (counts[:, np.newaxis] - 1)).astype(np.int64)
+    values = sorted_co2[indices]
+    maxima = sorted_co2[starts + counts - 1]
+    return [
+        {
+            "date": datetime.fromtimestamp(int(day) * _DAY, timezone.utc).date().isoformat(),
+            "samples": int(count),
+            **{f"p{percentile:g}": int(value) for percentile, value in zip(percentiles, row)},
+            "max": int(maximum),
+        }
+        for day, count, row, maximum in zip(unique_days, counts, values, maxima)
+    ]
+
+
+def _decays(timestamps: np.ndarray, co2: np.ndarray, outdoor_co2: float) -> dict[str, Any]:
+    """
+    Air changes per hour of every long enough decay, from a least squares fit of ln(co2 - outdoor co2) over time.
+    """
+    np = _numpy()
+    excess = co2 - outdoor_co2
+    smoothed = co2
+    if len(co2) >= DECAY_SMOOTHING:
+        # Padded with the edge values, zeros would make every range seem to fall at its ends.
+        half = DECAY_SMOOTHING // 2
+        padded = np.pad(co2, (half, DECAY_SMOOTHING - 1 - half), mode="edge")
+        smoothed = np.convolve(padded, np.full(DECAY_SMOOTHING, 1 / DECAY_SMOOTHING), mode="valid")
+    # Steps between two samples that are part of a decay
+    falling = (
+        (np.diff(smoothed) < 0)
+        & (np.diff(timestamps) <= MAX_GAP)
+        & (excess[:-1] > MIN_DECAY_EXCESS)
+        & (excess[1:] > MIN_DECAY_EXCESS)
+    )
+    step_starts, step_ends = _runs(falling)
+    # The samples of a run of n steps are [start, start + n]
+    starts, ends = step_starts, step_ends + 1
+    long_enough = (ends - starts >= 3) & (timestamps[ends - 1] - timestamps[starts] >= MIN_DECAY_DURATION)
+    starts, ends = starts[long_enough], ends[long_enough]
+    if not len(starts):
+        return {"count": 0, "median_air_changes_per_hour": None, "events": []}
+
+    hours = (timestamps - timestamps[0]) / 3600
+    logs = np.log(np.maximum(excess, 1))
+    n = (ends - starts).astype(np.float64)
+    sx = _range_sums(hours, starts, ends)
+    sy = _range_sums(logs, starts, ends)
+    sxx = _range_sums(hours * hours, starts, ends)
+    sxy = _range_sums(hours * logs, starts, ends)
+    slopes = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    rates = -slopes
+    return {
+        "count": len(starts),
+        "median_air_changes_per_hour": round(float(np.median(rates)), 2),
+        "events": [
+            {"start": int(timestamps[start]), "end": int(timestamps[end - 1]), "air_changes_per_hour": round(float(rate), 2)}
+            for start, end, rate in zip(starts, ends, rates)
+        ],
+    }
+
+
+def _occupied(timestamps: np.ndarray, co2: np.ndarray, hold: np.ndarray, occupied_co2: float) -> list[dict[str, Any]]:
+    """Periods with the co2 level at or above occupied_co2, with their peak."""
+    np = _numpy()
+    starts, ends = _runs(co2 >= occupied_co2)
+    if not len(starts):
+        return []
+    # reduceat reduces from each index up to the next one, so interleave the ends and drop their reductions.
+    padded = np.append(co2, 0)
+    peaks = np.maximum.reduceat(padded, np.column_stack((starts, ends)).ravel())[0::2]
+    durations = _range_sums(hold, starts, ends)
+    return [
+        {"start": int(timestamps[start]), "end": int(timestamps[end - 1]), "seconds": float(seconds), "peak": int(peak)}
+        for start, end, seconds, peak in zip(starts, ends, durations, peaks)
+    ]
@@ -0,0 +1,63 @@
+"""
+Benchmarks of the per-frame hot paths.
+
+    python -m inkbird_ble_custom.benchmarks --save       # record a baseline
+    python -m inkbird_ble_custom.benchmarks              # compare against it, exit code 1 on regressions
+
+Baselines are specific to the machine they were recorded on and are not committed.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import platform
+import timeit
+from typing import Callable
+
+# name -> factory returning the operation to time. Factories returning None are skipped.
+BENCHMARKS: dict[str, Callable[[], Callable[[], object] | None]] = {}
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+# Slowdown relative to the baseline that counts as a regression.
+DEFAULT_THRESHOLD = 0.2
+
+def benchmark(name: str):
+    """Register a benchmark factory."""
+    def register(factory: Callable[[], Callable[[], object] | None]):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+def time_operation(operation: Callable[[], object], repeat: int = 7) -> float:
+    """Best of several runs, in nanoseconds per call."""
+    timer = timeit.Timer(operation)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+def run(selected: str | None = None) -> dict[str, float]:
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if selected and selected not in name:
+            continue
+        operation = factory()
+        if operation is None:
+            continue
+        results[name] = time_operation(operation)
+    return results
+
+def save(results: dict[str, float], path: Path):
+    path.write_text(json.dumps({"python": platform.python_version(), "results": results}, indent=2) + "\n")
+
+def load(path: Path) -> dict[str, float]:
+    return json.loads(path.read_text())["results"] if path.exists() else {}
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    """Returns the names of the benchmarks slower than the baseline by more than threshold."""
+    regressions = []
+    for name, ns in results.items():
+        if name not in baseline:
+            continue
+        change = ns / baseline[name] - 1
+        if change > threshold:
+            regressions.append(name)
+    return regressions
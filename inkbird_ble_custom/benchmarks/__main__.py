@@ -0,0 +1,44 @@
+import argparse
+from pathlib import Path
+import sys
+
+from . import BENCHMARKS, DEFAULT_BASELINE, DEFAULT_THRESHOLD, compare, load, run, save
+from . import bench_parser, bench_rolling, bench_coordinator  # noqa: F401, registers the benchmarks
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m inkbird_ble_custom.benchmarks")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that fails the run (default: %(default)s)")
+    parser.add_argument("--filter", help="only run benchmarks containing this text")
+    args = parser.parse_args()
+
+    results = run(args.filter)
+    skipped = [name for name in BENCHMARKS if name not in results and (not args.filter or args.filter in name)]
+    baseline = {} if args.save else load(args.baseline)
+
+    width = max(map(len, results), default=0)
+    for name, ns in results.items():
+        line = f"{name:<{width}}  {ns:>10.0f} ns"
+        if name in baseline:
+            line += f"  {(ns / baseline[name] - 1) * 100:+6.1f} %"
+        print(line)
+    for name in skipped:
+        print(f"{name:<{width}}  skipped")
+
+    if args.save:
+        save(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if not baseline:
+        print("No baseline to compare against, record one with --save")
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import tempfile
+
+from ..parser import DEVICE_FIELD, InkbirdIamT1Device
+from ..simulator import InkbirdSimulatedDevice, SimulatedBleakClient
+from . import benchmark
+
+# One listener per entity of a device.
+_CONTEXTS = (
+    DEVICE_FIELD.TEMPERATURE,
+    DEVICE_FIELD.HUMIDITY,
+    DEVICE_FIELD.CO2,
+    DEVICE_FIELD.ATMOSPHERIC_PRESSURE,
+    DEVICE_FIELD.ALARM_MODE,
+    DEVICE_FIELD.SAMPLING_INTERVAL,
+)
+
+@benchmark("coordinator notification -> listeners")
+def _notification_fan_out():
+    """_notification_handler followed by the coalesced listener fan-out, for a sensor frame."""
+    try:
+        from homeassistant.core import HomeAssistant
+        from ...coordinator import InkbirdCoordinator
+        from ...hub import InkbirdHub
+        from ...scheduler import InkbirdScheduler
+    except ImportError:
+        # Needs Home Assistant, and to be run from within the integration package.
+        return None
+
+    async def async_create():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.benchmark")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "benchmark"))
+        simulated = InkbirdSimulatedDevice("AA:BB:CC:DD:EE:FF")
+        return InkbirdCoordinator(
+            hass, logger, "inkbird", InkbirdIamT1Device(address=simulated.address), hub,
+            client_factory=lambda address, **kwargs: SimulatedBleakClient(address, device=simulated, **kwargs),
+        ), simulated
+
+    loop = asyncio.new_event_loop()
+    coordinator, simulated = loop.run_until_complete(async_create())
+    hub = coordinator.hub
+    for context in _CONTEXTS:
+        coordinator.async_add_listener(lambda: None, context)
+    frames = [bytearray(frame) for frame in simulated.sensor_frames(2)]
+    state = [0]
+    calls = [0]
+
+    def operation():
+        state[0] ^= 1
+        coordinator._notification_handler(0, frames[state[0]])
+        # The loop doesn't run, dispatch in place of the scheduled call.
+        hub._dispatch_handle.cancel()
+        hub._async_dispatch_updates()
+        calls[0] += 1
+        if not calls[0] % 1024:
+            # Cancelled handles stay scheduled until the loop runs.
+            loop.run_until_complete(asyncio.sleep(0))
+    return operation
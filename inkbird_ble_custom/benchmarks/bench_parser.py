@@ -0,0 +1,89 @@
+from ..parser import (
+    ALARM_MODE,
+    InkbirdIamT1Device,
+    InkbirdNotification,
+    READING,
+    SAMPLING_INTERVAL,
+    TEMPERATURE_UNIT,
+)
+from ..framing import InkbirdFrameDecoder
+from ..simulator import InkbirdSimulatedDevice
+from . import benchmark
+
+_SIMULATED = InkbirdSimulatedDevice("AA:BB:CC:DD:EE:FF", history_samples=7)
+
+FRAMES = {
+    "sensor": _SIMULATED.sensor_frame(),
+    "sampling_interval": InkbirdNotification.create_response(SAMPLING_INTERVAL.FIVE),
+    "co2_limits": _SIMULATED.settings_frames()[1],
+    "alarm_mode": InkbirdNotification.create_response(ALARM_MODE.ONCE),
+    "temperature_unit": InkbirdNotification.create_response(TEMPERATURE_UNIT.CELSIUS),
+    "history": next(_SIMULATED.history_frames()),
+    "unknown": bytes.fromhex("55aa0e0600000013"),
+}
+
+def _register_update(name: str, frame: bytes, unit: TEMPERATURE_UNIT):
+    @benchmark(name)
+    def factory():
+        device = InkbirdIamT1Device(temperature_unit=unit)
+        notification = bytearray(frame)
+        return lambda: device.update(notification)
+
+for frame_type, frame in FRAMES.items():
+    _register_update(f"update[{frame_type}]", frame, TEMPERATURE_UNIT.CELSIUS)
+_register_update("update[sensor, fahrenheit]", FRAMES["sensor"], TEMPERATURE_UNIT.FAHRENHEIT)
+
+@benchmark("update[sensor, changing values]")
+def _update_changing():
+    device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    frames = [bytearray(frame) for frame in _SIMULATED.sensor_frames(2)]
+    state = [0]
+    def operation():
+        state[0] ^= 1
+        device.update(frames[state[0]])
+    return operation
+
+@benchmark("InkbirdNotification.parse")
+def _parse():
+    notification = bytearray(FRAMES["alarm_mode"])
+    return lambda: InkbirdNotification.parse(ALARM_MODE, notification)
+
+@benchmark("InkbirdNotification.create_response")
+def _create_response():
+    return lambda: InkbirdNotification.create_response(SAMPLING_INTERVAL.TEN)
+
+@benchmark("InkbirdIamT1Device.from_dict")
+def _from_dict():
+    data = {
+        "manufacturer": "INKBIRD",
+        "sw_version": "YBWY02-V1.0",
+        "model": "Ink@IAM-T1",
+        "address": "AA:BB:CC:DD:EE:FF",
+        "alarm_mode": ALARM_MODE.ONCE.value,
+        "sampling_interval": SAMPLING_INTERVAL.ONE.value,
+        "temperature_unit": TEMPERATURE_UNIT.CELSIUS.value,
+    }
+    return lambda: InkbirdIamT1Device.from_dict(dict(data))
+
+@benchmark("InkbirdIamT1Device.reading")
+def _reading():
+    device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    device.update(FRAMES["sensor"])
+    reading = READING.TEMPERATURE
+    return lambda: device.reading(reading)
+
+@benchmark("InkbirdFrameDecoder.feed[sensor]")
+def _feed():
+    decoder = InkbirdFrameDecoder()
+    notification = bytearray(FRAMES["sensor"])
+    return lambda: decoder.feed(notification)
+
+@benchmark("InkbirdFrameDecoder.feed[split history]")
+def _feed_split():
+    decoder = InkbirdFrameDecoder()
+    frame = FRAMES["history"]
+    halves = (bytearray(frame[:len(frame) // 2]), bytearray(frame[len(frame) // 2:]))
+    def operation():
+        decoder.feed(halves[0])
+        decoder.feed(halves[1])
+    return operation
@@ -0,0 +1,24 @@
+from ..parser import InkbirdIamT1Device, READING, TEMPERATURE_UNIT
+from ..rolling import InkbirdRollingStats
+from ..simulator import InkbirdSimulatedDevice
+from . import benchmark
+
+@benchmark("InkbirdRollingStats.push")
+def _push():
+    simulated = InkbirdSimulatedDevice("AA:BB:CC:DD:EE:FF")
+    device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    device.update(simulated.sensor_frame())
+    # Full windows, so every push also drops a sample.
+    stats = InkbirdRollingStats(capacity=64)
+    timestamp = [0.0]
+    def operation():
+        timestamp[0] += 1
+        device.updated[READING.TEMPERATURE] = timestamp[0]
+        device.values[READING.CO2] = int(timestamp[0]) % 97
+        stats.push(device)
+    return operation
+
+@benchmark("InkbirdRollingStats.mean")
+def _mean():
+    stats = InkbirdRollingStats()
+    return lambda: stats.mean(READING.CO2)
@@ -0,0 +1,160 @@
+"""
+Capture of the raw notifications of devices, and their replay.
+
+A capture file starts with CAPTURE_MAGIC, followed by one record per notification:
+    <monotonic timestamp (float64)> <address (6B)> <length (uint16)> <notification>
+with little endian values. Replaying a capture reproduces field issues offline with real traffic:
+
+    python -m inkbird_ble_custom.capture inkbird_capture.bin [--profile]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable, Iterable, Iterator
+import os
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+from .framing import InkbirdFrameDecoder
+from .metrics import InkbirdDeviceMetrics
+from .parser import InkbirdIamT1Device
+
+CAPTURE_MAGIC = b"INKCAP\x01\x00"
+
+_RECORD_HEADER = struct.Struct("<d6sH")
+
+
+class CapturedNotification(NamedTuple):
+    # time.monotonic() when it was received
+    timestamp: float
+    address: str
+    data: bytes
+
+
+def _pack_address(address: str) -> bytes:
+    return bytes.fromhex(address.replace(":", ""))
+
+
+def _unpack_address(address: bytes) -> str:
+    return ":".join(f"{byte:02X}" for byte in address)
+
+
+class InkbirdCapture:
+    """
+    Collects notifications in memory, cheap enough to call for every notification.
+    flush does the blocking write, run it in an executor every few seconds while capturing.
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = path
+        self.notifications = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def record(self, address: str, data: bytes | bytearray, timestamp: float | None = None) -> None:
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            self._buffer += _RECORD_HEADER.pack(timestamp, _pack_address(address), len(data))
+            self._buffer += data
+        self.notifications += 1
+
+    def flush(self) -> None:
+        """Append the collected notifications to the file."""
+        with self._lock:
+            data, self._buffer = self._buffer, bytearray()
+        if not data:
+            return
+        with open(self.path, "ab") as file:
+            if file.tell() == 0:
+                file.write(CAPTURE_MAGIC)
+            file.write(data)
+
+
+def read_capture(path: str | os.PathLike) -> Iterator[CapturedNotification]:
+    """The notifications of a capture file in the order they were received. A truncated last record is ignored."""
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(CAPTURE_MAGIC):
+        raise ValueError(f"{path} is not a capture file")
+    offset = len(CAPTURE_MAGIC)
+    while offset + _RECORD_HEADER.size <= len(data):
+        timestamp, address, length = _RECORD_HEADER.unpack_from(data, offset)
+        offset += _RECORD_HEADER.size
+        if offset + length > len(data):
+            break
+        yield CapturedNotification(timestamp, _unpack_address(address), data[offset:offset + length])
+        offset += length
+
+
+async def async_replay(
+    notifications: Iterable[CapturedNotification],
+    handler: Callable[[CapturedNotification], None],
+    speed: float | None = None,
+) -> int:
+    """
+    Pass the notifications to handler, as fast as possible or speed times as fast as they were received.
+    Returns the number of notifications.
+    """
+    count = 0
+    started = time.monotonic()
+    first: float | None = None
+    for notification in notifications:
+        if speed is not None:
+            if first is None:
+                first = notification.timestamp
+            delay = (notification.timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        handler(notification)
+        count += 1
+    return count
+
+
+def replay_devices(notifications: Iterable[CapturedNotification]) -> dict[str, tuple[InkbirdIamT1Device, InkbirdDeviceMetrics]]:
+    """Apply the notifications to a device per address, the way the coordinator does."""
+    devices: dict[str, tuple[InkbirdIamT1Device, InkbirdDeviceMetrics, InkbirdFrameDecoder]] = {}
+    for notification in notifications:
+        entry = devices.get(notification.address)
+        if entry is None:
+            metrics = InkbirdDeviceMetrics()
+            entry = devices[notification.address] = (
+                InkbirdIamT1Device(address=notification.address),
+                metrics,
+                InkbirdFrameDecoder(metrics),
+            )
+        device, metrics, decoder = entry
+        for frame in decoder.feed(notification.data):
+            started = time.perf_counter_ns()
+            device.update(frame)
+            metrics.record_frame(frame[2], time.perf_counter_ns() - started)
+    return {address: (device, metrics) for address, (device, metrics, _) in devices.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="capture file")
+    parser.add_argument("--profile", action="store_true", help="print the cProfile stats of the replay")
+    args = parser.parse_args()
+
+    notifications = list(read_capture(args.path))
+    if args.profile:
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        devices = profiler.runcall(replay_devices, notifications)
+        pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(15)
+    else:
+        devices = replay_devices(notifications)
+
+    print(f"{len(notifications)} notifications of {len(devices)} devices")
+    for address, (device, metrics) in devices.items():
+        print(f"{address}: {device.as_dict()}")
+        print(f"    {metrics.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Headless collector of the readings of many devices, without Home Assistant.
+
+    python -m inkbird_ble_custom.collector AA:BB:CC:DD:EE:FF 11:22:33:44:55:66 [--output readings.ndjson]
+
+Every sensor update is written as one JSON object per line. At most max_connections devices are connected at the same
+time: as long as there is a connection for every device they stay connected, otherwise the devices take turns,
+connecting once per sampling interval for a single sensor update.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable, Iterable
+import json
+import logging
+import random
+import sys
+import time
+from typing import IO, Any
+
+from .const import (
+    CHAR_NOTIFY_UUID,
+    CHAR_WRITE_UUID,
+    CONNECT_WRITE_DATA,
+    RECONNECT_BACKOFF_MAX,
+    RECONNECT_BACKOFF_MIN,
+    SENSOR_FRAME_TYPE,
+    WATCHDOG_INTERVALS,
+)
+from .framing import InkbirdFrameDecoder
+from .parser import READING, InkbirdIamT1Device
+
+_LOGGER = logging.getLogger(__name__)
+
+# Connections held at the same time, most adapters have only a few slots.
+MAX_CONNECTIONS = 3
+# Give up on a connect after this long (seconds).
+CONNECT_TIMEOUT = 30
+# Devices taking turns disconnect if no sensor update arrived for this long after connecting (seconds).
+COLLECT_TIMEOUT = 15
+
+
+def reading_record(device: InkbirdIamT1Device) -> dict[str, Any]:
+    """The current readings of a device, unknown ones are left out."""
+    record: dict[str, Any] = {
+        "address": device.address,
+        "timestamp": round(max(device.updated), 3),
+    }
+    for reading in READING:
+        value = device.reading(reading)
+        if value is not None:
+            record[reading.name.lower()] = value
+    return record
+
+
+def ndjson_sink(stream: IO[str]) -> Callable[[dict[str, Any]], None]:
+    def write(record: dict[str, Any]) -> None:
+        stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        stream.flush()
+
+    return write
+
+
+class InkbirdCollector:
+    def __init__(
+        self,
+        addresses: Iterable[str],
+        sink: Callable[[dict[str, Any]], None],
+        max_connections: int = MAX_CONNECTIONS,
+        client_factory: Callable[..., Any] | None = None,
+        interval: float | None = None,
+    ):
+        """
+        sink:           called with the reading_record of every sensor update.
+        client_factory: creates the client for an address, BleakClient by default.
+        interval:       seconds between the turns of a device, defaults to its sampling interval.
+        """
+        self.addresses = list(dict.fromkeys(address.upper() for address in addresses))
+        self.devices = {address: InkbirdIamT1Device(address=address) for address in self.addresses}
+        self._sink = sink
+        self._slots = asyncio.Semaphore(max_connections)
+        # Turns are only needed if there are more devices than connections.
+        self._hold = len(self.addresses) <= max_connections
+        self._client_factory = client_factory
+        self._interval = interval
+
+    async def async_run(self) -> None:
+        """Collect until cancelled."""
+        await asyncio.gather(*(self._async_run_device(self.devices[address]) for address in self.addresses))
+
+    def _sampling_seconds(self, device: InkbirdIamT1Device) -> float:
+        if self._interval is not None:
+            return self._interval
+        return device.sampling_interval.value * 60 if device.sampling_interval is not None else 60
+
+    def _create_client(self, address: str, disconnected_callback: Callable[[Any], None]) -> Any:
+        if self._client_factory is not None:
+            return self._client_factory(address, disconnected_callback=disconnected_callback)
+        from bleak import BleakClient
+
+        return BleakClient(address, disconnected_callback=disconnected_callback)
+
+    async def _async_run_device(self, device: InkbirdIamT1Device) -> None:
+        failures = 0
+        while True:
+            started = time.monotonic()
+            try:
+                async with self._slots:
+                    healthy = await self._async_connection(device)
+            except Exception as e:
+                _LOGGER.warning("Connection to %s failed: %s", device.address, e or type(e).__name__)
+                healthy = False
+
+            if not healthy:
+                failures += 1
+                delay = min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_MIN * 2 ** (failures - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1))
+                continue
+            failures = 0
+            if not self._hold:
+                await asyncio.sleep(max(0, started + self._sampling_seconds(device) - time.monotonic()))
+
+    async def _async_connection(self, device: InkbirdIamT1Device) -> bool:
+        """Connect once, either for a single sensor update or until the connection drops. Returns whether it was healthy."""
+        sensor_update = asyncio.Event()
+        disconnected = asyncio.Event()
+        decoder = InkbirdFrameDecoder()
+
+        def on_notification(_: int, data: bytearray) -> None:
+            for frame in decoder.feed(data):
+                device.update(frame)
+                if frame[2] == SENSOR_FRAME_TYPE:
+                    self._sink(reading_record(device))
+                    sensor_update.set()
+
+        client = self._create_client(device.address, lambda _: disconnected.set())
+        try:
+            # A connect that fails or times out half way still has to be cleaned up.
+            async with asyncio.timeout(CONNECT_TIMEOUT):
+                await client.connect()
+            await client.start_notify(CHAR_NOTIFY_UUID, on_notification)
+            # Leads to the current state being notified.
+            await client.write_gatt_char(CHAR_WRITE_UUID, CONNECT_WRITE_DATA)
+            if not self._hold:
+                async with asyncio.timeout(COLLECT_TIMEOUT):
+                    await sensor_update.wait()
+                return True
+            _LOGGER.info("Connected to %s", device.address)
+            # A connection that drops before delivering anything counts as failed.
+            received = False
+            while True:
+                watchdog = WATCHDOG_INTERVALS * self._sampling_seconds(device)
+                done, pending = await asyncio.wait(
+                    [asyncio.ensure_future(sensor_update.wait()), asyncio.ensure_future(disconnected.wait())],
+                    timeout=watchdog,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in pending:
+                    task.cancel()
+                if sensor_update.is_set():
+                    received = True
+                    sensor_update.clear()
+                if disconnected.is_set():
+                    _LOGGER.info("%s disconnected", device.address)
+                    return received
+                if not done:
+                    _LOGGER.warning("No data from %s for %.0f s", device.address, watchdog)
+                    return False
+        finally:
+            if client.is_connected:
+                await client.disconnect()
+
+
+def _read_addresses(path: str) -> list[str]:
+    """One address per line, # starts a comment."""
+    with open(path) as file:
+        return [line.split("#", 1)[0].strip() for line in file if line.split("#", 1)[0].strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("addresses", nargs="*", help="Bluetooth addresses of the devices")
+    parser.add_argument("--devices", help="file with one address per line")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--output", help="append the readings to this file instead of printing them")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, stream=sys.stderr)
+
+    addresses = list(args.addresses)
+    if args.devices:
+        addresses += _read_addresses(args.devices)
+    if not addresses:
+        parser.error("no devices given")
+
+    output = open(args.output, "a") if args.output else sys.stdout
+    collector = InkbirdCollector(addresses, ndjson_sink(output), args.max_connections)
+    try:
+        asyncio.run(collector.async_run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Queue of the settings written to a device.
+
+Writes are serialised, a setting selected again before it was written only writes the last value.
+The new value is shown right away and confirmed by the notification the device answers a write with. Only a
+notification of the written value confirms it, not e.g. the stale state notified after connecting.
+If the write fails or isn't answered within COMMAND_TIMEOUT, the last value notified by the device is restored.
+"""
+from __future__ import annotations
+
+import asyncio
+from logging import Logger
+import time
+from typing import Any, Awaitable, Callable, Coroutine
+
+from .metrics import InkbirdDeviceMetrics
+from .parser import DEVICE_FIELD, InkbirdIamT1Device
+
+# Connecting, writing a setting and the notification the device answers with take at most this long (seconds).
+COMMAND_TIMEOUT = 60
+
+# Frame type notifying each setting. Plain ints for the notification path.
+SETTING_FRAME_TYPES = {
+    0x02: DEVICE_FIELD.SAMPLING_INTERVAL.value,
+    0x04: DEVICE_FIELD.ALARM_MODE.value,
+}
+
+_SETTING_ATTRIBUTES = {
+    DEVICE_FIELD.SAMPLING_INTERVAL.value: "sampling_interval",
+    DEVICE_FIELD.ALARM_MODE.value: "alarm_mode",
+}
+
+
+class _Command:
+    __slots__ = ("field", "value", "answer")
+
+    def __init__(self, field: int, value: Any, answer: asyncio.Future[Any]):
+        self.field = field
+        self.value = value
+        # The value the device notified after the write
+        self.answer = answer
+
+
+class InkbirdCommandQueue:
+    def __init__(
+        self,
+        logger: Logger,
+        device: InkbirdIamT1Device,
+        write: Callable[[Any], Awaitable[None]],
+        on_change: Callable[[int], None],
+        metrics: InkbirdDeviceMetrics | None = None,
+        timeout: float = COMMAND_TIMEOUT,
+        create_task: Callable[[Coroutine[Any, Any, None], str], asyncio.Task] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        write:        writes a setting value to the device, e.g. once it is connected.
+        on_change:    called with the DEVICE_FIELD of a setting whose shown value changed.
+        create_task:  starts the writes with a name, e.g. hass.async_create_background_task. Defaults to the loop.
+        clock:        times the writes for the metrics.
+        """
+        self.logger = logger
+        self._device = device
+        self._write = write
+        self._on_change = on_change
+        self._metrics = metrics
+        self._timeout = timeout
+        self._create_task = create_task
+        self._clock = clock
+        # Latest value per setting, in the order they were selected
+        self._queued: dict[int, Any] = {}
+        self._current: _Command | None = None
+        # Last value notified by the device per setting, restored if a write fails
+        self._confirmed: dict[int, Any] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._queued) + (self._current is not None)
+
+    def async_set(self, field: DEVICE_FIELD, value: Any) -> None:
+        """Show value right away and write it in the background."""
+        field = int(field)
+        attribute = _SETTING_ATTRIBUTES[field]
+        if field not in self._confirmed and not self._has_command(field):
+            self._confirmed[field] = getattr(self._device, attribute)
+        self._queued.pop(field, None)
+        self._queued[field] = value
+        if getattr(self._device, attribute) is not value:
+            setattr(self._device, attribute, value)
+            self._on_change(field)
+        if self._task is None:
+            if self._create_task is None:
+                self._task = asyncio.get_running_loop().create_task(self._async_run())
+            else:
+                self._task = self._create_task(self._async_run(), f"{self._device.address} settings")
+
+    def async_notified(self, field: int) -> bool:
+        """
+        The device notified a setting, which is already applied to the device.
+        Returns whether the value still to be written is shown instead.
+        """
+        attribute = _SETTING_ATTRIBUTES[field]
+        value = getattr(self._device, attribute)
+        self._confirmed[field] = value
+        current = self._current
+        if current is not None and current.field == field:
+            if value is current.value:
+                # The answer, it may be notified before the write returns.
+                if not current.answer.done():
+                    current.answer.set_result(value)
+            else:
+                # e.g. the state notified after connecting, which the write hasn't changed yet
+                setattr(self._device, attribute, current.value)
+                return True
+        if field in self._queued:
+            setattr(self._device, attribute, self._queued[field])
+            return True
+        return False
+
+    async def async_stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._queued.clear()
+        self._current = None
+
+    def _has_command(self, field: int) -> bool:
+        return field in self._queued or (self._current is not None and self._current.field == field)
+
+    async def _async_run(self) -> None:
+        try:
+            while self._queued:
+                field = next(iter(self._queued))
+                command = _Command(field, self._queued.pop(field), asyncio.get_running_loop().create_future())
+                self._current = command
+                try:
+                    await self._async_execute(command)
+                finally:
+                    self._current = None
+        finally:
+            self._task = None
+
+    async def _async_execute(self, command: _Command) -> None:
+        attribute = _SETTING_ATTRIBUTES[command.field]
+        started = self._clock()
+        try:
+            # One deadline for the whole command, the device may have to be reconnected first.
+            async with asyncio.timeout(self._timeout):
+                await self._write(command.value)
+                await command.answer
+        except Exception as e:
+            self.logger.warning("Failed to write %s %s: %s", attribute, command.value, e or type(e).__name__)
+            self._rollback(command.field)
+            return
+
+        if self._metrics is not None:
+            self._metrics.record_write(attribute, self._clock() - started)
+
+    def _rollback(self, field: int) -> None:
+        if field in self._queued:
+            # A newer value is about to be written.
+            return
+        attribute = _SETTING_ATTRIBUTES[field]
+        confirmed = self._confirmed.get(field)
+        if getattr(self._device, attribute) is not confirmed:
+            setattr(self._device, attribute, confirmed)
+            self._on_change(field)
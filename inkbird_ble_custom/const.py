@@ -4,3 +4,13 @@ CHAR_NOTIFY_UUID    = "0000ffe4-0000-1000-8000-00805f9b34fb"
 CHAR_WRITE_UUID     = "0000ffe9-0000-1000-8000-00805f9b34fb"
 # Signal to device to enter the "connected" state.
 CONNECT_WRITE_DATA  = b"\x55\xaa\x09\x06\x01\x0f"
+# Request the whole co2 history. It is notified in frames of type HISTORY_FRAME_TYPE.
+HISTORY_WRITE_DATA  = b"\x55\xaa\x07\x06\x00\x0c"
+
+# Frame type of the sensor data.
+SENSOR_FRAME_TYPE   = 0x01
+# Reconnect if a connected device did not send sensor data for this many sampling intervals.
+WATCHDOG_INTERVALS  = 2.5
+# Bounds of the exponential backoff between failed connection attempts (seconds).
+RECONNECT_BACKOFF_MIN = 1
+RECONNECT_BACKOFF_MAX = 300
@@ -0,0 +1,64 @@
+"""
+Filter of the reading changes that are published to the entities.
+
+A reading is published when it moved at least its deadband away from the last published value, but not more often
+than its minimum interval. A reading that changed less is still published once it has been silent for the heartbeat,
+so charts don't show a stale value for long.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+
+from .parser import READING, READING_SCALE, InkbirdIamT1Device
+
+# Changes are published at least this often (seconds).
+HEARTBEAT = 15 * 60
+
+
+class InkbirdReadingFilter:
+    def __init__(
+        self,
+        deadband: Sequence[float] = (0, 0, 0, 0),
+        min_interval: Sequence[float] = (0, 0, 0, 0),
+        heartbeat: float = HEARTBEAT,
+    ):
+        """deadband and min_interval are indexed by READING, in the units of InkbirdIamT1Device.reading and seconds."""
+        self.heartbeat = heartbeat
+        # In READING_SCALE units
+        self._deadband = array("i", (round(deadband[reading] * READING_SCALE[reading]) for reading in READING))
+        self._min_interval = array("d", min_interval)
+        self._published = array("i", bytes(4 * len(READING)))
+        self._published_at = array("d", bytes(8 * len(READING)))
+        # DEVICE_FIELD flags of the readings with a published value
+        self._known = 0
+
+    def apply(self, device: InkbirdIamT1Device, changed: int) -> int:
+        """The DEVICE_FIELD flags of changed, without the reading changes that aren't worth publishing yet."""
+        valid = device.valid
+        values = device.values
+        updated = device.updated
+        for index in range(len(READING)):
+            flag = 1 << index
+            if not valid & flag:
+                # Becoming unknown is always published.
+                self._known &= ~flag
+                continue
+            value = values[index]
+            if not self._known & flag:
+                self._known |= flag
+                self._published[index] = value
+                self._published_at[index] = updated[index]
+                continue
+            difference = abs(value - self._published[index])
+            if difference == 0:
+                changed &= ~flag
+                continue
+            elapsed = updated[index] - self._published_at[index]
+            if (difference >= self._deadband[index] and elapsed >= self._min_interval[index]) or elapsed >= self.heartbeat:
+                changed |= flag
+                self._published[index] = value
+                self._published_at[index] = updated[index]
+            else:
+                changed &= ~flag
+        return changed
@@ -0,0 +1,137 @@
+"""
+Framing of the data notified by and written to a device.
+
+Every frame has the layout
+    55 aa <type> <length> <payload>... <checksum>
+where length is the length of the whole frame and checksum the sum of all preceding bytes, modulo 256.
+That sum doesn't hold for every captured frame: the Fahrenheit sensor frame 55aa011010031e027605ea03f101008d sums
+to 9d, 10 more than its checksum, which is the flag in its first payload byte. Until the rule is confirmed, frames
+whose length lines up are kept despite a checksum mismatch and only counted.
+A notification usually holds exactly one frame, but may hold several or only part of one, e.g. during a history dump.
+"""
+from __future__ import annotations
+
+from .metrics import InkbirdDeviceMetrics
+
+FRAME_HEADER = b"\x55\xaa"
+# Header, type, length and checksum
+FRAME_MIN_LENGTH = 5
+
+
+def checksum(data: bytes | bytearray | memoryview) -> int:
+    return sum(data) & 0xff
+
+
+def build_frame(frame_type: int, payload: bytes) -> bytes:
+    """Frame a payload: 55aa, type, total length, payload and the sum of all bytes as checksum."""
+    frame = FRAME_HEADER + bytes([frame_type, len(payload) + FRAME_MIN_LENGTH]) + payload
+    return frame + bytes([checksum(frame)])
+
+
+class InkbirdFrameDecoder:
+    """
+    Split notifications into validated frames.
+    Frames are returned as memoryviews of the notification, only a frame split across notifications is copied.
+    Frames with a wrong length are skipped and the decoder resynchronises on the next header. A wrong checksum only
+    skips the frame if its length doesn't line up with the end of the data or the next header either.
+    """
+
+    def __init__(self, metrics: InkbirdDeviceMetrics | None = None):
+        self._metrics = metrics
+        # Start of a frame whose remainder is expected with the next notification
+        self._partial = b""
+        self.frames = 0
+        self.corrupt_frames = 0
+        # Frames kept despite a checksum mismatch
+        self.checksum_mismatches = 0
+        # Bytes outside of any frame
+        self.skipped_bytes = 0
+
+    def reset(self) -> None:
+        """Forget a partial frame, e.g. after a reconnect."""
+        self._partial = b""
+
+    def feed(self, notification: bytes | bytearray) -> list[memoryview]:
+        """
+        The complete frames of a notification, including the one it completes.
+        The frames may share the buffer of notification, don't modify it while they are used.
+        """
+        size = len(notification)
+        if (
+            not self._partial
+            and size >= FRAME_MIN_LENGTH
+            and notification[3] == size
+            and notification.startswith(FRAME_HEADER)
+        ):
+            # Exactly one frame, by far the most common case.
+            if sum(notification[:-1]) & 0xff != notification[-1]:
+                self._mismatch()
+            self.frames += 1
+            return [memoryview(notification)]
+
+        data = self._partial + notification if self._partial else notification
+        self._partial = b""
+        view = memoryview(data)
+        size = len(data)
+        frames = []
+        offset = 0
+        # The bytes after a corrupt frame's header are part of that frame, not skipped ones.
+        resync = False
+        while offset < size:
+            if not data.startswith(FRAME_HEADER, offset):
+                start = data.find(FRAME_HEADER, offset + 1)
+                if start < 0:
+                    # Keep a trailing 55, it may start the next frame.
+                    start = size - 1 if data[-1] == FRAME_HEADER[0] else size
+                if not resync:
+                    self._skip(start - offset)
+                resync = False
+                if start == size - 1:
+                    self._partial = bytes(view[start:])
+                    break
+                offset = start
+                continue
+            if size - offset < 4:
+                self._partial = bytes(view[offset:])
+                break
+            length = data[offset + 3]
+            if length < FRAME_MIN_LENGTH:
+                self._corrupt()
+                offset += 1
+                resync = True
+                continue
+            if size - offset < length:
+                self._partial = bytes(view[offset:])
+                break
+            end = offset + length - 1
+            if sum(data[offset:end]) & 0xff != data[end]:
+                # Followed by nothing, a header or the start of one
+                following = bytes(view[end + 1:end + 1 + len(FRAME_HEADER)])
+                if not FRAME_HEADER.startswith(following):
+                    # The length may be corrupt as well, look for the next header within the frame.
+                    self._corrupt()
+                    offset += 1
+                    resync = True
+                    continue
+                self._mismatch()
+            frames.append(view[offset:offset + length])
+            offset += length
+        self.frames += len(frames)
+        return frames
+
+    def _skip(self, count: int) -> None:
+        if count <= 0:
+            return
+        self.skipped_bytes += count
+        if self._metrics is not None:
+            self._metrics.dropped_frames += 1
+
+    def _mismatch(self) -> None:
+        self.checksum_mismatches += 1
+        if self._metrics is not None:
+            self._metrics.checksum_mismatches += 1
+
+    def _corrupt(self) -> None:
+        self.corrupt_frames += 1
+        if self._metrics is not None:
+            self._metrics.corrupt_frames += 1
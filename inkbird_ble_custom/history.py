@@ -0,0 +1,140 @@
+"""
+Decoder for the co2 history dump.
+
+History frames are notified at the same characteristic as all other frames and are expected to have the layout
+    55 aa 07 <length> <frame index (2B)> <frame count (2B)> <co2 (2B)>... <checksum>
+with big endian values. The samples are sent newest first, one per sampling interval,
+the first one being the most recent measurement.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import struct
+from typing import Any, Callable
+
+HISTORY_FRAME_TYPE = 0x07
+
+# Number of finished hours handed out at once. One batch equals one bulk insert into the statistics.
+HISTORY_BATCH_HOURS = 24 * 7
+
+_HISTORY_HEADER = struct.Struct(">HH")
+_HISTORY_HEADER_OFFSET = 4
+_HISTORY_SAMPLES_OFFSET = _HISTORY_HEADER_OFFSET + _HISTORY_HEADER.size
+_CO2_SAMPLE = struct.Struct(">H")
+
+_HOUR = 3600
+
+
+class InkbirdHistoryDecoder:
+    """
+    Incrementally decode history frames into hourly statistics (start, mean, min, max).
+    Only the hour currently being aggregated and one batch of finished hours are kept in memory,
+    regardless of how many samples the device holds.
+    """
+
+    def __init__(
+        self,
+        end: float,
+        interval: float,
+        batch_hours: int = HISTORY_BATCH_HOURS,
+        on_sample: Callable[[float, int], None] | None = None,
+    ):
+        """
+        end:        timestamp of the newest sample, i.e. when the dump was requested.
+        interval:   seconds between two samples (the sampling interval of the device).
+        on_sample:  called with the timestamp and co2 value of every sample, including the current hour.
+        """
+        self._end = end
+        self._on_sample = on_sample
+        self._interval = interval
+        self._batch_hours = batch_hours
+        # The current hour is still being recorded and is left to the recorder.
+        self._cutoff = end - end % _HOUR
+
+        self._next_frame = 0
+        self._frame_count: int | None = None
+        self._samples_per_frame = 0
+        self._sample_index = 0
+
+        self._hour: float | None = None
+        self._sum = 0
+        self._count = 0
+        self._min = 0
+        self._max = 0
+        self._batch: list[dict[str, Any]] = []
+
+        self.samples = 0
+        self.missed_frames = 0
+
+    @property
+    def done(self) -> bool:
+        """Whether the last frame of the dump has been received."""
+        return self._frame_count is not None and self._next_frame >= self._frame_count
+
+    def feed(self, notification: bytes | bytearray) -> list[dict[str, Any]] | None:
+        """Decode a history frame. Returns a batch of finished hours once it is full."""
+        if len(notification) <= _HISTORY_SAMPLES_OFFSET:
+            return None
+        frame_index, frame_count = _HISTORY_HEADER.unpack_from(notification, _HISTORY_HEADER_OFFSET)
+        if frame_index < self._next_frame:
+            # Repeated frame
+            return None
+        if frame_index > self._next_frame:
+            # Keep the timestamps of the following samples aligned by skipping the lost ones.
+            missed = frame_index - self._next_frame
+            self.missed_frames += missed
+            self._sample_index += missed * self._samples_per_frame
+        self._next_frame = frame_index + 1
+        self._frame_count = frame_count
+
+        # Everything between the header and the trailing checksum byte.
+        sample_bytes = (len(notification) - _HISTORY_SAMPLES_OFFSET - 1) & ~1
+        samples = memoryview(notification)[_HISTORY_SAMPLES_OFFSET:_HISTORY_SAMPLES_OFFSET + sample_bytes]
+        self._samples_per_frame = sample_bytes // 2
+        for (co2,) in _CO2_SAMPLE.iter_unpack(samples):
+            self._add(self._end - self._sample_index * self._interval, co2)
+            self._sample_index += 1
+        self.samples += self._samples_per_frame
+
+        if len(self._batch) >= self._batch_hours:
+            return self._take_batch()
+        return None
+
+    def flush(self) -> list[dict[str, Any]]:
+        """Finish the hour being aggregated and return all remaining hours."""
+        self._close_hour()
+        self._hour = None
+        return self._take_batch()
+
+    def _add(self, timestamp: float, co2: int):
+        if self._on_sample is not None:
+            self._on_sample(timestamp, co2)
+        hour = timestamp - timestamp % _HOUR
+        if hour >= self._cutoff:
+            return
+        if hour != self._hour:
+            self._close_hour()
+            self._hour = hour
+            self._sum = self._min = self._max = co2
+            self._count = 1
+            return
+        self._sum += co2
+        self._count += 1
+        if co2 < self._min:
+            self._min = co2
+        elif co2 > self._max:
+            self._max = co2
+
+    def _close_hour(self):
+        if self._hour is None:
+            return
+        self._batch.append({
+            "start":    datetime.fromtimestamp(self._hour, timezone.utc),
+            "mean":     self._sum / self._count,
+            "min":      self._min,
+            "max":      self._max,
+        })
+
+    def _take_batch(self) -> list[dict[str, Any]]:
+        batch, self._batch = self._batch, []
+        return batch
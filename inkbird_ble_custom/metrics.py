@@ -0,0 +1,132 @@
+"""Operational metrics of a single device, cheap enough to be updated for every frame."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+
+class InkbirdDeviceMetrics:
+    __slots__ = (
+        "started",
+        "frames",
+        "unknown_frames",
+        "dropped_frames",
+        "corrupt_frames",
+        "checksum_mismatches",
+        "parse_ns",
+        "parse_ns_max",
+        "last_frame",
+        "connects",
+        "connect_latency",
+        "connect_latency_max",
+        "reconnects",
+        "windows",
+        "connected_since",
+        "connected_seconds",
+        "write_latency",
+        "writes",
+    )
+
+    def __init__(self):
+        self.started = time.monotonic()
+        # Frames per frame type
+        self.frames: dict[int, int] = {}
+        # Frames with a type the parser doesn't know
+        self.unknown_frames = 0
+        # Frames that are not even framed correctly
+        self.dropped_frames = 0
+        # Frames with a wrong length, or a wrong checksum that doesn't line up with the next frame
+        self.corrupt_frames = 0
+        # Frames kept despite a wrong checksum, see framing.py
+        self.checksum_mismatches = 0
+        self.parse_ns = 0
+        self.parse_ns_max = 0
+        # time.monotonic() of the last frame
+        self.last_frame: float | None = None
+
+        self.connects = 0
+        self.connect_latency: float | None = None
+        self.connect_latency_max = 0.0
+        self.reconnects = 0
+        self.windows = 0
+        self.connected_since: float | None = None
+        self.connected_seconds = 0.0
+
+        # Latency of the last write per setting
+        self.write_latency: dict[str, float] = {}
+        self.writes = 0
+
+    def record_frame(self, frame_type: int, parse_ns: int):
+        frames = self.frames
+        frames[frame_type] = frames.get(frame_type, 0) + 1
+        self.parse_ns += parse_ns
+        if parse_ns > self.parse_ns_max:
+            self.parse_ns_max = parse_ns
+        self.last_frame = time.monotonic()
+
+    def record_connected(self, latency: float):
+        self.connects += 1
+        self.connect_latency = latency
+        if latency > self.connect_latency_max:
+            self.connect_latency_max = latency
+        self.connected_since = time.monotonic()
+
+    def record_disconnected(self):
+        if self.connected_since is not None:
+            self.connected_seconds += time.monotonic() - self.connected_since
+            self.connected_since = None
+
+    def record_write(self, setting: str, latency: float):
+        self.writes += 1
+        self.write_latency[setting] = latency
+
+    @property
+    def total_frames(self) -> int:
+        return sum(self.frames.values())
+
+    @property
+    def mean_parse_us(self) -> float | None:
+        frames = self.total_frames
+        return self.parse_ns / frames / 1000 if frames else None
+
+    def uptime(self, now: float | None = None) -> float:
+        """Seconds connected in total."""
+        if self.connected_since is None:
+            return self.connected_seconds
+        now = time.monotonic() if now is None else now
+        return self.connected_seconds + now - self.connected_since
+
+    def duty_cycle_ratio(self, now: float | None = None) -> float:
+        """Share of the time the device has been connected."""
+        now = time.monotonic() if now is None else now
+        return self.uptime(now) / max(now - self.started, 1e-9)
+
+    def seconds_since_last_frame(self, now: float | None = None) -> float | None:
+        if self.last_frame is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return now - self.last_frame
+
+    def as_dict(self) -> dict[str, Any]:
+        now = time.monotonic()
+        last_frame = self.seconds_since_last_frame(now)
+        return {
+            "frames": {f"0x{frame_type:02x}": count for frame_type, count in sorted(self.frames.items())},
+            "unknown_frames": self.unknown_frames,
+            "dropped_frames": self.dropped_frames,
+            "corrupt_frames": self.corrupt_frames,
+            "checksum_mismatches": self.checksum_mismatches,
+            "mean_parse_us": None if self.mean_parse_us is None else round(self.mean_parse_us, 2),
+            "max_parse_us": round(self.parse_ns_max / 1000, 2),
+            "seconds_since_last_frame": None if last_frame is None else round(last_frame, 1),
+            "connects": self.connects,
+            "connect_latency_s": None if self.connect_latency is None else round(self.connect_latency, 3),
+            "max_connect_latency_s": round(self.connect_latency_max, 3),
+            "reconnects": self.reconnects,
+            "windows": self.windows,
+            "connected": self.connected_since is not None,
+            "uptime_s": round(self.uptime(now), 1),
+            "duty_cycle_ratio": round(self.duty_cycle_ratio(now), 4),
+            "writes": self.writes,
+            "write_latency_s": {setting: round(latency, 3) for setting, latency in self.write_latency.items()},
+        }
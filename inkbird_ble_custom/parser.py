@@ -1,24 +1,30 @@
+"""
+Protocol codec and device state of the IAM-T1.
+
+Only depends on the standard library, so it can be used without Home Assistant, e.g. by collectors and benchmarks.
+bleak and bluetooth_data_tools are imported when they are actually used. The mapping to Home Assistant
+entities lives in the platforms of the integration.
+"""
 from __future__ import annotations
 
+from array import array
+import asyncio
 from logging import Logger
 import logging
 import struct
+import time
 
-from bluetooth_data_tools import human_readable_name
-
-import dataclasses
-from typing import Any, Type
-
-from bleak import BleakClient, BleakError
-from bleak.backends.device import BLEDevice
+from typing import TYPE_CHECKING, Any, Type
 
-from enum import Enum
-
-from homeassistant.components.sensor import SensorDeviceClass
-from homeassistant.const import UnitOfTemperature
-from homeassistant.util.unit_conversion import TemperatureConverter
+from enum import Enum, IntEnum, IntFlag
 
 from .const import CHAR_WRITE_UUID
+from .framing import FRAME_HEADER, build_frame
+from .history import HISTORY_FRAME_TYPE
+
+if TYPE_CHECKING:
+    from bleak import BleakClient
+    from bleak.backends.device import BLEDevice
 
 _LOGGER = logging.getLogger("inkbird")
 
@@ -37,52 +43,180 @@ class TEMPERATURE_UNIT(Enum):
     CELSIUS     = 1
     FAHRENHEIT  = 2
 
+class DEVICE_FIELD(IntFlag):
+    """Values of InkbirdIamT1Device, as reported to have changed by update."""
+    TEMPERATURE             = 1
+    HUMIDITY                = 2
+    CO2                     = 4
+    ATMOSPHERIC_PRESSURE    = 8
+    SAMPLING_INTERVAL       = 16
+    ALARM_MODE              = 32
+    TEMPERATURE_UNIT        = 64
+
+class READING(IntEnum):
+    """Index of a sensor reading in InkbirdIamT1Device. Reading i is reported as DEVICE_FIELD 1 << i."""
+    TEMPERATURE             = 0
+    HUMIDITY                = 1
+    CO2                     = 2
+    ATMOSPHERIC_PRESSURE    = 3
+
+# Readings are stored as integers in these units: 0.1 °C, 0.1 %, ppm, hPa.
+READING_SCALE = (10, 10, 1, 1)
+
+# Plain ints for the hot path, combining IntFlag members creates new enum instances.
+_TEMPERATURE            = DEVICE_FIELD.TEMPERATURE.value
+_HUMIDITY               = DEVICE_FIELD.HUMIDITY.value
+_CO2                    = DEVICE_FIELD.CO2.value
+_ATMOSPHERIC_PRESSURE   = DEVICE_FIELD.ATMOSPHERIC_PRESSURE.value
+_SAMPLING_INTERVAL      = DEVICE_FIELD.SAMPLING_INTERVAL.value
+_ALARM_MODE             = DEVICE_FIELD.ALARM_MODE.value
+_TEMPERATURE_UNIT       = DEVICE_FIELD.TEMPERATURE_UNIT.value
+
 """Parse constant predefined notifications."""
 class InkbirdNotification:
+    # Keyed on the raw frame so notifications can be looked up without hex encoding them.
     _mapping = {
-        "55aa0409000000000c": ALARM_MODE.OFF,
-        "55aa0409010000000d": ALARM_MODE.ONCE,
-        "55aa0409010100000e": ALARM_MODE.EVERY_TIME,
+        build_frame(0x04, b"\x00\x00\x00\x00"): ALARM_MODE.OFF,
+        build_frame(0x04, b"\x01\x00\x00\x00"): ALARM_MODE.ONCE,
+        build_frame(0x04, b"\x01\x01\x00\x00"): ALARM_MODE.EVERY_TIME,
 
-        "55aa020b0000000001a4b1": SAMPLING_INTERVAL.ONE,
-        "55aa020b0100000001a4b2": SAMPLING_INTERVAL.TWO,
-        "55aa020b0200000001a4b3": SAMPLING_INTERVAL.FIVE,
-        "55aa020b0400000001a4b5": SAMPLING_INTERVAL.TEN,
+        build_frame(0x02, b"\x00\x00\x00\x00\x01\xa4"): SAMPLING_INTERVAL.ONE,
+        build_frame(0x02, b"\x01\x00\x00\x00\x01\xa4"): SAMPLING_INTERVAL.TWO,
+        build_frame(0x02, b"\x02\x00\x00\x00\x01\xa4"): SAMPLING_INTERVAL.FIVE,
+        build_frame(0x02, b"\x04\x00\x00\x00\x01\xa4"): SAMPLING_INTERVAL.TEN,
 
-        "55aa050c0000000000000010": TEMPERATURE_UNIT.CELSIUS,
-        "55aa050c0000000000000111": TEMPERATURE_UNIT.FAHRENHEIT,
+        build_frame(0x05, b"\x00\x00\x00\x00\x00\x00\x00"): TEMPERATURE_UNIT.CELSIUS,
+        build_frame(0x05, b"\x00\x00\x00\x00\x00\x00\x01"): TEMPERATURE_UNIT.FAHRENHEIT,
     }
     _value2notification = {v: k for k,v in _mapping.items()}
 
     def parse(cls: Type, notification: bytes) -> ALARM_MODE | SAMPLING_INTERVAL | TEMPERATURE_UNIT | None:
-        value = InkbirdNotification._mapping.get(notification.hex())
+        # bytes() is a no-op for bytes, but bytearrays (as delivered by bleak) and memoryviews are not hashable.
+        value = InkbirdNotification._mapping.get(bytes(notification))
         return value if isinstance(value, cls) else None
 
     def create_response(value: Any) -> bytes:
-        return bytes.fromhex(InkbirdNotification._value2notification[value])
+        return InkbirdNotification._value2notification[value]
 
 
-@dataclasses.dataclass
-class InkbirdIamT1Device:
-    manufacturer: str = ""
-    sw_version: str = ""
-    model: str = ""
-    address: str = ""
+# Sensor frame payload starting at offset 4: temperature sign, temperature, humidity, co2, pressure.
+_SENSOR_FRAME = struct.Struct(">BHHHH")
+_SENSOR_FRAME_OFFSET = 4
+_SENSOR_FRAME_MIN_LENGTH = _SENSOR_FRAME_OFFSET + _SENSOR_FRAME.size
 
-    alarm_mode: ALARM_MODE | None = None
-    sampling_interval: SAMPLING_INTERVAL | None = None
-    temperature_unit: TEMPERATURE_UNIT | None = None
+def _enum_or_none(cls: Type[Enum], value: Any) -> Enum | None:
+    if value is None or isinstance(value, cls):
+        return value
+    try:
+        return cls(value)
+    except ValueError:
+        return None
 
-    sensors: dict[SensorDeviceClass, Any] = dataclasses.field(default_factory=lambda: {})
 
+class InkbirdIamT1Device:
+    """
+    State of a device. The readings are kept in fixed arrays indexed by READING,
+    with the time they were last reported and a bit per reading that is set once it is known.
+    """
+    __slots__ = (
+        "manufacturer",
+        "sw_version",
+        "model",
+        "address",
+        "alarm_mode",
+        "sampling_interval",
+        "temperature_unit",
+        "values",
+        "updated",
+        "valid",
+    )
+
+    def __init__(
+        self,
+        manufacturer: str = "",
+        sw_version: str = "",
+        model: str = "",
+        address: str = "",
+        alarm_mode: ALARM_MODE | None = None,
+        sampling_interval: SAMPLING_INTERVAL | None = None,
+        temperature_unit: TEMPERATURE_UNIT | None = None,
+    ):
+        self.manufacturer = manufacturer
+        self.sw_version = sw_version
+        self.model = model
+        self.address = address
+
+        self.alarm_mode = alarm_mode
+        self.sampling_interval = sampling_interval
+        self.temperature_unit = temperature_unit
+
+        # In READING_SCALE units
+        self.values = array("i", bytes(4 * len(READING)))
+        # time.time() of the last report
+        self.updated = array("d", bytes(8 * len(READING)))
+        # DEVICE_FIELD flags of the readings that are known
+        self.valid = 0
+
+    def __repr__(self) -> str:
+        return f"InkbirdIamT1Device({self.as_dict()})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, InkbirdIamT1Device):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def reading(self, index: READING) -> float | int | None:
+        """The current value of a reading, None if it is unknown."""
+        if not self.valid & (1 << index):
+            return None
+        value = self.values[index]
+        scale = READING_SCALE[index]
+        return value / scale if scale != 1 else value
+
+    def reading_updated(self, index: READING) -> float | None:
+        """time.time() of the last report of a reading."""
+        return self.updated[index] if self.valid & (1 << index) else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """JSON serialisable snapshot, e.g. for config entries. The inverse of from_dict."""
+        return {
+            "manufacturer": self.manufacturer,
+            "sw_version": self.sw_version,
+            "model": self.model,
+            "address": self.address,
+            "alarm_mode": self.alarm_mode.value if self.alarm_mode else None,
+            "sampling_interval": self.sampling_interval.value if self.sampling_interval else None,
+            "temperature_unit": self.temperature_unit.value if self.temperature_unit else None,
+            "readings": {
+                reading.name.lower(): [self.values[reading], self.updated[reading]]
+                for reading in READING
+                if self.valid & (1 << reading)
+            },
+        }
+
+    @staticmethod
     def from_dict(data: dict) -> InkbirdIamT1Device:
-        device = InkbirdIamT1Device(**data)
-        device.alarm_mode = ALARM_MODE(device.alarm_mode) if device.alarm_mode else None
-        device.sampling_interval = SAMPLING_INTERVAL(device.sampling_interval) if device.sampling_interval else None
-        device.temperature_unit = TEMPERATURE_UNIT(device.temperature_unit) if device.temperature_unit else None
+        """Restore a device from as_dict. Unknown keys and values are ignored."""
+        device = InkbirdIamT1Device(
+            manufacturer=data.get("manufacturer") or "",
+            sw_version=data.get("sw_version") or "",
+            model=data.get("model") or "",
+            address=data.get("address") or "",
+            alarm_mode=_enum_or_none(ALARM_MODE, data.get("alarm_mode")),
+            sampling_interval=_enum_or_none(SAMPLING_INTERVAL, data.get("sampling_interval")),
+            temperature_unit=_enum_or_none(TEMPERATURE_UNIT, data.get("temperature_unit")),
+        )
+        for name, (value, updated) in (data.get("readings") or {}).items():
+            reading = READING.__members__.get(name.upper())
+            if reading is not None:
+                device.values[reading] = value
+                device.updated[reading] = updated
+                device.valid |= 1 << reading
         return device
 
     def name(self) -> str:
+        from bluetooth_data_tools import human_readable_name
+
         return human_readable_name(None, self.model, self.address)
     
     async def write_alarm_mode(self, client: BleakClient, mode: ALARM_MODE):
@@ -93,59 +227,105 @@ class InkbirdIamT1Device:
         data = InkbirdNotification.create_response(interval)
         await client.write_gatt_char(CHAR_WRITE_UUID, data)
 
-    def update(self, notification: bytearray):
-        def parse_temperature() -> float | None:
-            sign_byte, high_byte, low_byte = struct.unpack_from('BBB', notification, offset=4)
-            temperature_raw = (high_byte << 8) | low_byte
-            if sign_byte == 1:
-                temperature_raw = -temperature_raw
-            temperature = temperature_raw / 10
-            if self.temperature_unit == TEMPERATURE_UNIT.FAHRENHEIT:
-                temperature = TemperatureConverter().convert(temperature, UnitOfTemperature.FAHRENHEIT, UnitOfTemperature.CELSIUS)
-            elif not self.temperature_unit:
-                temperature = None
-            return round(temperature, 1) if temperature else None
-        
-        def parse_humidity() -> float:
-            return struct.unpack_from('>H', notification, offset=7)[0] / 10
-
-        def parse_co2() -> float:
-            return struct.unpack_from('>H', notification, offset=9)[0]
-
-        def parse_pressure() -> float:
-            return struct.unpack_from('>H', notification, offset=11)[0]
-        
-        if not notification.startswith(b"\x55\xaa"):
+    def update(self, notification: bytearray) -> int:
+        """Apply a notification. Returns the DEVICE_FIELD flags of the values that changed."""
+        if len(notification) < 3 or notification[:2] != FRAME_HEADER:
             _LOGGER.info("Unknown notification: %s", notification)
-            return
-        
-        match notification[2]:
-            case 0x01:
-                # sensor data
-                self.sensors.update({
-                    SensorDeviceClass.TEMPERATURE:          parse_temperature(),
-                    SensorDeviceClass.HUMIDITY:             parse_humidity(),
-                    SensorDeviceClass.CO2:                  parse_co2(),
-                    SensorDeviceClass.ATMOSPHERIC_PRESSURE: parse_pressure()
-                })
-                _LOGGER.debug("Received sensor update: %s", self.sensors)
-            case 0x02:
-                # sampling interval
-                self.sampling_interval = InkbirdNotification.parse(SAMPLING_INTERVAL, notification)
-                _LOGGER.debug("Received interval     : %s", self.sampling_interval)
-            case 0x03:
-                # co2 limits
-                return
-            case 0x04:
-                # alarm mode
-                self.alarm_mode = InkbirdNotification.parse(ALARM_MODE, notification)
-                _LOGGER.debug("Received alarm mode   : %s", self.alarm_mode)
-            case 0x05:
-                # Celsius / Fahrenheit
-                self.temperature_unit = InkbirdNotification.parse(TEMPERATURE_UNIT, notification)
-                _LOGGER.debug("Received temp unit    : %s", self.temperature_unit)
-            case _:
-                _LOGGER.debug("Unknown notification  : %s", notification)
+            return 0
+
+        handler = _NOTIFICATION_HANDLERS.get(notification[2])
+        if handler is None:
+            _LOGGER.debug("Unknown notification  : %s", notification)
+            return 0
+        return handler(self, notification)
+
+    def _update_sensors(self, notification: bytearray) -> int:
+        if len(notification) < _SENSOR_FRAME_MIN_LENGTH:
+            _LOGGER.debug("Truncated sensor data : %s", notification)
+            return 0
+        sign, temperature_raw, humidity_raw, co2, pressure = _SENSOR_FRAME.unpack_from(notification, _SENSOR_FRAME_OFFSET)
+        # The upper bits flag Fahrenheit, see framing.py.
+        if sign & 0x01:
+            temperature_raw = -temperature_raw
+
+        # Indexed by READING
+        values = self.values
+        valid = self.valid
+        # A reading changes if its value differs or it becomes known.
+        changed = 0
+        unit = self.temperature_unit
+        if unit is not None:
+            if unit is TEMPERATURE_UNIT.FAHRENHEIT:
+                # Same formula as TemperatureConverter, in 0.1 degrees.
+                temperature_raw = round((temperature_raw - 320) / 1.8)
+            if values[0] != temperature_raw or not valid & _TEMPERATURE:
+                values[0] = temperature_raw
+                changed |= _TEMPERATURE
+            valid |= _TEMPERATURE
+        elif valid & _TEMPERATURE:
+            valid &= ~_TEMPERATURE
+            changed |= _TEMPERATURE
+        if values[1] != humidity_raw:
+            values[1] = humidity_raw
+            changed |= _HUMIDITY
+        if values[2] != co2:
+            values[2] = co2
+            changed |= _CO2
+        if values[3] != pressure:
+            values[3] = pressure
+            changed |= _ATMOSPHERIC_PRESSURE
+        changed |= ~valid & (_HUMIDITY | _CO2 | _ATMOSPHERIC_PRESSURE)
+        self.valid = valid | _HUMIDITY | _CO2 | _ATMOSPHERIC_PRESSURE
+
+        now = time.time()
+        updated = self.updated
+        updated[0] = updated[1] = updated[2] = updated[3] = now
+        _LOGGER.debug("Received sensor update: %s", values)
+        return changed
+
+    def _update_sampling_interval(self, notification: bytearray) -> int:
+        interval = InkbirdNotification.parse(SAMPLING_INTERVAL, notification)
+        _LOGGER.debug("Received interval     : %s", interval)
+        if interval is self.sampling_interval:
+            return 0
+        self.sampling_interval = interval
+        return _SAMPLING_INTERVAL
+
+    def _update_co2_limits(self, notification: bytearray) -> int:
+        return 0
+
+    def _update_alarm_mode(self, notification: bytearray) -> int:
+        mode = InkbirdNotification.parse(ALARM_MODE, notification)
+        _LOGGER.debug("Received alarm mode   : %s", mode)
+        if mode is self.alarm_mode:
+            return 0
+        self.alarm_mode = mode
+        return _ALARM_MODE
+
+    def _update_temperature_unit(self, notification: bytearray) -> int:
+        unit = InkbirdNotification.parse(TEMPERATURE_UNIT, notification)
+        _LOGGER.debug("Received temp unit    : %s", unit)
+        if unit is self.temperature_unit:
+            return 0
+        self.temperature_unit = unit
+        return _TEMPERATURE_UNIT
+
+    def _update_history(self, notification: bytearray) -> int:
+        # The history is not part of the device state. See InkbirdHistoryDecoder.
+        _LOGGER.debug("Received history data : %s", notification)
+        return 0
+
+
+# Dispatch on the frame type byte, built once per process.
+_NOTIFICATION_HANDLERS = {
+    0x01: InkbirdIamT1Device._update_sensors,            # sensor data
+    0x02: InkbirdIamT1Device._update_sampling_interval,  # sampling interval
+    0x03: InkbirdIamT1Device._update_co2_limits,         # co2 limits
+    0x04: InkbirdIamT1Device._update_alarm_mode,         # alarm mode
+    0x05: InkbirdIamT1Device._update_temperature_unit,   # Celsius / Fahrenheit
+    HISTORY_FRAME_TYPE: InkbirdIamT1Device._update_history,  # co2 history
+}
+NOTIFICATION_TYPES = frozenset(_NOTIFICATION_HANDLERS)
 
 class DeviceInfoChars(Enum):
     FirmwareRevision    = "00002a26-0000-1000-8000-00805f9b34fb" # YBWY02-V1.0
@@ -156,11 +336,14 @@ class InkbirdIamT1DeviceData:
         self.logger = logger
 
     async def _get_char_value(self, client: BleakClient, uuid: str) -> str:
+        from bleak import BleakError
+
         try:
             data = await client.read_gatt_char(uuid)
         except BleakError as err:
             self.logger.debug("Failed to read 'characterstic' %s", uuid, exc_info=err)
-        return data or ""
+            return ""
+        return data.decode(errors="replace").rstrip("\x00") if data else ""
 
     async def _get_device_characteristics(
         self, client: BleakClient, device: InkbirdIamT1Device
@@ -169,12 +352,16 @@ class InkbirdIamT1DeviceData:
         device.address = client.address
         device.manufacturer = "INKBIRD"
 
-        device.sw_version   = self._get_char_value(client, DeviceInfoChars.FirmwareRevision.value)
-        device.model        = self._get_char_value(client, DeviceInfoChars.Model.value)
+        device.sw_version, device.model = await asyncio.gather(
+            self._get_char_value(client, DeviceInfoChars.FirmwareRevision.value),
+            self._get_char_value(client, DeviceInfoChars.Model.value),
+        )
         return device
 
     async def update_device_only(self, ble_device: BLEDevice) -> InkbirdIamT1Device:
         """Connect to the device through BLE and retrieve relevant data."""
+        from bleak import BleakClient
+
         device = InkbirdIamT1Device()
         client = BleakClient(ble_device)
         await client.connect()
@@ -0,0 +1,181 @@
+"""
+Rolling statistics of the recent sensor readings.
+
+Every reading keeps a ring buffer of its samples of the last ROLLING_WINDOW seconds.
+The statistics are maintained incrementally when a sample is added or drops out of the window,
+so reading them never scans the buffer.
+"""
+from __future__ import annotations
+
+from array import array
+from collections import deque
+
+from .parser import READING, READING_SCALE, InkbirdIamT1Device
+
+# Samples older than this are dropped from the statistics (seconds).
+ROLLING_WINDOW = 3600
+# Samples kept per reading. Enough for a sampling interval down to ~7 seconds within the window.
+ROLLING_CAPACITY = 512
+# Time spent above this co2 level is accounted (ppm).
+CO2_LEVEL = 1000
+
+
+class RollingWindow:
+    """
+    Ring buffer of timestamped samples with O(1) mean, min, max, rate of change and time above a level.
+    Min and max are kept in monotonic queues, the time above the level is attributed to the sample
+    that starts each interval, so it can be subtracted again once that sample is dropped.
+    """
+    __slots__ = (
+        "capacity",
+        "duration",
+        "level",
+        "_values",
+        "_times",
+        "_above",
+        "_first",
+        "_next",
+        "_sum",
+        "_min",
+        "_max",
+        "above_seconds",
+    )
+
+    def __init__(self, duration: float = ROLLING_WINDOW, capacity: int = ROLLING_CAPACITY, level: float | None = None):
+        self.capacity = capacity
+        self.duration = duration
+        self.level = level
+        self._values = array("d", bytes(8 * capacity))
+        self._times = array("d", bytes(8 * capacity))
+        self._above = array("d", bytes(8 * capacity))
+        # Sequence numbers of the oldest sample and of the next one, their difference is the number of samples.
+        self._first = 0
+        self._next = 0
+        self._sum = 0.0
+        # (sequence number, value), increasing / decreasing values
+        self._min: deque[tuple[int, float]] = deque()
+        self._max: deque[tuple[int, float]] = deque()
+        self.above_seconds = 0.0
+
+    def __len__(self) -> int:
+        return self._next - self._first
+
+    def push(self, value: float, timestamp: float):
+        capacity = self.capacity
+        seq = self._next
+        if seq != self._first:
+            previous = (seq - 1) % capacity
+            if self.level is not None and self._values[previous] > self.level:
+                above = max(timestamp - self._times[previous], 0.0)
+                self._above[previous] = above
+                self.above_seconds += above
+            if seq - self._first == capacity:
+                self._evict()
+
+        index = seq % capacity
+        self._values[index] = value
+        self._times[index] = timestamp
+        self._above[index] = 0.0
+        self._sum += value
+        self._next = seq + 1
+
+        minimum = self._min
+        while minimum and minimum[-1][1] >= value:
+            minimum.pop()
+        minimum.append((seq, value))
+        maximum = self._max
+        while maximum and maximum[-1][1] <= value:
+            maximum.pop()
+        maximum.append((seq, value))
+
+        # Always keep the newest sample, even if the readings stopped for longer than the window.
+        oldest = timestamp - self.duration
+        while self._next - self._first > 1 and self._times[self._first % capacity] < oldest:
+            self._evict()
+
+    def _evict(self):
+        first = self._first
+        index = first % self.capacity
+        self._sum -= self._values[index]
+        self.above_seconds -= self._above[index]
+        if self._min[0][0] == first:
+            self._min.popleft()
+        if self._max[0][0] == first:
+            self._max.popleft()
+        self._first = first + 1
+
+    @property
+    def mean(self) -> float | None:
+        count = self._next - self._first
+        return self._sum / count if count else None
+
+    @property
+    def min(self) -> float | None:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self) -> float | None:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def rate(self) -> float | None:
+        """Change per second between the oldest and the newest sample."""
+        if self._next - self._first < 2:
+            return None
+        first = self._first % self.capacity
+        last = (self._next - 1) % self.capacity
+        seconds = self._times[last] - self._times[first]
+        if seconds <= 0:
+            return None
+        return (self._values[last] - self._values[first]) / seconds
+
+
+class InkbirdRollingStats:
+    """Rolling statistics of all readings of a device, in the units of InkbirdIamT1Device.reading."""
+
+    def __init__(self, duration: float = ROLLING_WINDOW, capacity: int = ROLLING_CAPACITY, co2_level: float = CO2_LEVEL):
+        self.co2_level = co2_level
+        self._pushed = 0.0
+        # Indexed by READING. The samples are pushed in READING_SCALE units, which keeps the sums exact.
+        self.windows = tuple(
+            RollingWindow(
+                duration,
+                capacity,
+                co2_level * READING_SCALE[reading] if reading is READING.CO2 else None,
+            )
+            for reading in READING
+        )
+
+    def push(self, device: InkbirdIamT1Device):
+        """Add the current readings of the device. Call once per sensor frame, repeated readings are skipped."""
+        valid = device.valid
+        values = device.values
+        updated = device.updated
+        pushed = max(updated)
+        if pushed == self._pushed:
+            return
+        self._pushed = pushed
+        for index, window in enumerate(self.windows):
+            if valid & (1 << index):
+                window.push(values[index], updated[index])
+
+    def _scaled(self, reading: READING, value: float | None) -> float | None:
+        return None if value is None else value / READING_SCALE[reading]
+
+    def mean(self, reading: READING) -> float | None:
+        return self._scaled(reading, self.windows[reading].mean)
+
+    def min(self, reading: READING) -> float | None:
+        return self._scaled(reading, self.windows[reading].min)
+
+    def max(self, reading: READING) -> float | None:
+        return self._scaled(reading, self.windows[reading].max)
+
+    def rate_per_hour(self, reading: READING) -> float | None:
+        rate = self.windows[reading].rate
+        return None if rate is None else rate * 3600 / READING_SCALE[reading]
+
+    @property
+    def co2_above_seconds(self) -> float:
+        """Time the co2 level was above co2_level within the window."""
+        return self.windows[READING.CO2].above_seconds
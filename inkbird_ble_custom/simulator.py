@@ -0,0 +1,294 @@
+"""
+In-process simulation of IAM-T1 devices following the GATT protocol in const.py.
+Allows exercising the coordinator without hardware, e.g. for load tests.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import struct
+import time
+from typing import Callable, Iterable, Iterator
+
+from .capture import CapturedNotification, async_replay
+from .const import CHAR_NOTIFY_UUID, CONNECT_WRITE_DATA, HISTORY_WRITE_DATA
+from .framing import build_frame
+from .history import HISTORY_FRAME_TYPE
+from .parser import (
+    ALARM_MODE,
+    DeviceInfoChars,
+    InkbirdNotification,
+    SAMPLING_INTERVAL,
+    TEMPERATURE_UNIT,
+)
+
+_SENSOR_PAYLOAD = struct.Struct(">BHHHHBB")
+# Set in the first payload byte of the sensor frames of a device showing Fahrenheit
+_FAHRENHEIT_FLAG = 0x10
+_CO2_LIMITS_PAYLOAD = struct.Struct(">HHI")
+_HISTORY_HEADER = struct.Struct(">HH")
+
+class InkbirdSimulatedDevice:
+    """State of a simulated device and the frames it notifies."""
+
+    def __init__(
+        self,
+        address: str,
+        temperature: float = 21.5,
+        humidity: float = 45.0,
+        co2: int = 600,
+        pressure: int = 1013,
+        sampling_interval: SAMPLING_INTERVAL = SAMPLING_INTERVAL.ONE,
+        alarm_mode: ALARM_MODE = ALARM_MODE.OFF,
+        temperature_unit: TEMPERATURE_UNIT = TEMPERATURE_UNIT.CELSIUS,
+        history_samples: int = 0,
+        seed: int | None = None,
+    ):
+        self.address = address
+        self.temperature = temperature
+        self.humidity = humidity
+        self.co2 = co2
+        self.pressure = pressure
+        self.sampling_interval = sampling_interval
+        self.alarm_mode = alarm_mode
+        self.temperature_unit = temperature_unit
+        self.history_samples = history_samples
+        self._random = random.Random(seed)
+
+    def step(self):
+        """Let the readings drift a little, like a real room."""
+        self.temperature = round(self.temperature + self._random.uniform(-0.1, 0.1), 1)
+        self.humidity = round(min(100.0, max(0.0, self.humidity + self._random.uniform(-0.5, 0.5))), 1)
+        self.co2 = min(9999, max(400, self.co2 + self._random.randint(-20, 25)))
+        self.pressure = self.pressure + self._random.choice((-1, 0, 0, 0, 1))
+
+    def sensor_frame(self) -> bytes:
+        """Laid out like the captured frames, see framing.py."""
+        fahrenheit = self.temperature_unit == TEMPERATURE_UNIT.FAHRENHEIT
+        temperature = self.temperature * 1.8 + 32 if fahrenheit else self.temperature
+        temperature_raw = round(temperature * 10)
+        payload = _SENSOR_PAYLOAD.pack(
+            (_FAHRENHEIT_FLAG if fahrenheit else 0) | (1 if temperature_raw < 0 else 0),
+            abs(temperature_raw),
+            round(self.humidity * 10),
+            self.co2,
+            self.pressure,
+            1,
+            0 if fahrenheit else 1,
+        )
+        frame = build_frame(0x01, payload)
+        if fahrenheit:
+            # The captured checksum doesn't cover the flag.
+            frame = frame[:-1] + bytes([(frame[-1] - _FAHRENHEIT_FLAG) & 0xff])
+        return frame
+
+    def sensor_frames(self, count: int) -> list[bytes]:
+        """Consecutive sensor frames with drifting readings."""
+        frames = []
+        for _ in range(count):
+            self.step()
+            frames.append(self.sensor_frame())
+        return frames
+
+    def settings_frames(self) -> list[bytes]:
+        """The frames notified after writing CONNECT_WRITE_DATA."""
+        return [
+            InkbirdNotification.create_response(self.sampling_interval),
+            build_frame(0x03, _CO2_LIMITS_PAYLOAD.pack(1000, 1500, 0)),
+            InkbirdNotification.create_response(self.alarm_mode),
+            InkbirdNotification.create_response(self.temperature_unit),
+        ]
+
+    def history_frames(self, samples_per_frame: int = 7) -> Iterator[bytes]:
+        """The co2 history, newest sample first, in the layout decoded by InkbirdHistoryDecoder."""
+        count = -(-self.history_samples // samples_per_frame)
+        rng = random.Random(self.address)
+        co2 = self.co2
+        for index in range(count):
+            samples = min(samples_per_frame, self.history_samples - index * samples_per_frame)
+            values = []
+            for _ in range(samples):
+                values.append(co2)
+                co2 = min(9999, max(400, co2 + rng.randint(-25, 20)))
+            payload = _HISTORY_HEADER.pack(index, count) + struct.pack(f">{samples}H", *values)
+            yield build_frame(HISTORY_FRAME_TYPE, payload)
+
+    def handle_write(self, data: bytes) -> list[bytes]:
+        """Apply a write to the device. Returns the frames notified in response."""
+        data = bytes(data)
+        if data == CONNECT_WRITE_DATA:
+            return [*self.settings_frames(), self.sensor_frame()]
+        setting = InkbirdNotification._mapping.get(data)
+        if isinstance(setting, SAMPLING_INTERVAL):
+            self.sampling_interval = setting
+        elif isinstance(setting, ALARM_MODE):
+            self.alarm_mode = setting
+        elif isinstance(setting, TEMPERATURE_UNIT):
+            self.temperature_unit = setting
+        else:
+            return []
+        return [data]
+
+    def characteristic(self, uuid: str) -> bytearray:
+        if uuid == DeviceInfoChars.FirmwareRevision.value:
+            return bytearray(b"YBWY02-V1.0")
+        if uuid == DeviceInfoChars.Model.value:
+            return bytearray(b"Ink@IAM-T1")
+        raise KeyError(uuid)
+
+
+class SimulatedBleakClient:
+    """
+    Stands in for BleakClient, talking to an InkbirdSimulatedDevice.
+    sensor_period:  seconds between sensor frames. Defaults to the sampling interval of the device.
+    history_period: seconds between history frames while the history is dumped.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        disconnected_callback: Callable[[SimulatedBleakClient], None] | None = None,
+        *,
+        device: InkbirdSimulatedDevice,
+        sensor_period: float | None = None,
+        history_period: float = 0.005,
+        connect_delay: float = 0.05,
+        **_,
+    ):
+        self._address = address
+        self._disconnected_callback = disconnected_callback
+        self.device = device
+        self.sensor_period = sensor_period
+        self.history_period = history_period
+        self.connect_delay = connect_delay
+
+        self.reachable = True
+        self.silent = False
+        self.connects = 0
+        self.drops = 0
+        self.frames_sent = 0
+        # Seconds from each simulated link loss until the next successful connect.
+        self.recovery_times: list[float] = []
+        self._dropped_at: float | None = None
+        # perf_counter of the last notification, to measure the latency of its processing.
+        self.last_notification = 0.0
+
+        self._connected = False
+        self._callback: Callable[[int, bytearray], None] | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self, **_) -> bool:
+        await asyncio.sleep(self.connect_delay)
+        if not self.reachable:
+            raise TimeoutError(f"Device {self._address} not found")
+        self._connected = True
+        self.connects += 1
+        if self._dropped_at is not None:
+            self.recovery_times.append(time.monotonic() - self._dropped_at)
+            self._dropped_at = None
+        return True
+
+    async def disconnect(self) -> bool:
+        if self._connected:
+            self._drop()
+        return True
+
+    async def start_notify(self, uuid: str, callback: Callable[[int, bytearray], None], **_):
+        assert uuid == CHAR_NOTIFY_UUID
+        self._callback = callback
+        self._start(self._async_sensor_loop())
+
+    async def stop_notify(self, uuid: str):
+        self._callback = None
+
+    async def write_gatt_char(self, uuid: str, data: bytes, response: bool | None = None):
+        if not self._connected:
+            raise ConnectionError("Not connected")
+        if bytes(data) == HISTORY_WRITE_DATA:
+            self._start(self._async_history_dump())
+            return
+        for frame in self.device.handle_write(data):
+            self._notify(frame)
+
+    async def read_gatt_char(self, uuid: str) -> bytearray:
+        return self.device.characteristic(uuid)
+
+    def drop(self):
+        """Simulate losing the link."""
+        if self._connected:
+            self.drops += 1
+            self._dropped_at = time.monotonic()
+            self._drop()
+
+    def _drop(self):
+        self._connected = False
+        self._callback = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    def _start(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _notify(self, frame: bytes):
+        if self._callback is None or self.silent:
+            return
+        self.frames_sent += 1
+        self.last_notification = time.perf_counter()
+        self._callback(0, bytearray(frame))
+
+    async def _async_sensor_loop(self):
+        while True:
+            await asyncio.sleep(self.sensor_period or self.device.sampling_interval.value * 60)
+            self.device.step()
+            self._notify(self.device.sensor_frame())
+
+    async def _async_history_dump(self):
+        for frame in self.device.history_frames():
+            self._notify(frame)
+            await asyncio.sleep(self.history_period)
+
+
+class ReplayBleakClient(SimulatedBleakClient):
+    """
+    Notifies the captured notifications of its address instead of simulated sensor data, once.
+    Writes are ignored: the capture already holds what the device answered.
+    speed:  times as fast as captured, as fast as possible if None.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        disconnected_callback: Callable[[SimulatedBleakClient], None] | None = None,
+        *,
+        notifications: Iterable[CapturedNotification],
+        speed: float | None = None,
+        **kwargs,
+    ):
+        super().__init__(address, disconnected_callback, device=InkbirdSimulatedDevice(address), **kwargs)
+        self.notifications = [notification for notification in notifications if notification.address == address]
+        self.speed = speed
+        self.replayed = False
+
+    async def start_notify(self, uuid: str, callback: Callable[[int, bytearray], None], **_):
+        assert uuid == CHAR_NOTIFY_UUID
+        self._callback = callback
+        if not self.replayed:
+            self.replayed = True
+            self._start(async_replay(self.notifications, lambda notification: self._notify(notification.data), self.speed))
+
+    async def write_gatt_char(self, uuid: str, data: bytes, response: bool | None = None):
+        if not self._connected:
+            raise ConnectionError("Not connected")
@@ -0,0 +1,38 @@
+"""
+Load inkbird_ble_custom as a package on its own.
+
+The integration directory can't be put on sys.path: its platforms (e.g. select.py) would shadow the standard library.
+Tests of the integration itself load it as the package `inkbird` with load_integration, and need Home Assistant.
+"""
+import importlib.util
+from pathlib import Path
+import sys
+
+PACKAGE_DIR = Path(__file__).parent.parent
+INTEGRATION_DIR = PACKAGE_DIR.parent
+
+
+def _load(name: str, directory: Path) -> None:
+    if name in sys.modules:
+        return
+    spec = importlib.util.spec_from_file_location(
+        name, directory / "__init__.py", submodule_search_locations=[str(directory)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[spec.name]
+        raise
+
+
+def load_package() -> None:
+    _load("inkbird_ble_custom", PACKAGE_DIR)
+
+
+def load_integration() -> None:
+    _load("inkbird", INTEGRATION_DIR)
+
+
+load_package()
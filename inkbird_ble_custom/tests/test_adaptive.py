@@ -0,0 +1,74 @@
+import random
+
+from inkbird_ble_custom.adaptive import InkbirdAdaptiveSampling
+from inkbird_ble_custom.parser import InkbirdIamT1Device, READING, SAMPLING_INTERVAL
+
+def _device(interval: SAMPLING_INTERVAL) -> InkbirdIamT1Device:
+    device = InkbirdIamT1Device(sampling_interval=interval)
+    device.valid = (1 << READING.TEMPERATURE) | (1 << READING.CO2)
+    return device
+
+def _sample(controller: InkbirdAdaptiveSampling, device: InkbirdIamT1Device, minute: float, co2: int, temperature: float = 21):
+    device.values[READING.CO2] = co2
+    device.values[READING.TEMPERATURE] = round(temperature * 10)
+    device.updated[READING.CO2] = device.updated[READING.TEMPERATURE] = minute * 60
+    return controller.update(device)
+
+def test_slows_down_when_stable():
+    controller = InkbirdAdaptiveSampling(stable_time=20 * 60)
+    device = _device(SAMPLING_INTERVAL.ONE)
+    results = [_sample(controller, device, minute, 600 + minute % 2) for minute in range(21)]
+    assert results[:20] == [None] * 20
+    assert results[20] is SAMPLING_INTERVAL.TEN
+
+def test_slows_down_despite_jitter():
+    # A steady room: the temperature flickers by one step on 15 % of the samples, co2 by up to 4 ppm.
+    controller = InkbirdAdaptiveSampling()
+    device = _device(SAMPLING_INTERVAL.ONE)
+    rng = random.Random(1)
+    for minute in range(4 * 60):
+        temperature = 21.6 if rng.random() < 0.15 else 21.5
+        if _sample(controller, device, minute, 600 + rng.randint(-4, 4), temperature) is SAMPLING_INTERVAL.TEN:
+            break
+    assert minute <= 30
+
+def test_single_step_is_no_change():
+    controller = InkbirdAdaptiveSampling()
+    device = _device(SAMPLING_INTERVAL.TEN)
+    _sample(controller, device, 0, 600, 21.5)
+    assert _sample(controller, device, 1, 600, 21.6) is None
+
+def test_speeds_up_when_co2_rises():
+    controller = InkbirdAdaptiveSampling()
+    device = _device(SAMPLING_INTERVAL.TEN)
+    assert _sample(controller, device, 0, 600) is None
+    # 30 ppm per minute
+    assert _sample(controller, device, 10, 900) is SAMPLING_INTERVAL.ONE
+
+def test_speeds_up_when_temperature_changes():
+    controller = InkbirdAdaptiveSampling()
+    device = _device(SAMPLING_INTERVAL.TEN)
+    _sample(controller, device, 0, 600, 21)
+    assert _sample(controller, device, 10, 600, 23) is SAMPLING_INTERVAL.ONE
+
+def test_hysteresis():
+    controller = InkbirdAdaptiveSampling(stable_time=20 * 60)
+    device = _device(SAMPLING_INTERVAL.ONE)
+    co2 = 600
+    # Rising by 10 ppm per minute is neither stable nor fast: the interval is kept.
+    for minute in range(60):
+        assert _sample(controller, device, minute, co2) is None
+        co2 += 10
+    # Falling co2 doesn't speed up.
+    device.sampling_interval = SAMPLING_INTERVAL.TEN
+    assert _sample(controller, device, 70, co2 - 500) is None
+
+def test_repeated_and_current():
+    controller = InkbirdAdaptiveSampling()
+    device = _device(SAMPLING_INTERVAL.ONE)
+    _sample(controller, device, 0, 600)
+    # Already fast
+    assert _sample(controller, device, 1, 700) is None
+    device.sampling_interval = SAMPLING_INTERVAL.TEN
+    # Same timestamp
+    assert controller.update(device) is None
@@ -0,0 +1,69 @@
+from datetime import timedelta, timezone
+import math
+from zoneinfo import ZoneInfo
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from inkbird_ble_custom.analytics import co2_analytics, records_array
+from inkbird_ble_custom.parser import DEVICE_FIELD
+from inkbird_ble_custom.timeseries import RECORD
+
+START = 1_700_006_400  # 2023-11-15 00:00 UTC
+
+def _buffer(co2: list[int], interval: int = 60, start: int = START) -> bytes:
+    return b"".join(
+        RECORD.pack(start + index * interval, 215, 450, value, 1013, DEVICE_FIELD.CO2 | DEVICE_FIELD.TEMPERATURE)
+        for index, value in enumerate(co2)
+    )
+
+def test_records_array():
+    records = records_array(_buffer([600, 700]))
+    assert records["co2"].tolist() == [600, 700]
+    assert records["timestamp"].tolist() == [START, START + 60]
+
+def test_empty():
+    assert co2_analytics(b"") == {"samples": 0}
+    # Without co2
+    assert co2_analytics(RECORD.pack(START, 215, 0, 0, 0, DEVICE_FIELD.TEMPERATURE)) == {"samples": 0}
+
+def test_seconds_above_and_daily():
+    result = co2_analytics(_buffer([600] * 30 + [1200] * 10 + [600] * 20), levels=(800, 1400))
+    assert result["samples"] == 60
+    assert result["seconds_above"] == {"800": 600.0, "1400": 0.0}
+    assert result["max"] == 1200
+    (day,) = result["daily"]
+    assert day["date"] == "2023-11-15"
+    assert (day["p50"], day["p90"], day["max"]) == (600, 1200, 1200)
+
+def test_daily_local_time():
+    # Two hours around midnight UTC are on one local day at UTC-3
+    result = co2_analytics(_buffer([500] * 120, start=START - 3600), time_zone=timezone(timedelta(hours=-3)))
+    assert [day["date"] for day in result["daily"]] == ["2023-11-14"]
+    assert len(co2_analytics(_buffer([500] * 120, start=START - 3600))["daily"]) == 2
+
+def test_daily_across_daylight_saving_time():
+    # 2023-10-28 21:30 to 2023-10-30 00:30 UTC, summer time in Berlin ends at 2023-10-29 01:00 UTC
+    start = 1_698_528_600
+    result = co2_analytics(_buffer([500] * 27 * 60, start=start), time_zone=ZoneInfo("Europe/Berlin"))
+    assert [(day["date"], day["samples"]) for day in result["daily"]] == [
+        ("2023-10-28", 30), ("2023-10-29", 25 * 60), ("2023-10-30", 90)
+    ]
+
+def test_decay_rate():
+    # Exponential decay at 2 air changes per hour from 1500 ppm
+    minutes = np.arange(60)
+    co2 = (420 + 1080 * np.exp(-2 * minutes / 60)).round().astype(int).tolist()
+    decays = co2_analytics(_buffer([1500] * 10 + co2))["decays"]
+    assert decays["count"] == 1
+    assert math.isclose(decays["median_air_changes_per_hour"], 2, rel_tol=0.05)
+
+@pytest.mark.parametrize("interval", [60, 15 * 60, 3600])
+def test_flat_series_has_no_decays(interval):
+    assert co2_analytics(_buffer([1500] * 48, interval=interval))["decays"]["count"] == 0
+
+def test_occupied_periods():
+    result = co2_analytics(_buffer([600] * 5 + [900, 1100, 1000] + [600] * 5 + [850] * 4), occupied_co2=800)
+    assert [(period["peak"], period["seconds"]) for period in result["occupied"]] == [(1100, 180.0), (850, 240.0)]
+    assert result["occupied"][0]["start"] == START + 5 * 60
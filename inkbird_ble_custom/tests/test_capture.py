@@ -0,0 +1,57 @@
+import asyncio
+
+from inkbird_ble_custom.capture import InkbirdCapture, async_replay, read_capture, replay_devices
+from inkbird_ble_custom.parser import READING
+from inkbird_ble_custom.simulator import InkbirdSimulatedDevice
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+def _capture(path) -> InkbirdSimulatedDevice:
+    simulated = InkbirdSimulatedDevice(ADDRESS, history_samples=20)
+    capture = InkbirdCapture(path)
+    for timestamp, frame in enumerate([*simulated.settings_frames(), simulated.sensor_frame(), *simulated.history_frames()]):
+        capture.record(ADDRESS, frame, timestamp / 100)
+    capture.flush()
+    # Appends to the existing file
+    capture.record("11:22:33:44:55:66", simulated.sensor_frame(), 1.0)
+    capture.flush()
+    return simulated
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "capture.bin"
+    simulated = _capture(path)
+    notifications = list(read_capture(path))
+    assert len(notifications) == 4 + 1 + len(list(simulated.history_frames())) + 1
+    assert notifications[0].address == ADDRESS
+    assert notifications[0].data == simulated.settings_frames()[0]
+    assert notifications[-1].address == "11:22:33:44:55:66"
+
+def test_truncated(tmp_path):
+    path = tmp_path / "capture.bin"
+    _capture(path)
+    count = len(list(read_capture(path)))
+    path.write_bytes(path.read_bytes()[:-3])
+    assert len(list(read_capture(path))) == count - 1
+
+def test_replay_devices(tmp_path):
+    path = tmp_path / "capture.bin"
+    simulated = _capture(path)
+    devices = replay_devices(read_capture(path))
+    device, metrics = devices[ADDRESS]
+    assert device.sampling_interval is simulated.sampling_interval
+    assert device.reading(READING.CO2) == simulated.co2
+    assert metrics.corrupt_frames == 0
+    assert set(devices) == {ADDRESS, "11:22:33:44:55:66"}
+
+def test_async_replay_speed(tmp_path):
+    path = tmp_path / "capture.bin"
+    _capture(path)
+    received = []
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        count = await async_replay(read_capture(path), lambda notification: received.append(loop.time() - started), speed=10)
+        assert count == len(received)
+    asyncio.run(run())
+    # The last notification was captured after 1 s
+    assert received[-1] >= 0.09
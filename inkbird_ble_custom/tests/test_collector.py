@@ -0,0 +1,82 @@
+import asyncio
+from contextlib import suppress
+import io
+import json
+
+from inkbird_ble_custom import collector
+from inkbird_ble_custom.collector import InkbirdCollector, ndjson_sink
+from inkbird_ble_custom.simulator import InkbirdSimulatedDevice, SimulatedBleakClient
+
+ADDRESSES = ["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02", "AA:BB:CC:DD:EE:03"]
+
+def _collect(max_connections: int, duration: float) -> tuple[list[dict], int]:
+    """The records and the most connections held at the same time."""
+    records = []
+    clients = []
+    connected = 0
+
+    class Client(SimulatedBleakClient):
+        async def connect(self, **kwargs) -> bool:
+            nonlocal connected
+            await super().connect(**kwargs)
+            connected = max(connected, sum(client.is_connected for client in clients))
+            return True
+
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        client = Client(address, device=InkbirdSimulatedDevice(address), sensor_period=0.01, connect_delay=0.001, **kwargs)
+        clients.append(client)
+        return client
+
+    async def run():
+        collector = InkbirdCollector(ADDRESSES, records.append, max_connections, client_factory, interval=0.02)
+        task = asyncio.create_task(collector.async_run())
+        await asyncio.sleep(duration)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    asyncio.run(run())
+    return records, connected
+
+def test_stays_connected():
+    records, connected = _collect(max_connections=3, duration=0.2)
+    assert connected == 3
+    assert {record["address"] for record in records} == set(ADDRESSES)
+    assert {"co2", "humidity", "atmospheric_pressure", "timestamp"} <= set(records[0])
+
+def test_takes_turns():
+    records, connected = _collect(max_connections=1, duration=0.3)
+    assert connected == 1
+    assert {record["address"] for record in records} == set(ADDRESSES)
+
+def test_ndjson_sink():
+    stream = io.StringIO()
+    sink = ndjson_sink(stream)
+    sink({"address": "AA", "co2": 600})
+    sink({"address": "BB", "co2": 700})
+    assert [json.loads(line)["co2"] for line in stream.getvalue().splitlines()] == [600, 700]
+
+def test_failed_connect_is_retried(monkeypatch):
+    monkeypatch.setattr(collector, "RECONNECT_BACKOFF_MIN", 0.01)
+    records = []
+    attempts = []
+
+    class Client(SimulatedBleakClient):
+        async def connect(self, **kwargs) -> bool:
+            attempts.append(self.address)
+            if len(attempts) == 1:
+                raise OSError("out of range")
+            return await super().connect(**kwargs)
+
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        return Client(address, device=InkbirdSimulatedDevice(address), sensor_period=0.01, connect_delay=0, **kwargs)
+
+    async def run():
+        task = asyncio.create_task(InkbirdCollector(ADDRESSES[:1], records.append, 1, client_factory, 0.02).async_run())
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    asyncio.run(run())
+    assert len(attempts) >= 2
+    assert records
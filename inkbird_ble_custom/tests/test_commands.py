@@ -0,0 +1,170 @@
+import asyncio
+import logging
+
+from inkbird_ble_custom.commands import SETTING_FRAME_TYPES, InkbirdCommandQueue
+from inkbird_ble_custom.metrics import InkbirdDeviceMetrics
+from inkbird_ble_custom.parser import ALARM_MODE, DEVICE_FIELD, InkbirdIamT1Device, InkbirdNotification, SAMPLING_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Device:
+    """Answers writes like the device, unless it is silent."""
+
+    def __init__(self, silent: bool = False):
+        self.state = InkbirdIamT1Device(alarm_mode=ALARM_MODE.OFF, sampling_interval=SAMPLING_INTERVAL.ONE)
+        self.silent = silent
+        self.written = []
+        self.changes = []
+        self.queue = InkbirdCommandQueue(_LOGGER, self.state, self.write, self.changes.append, timeout=0.05)
+
+    async def write(self, value):
+        self.written.append(value)
+        await asyncio.sleep(0.01)
+        if not self.silent:
+            self.notify(InkbirdNotification.create_response(value))
+
+    def notify(self, frame: bytes):
+        changed = self.state.update(frame)
+        setting = SETTING_FRAME_TYPES[frame[2]]
+        if self.queue.async_notified(setting):
+            changed &= ~setting
+        return changed
+
+
+async def _settle(queue: InkbirdCommandQueue):
+    while queue.pending:
+        await asyncio.sleep(0)
+
+
+def test_optimistic_and_confirmed():
+    async def run():
+        device = _Device()
+        device.queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        assert device.state.alarm_mode is ALARM_MODE.ONCE
+        assert device.changes == [DEVICE_FIELD.ALARM_MODE]
+        await _settle(device.queue)
+        assert device.written == [ALARM_MODE.ONCE]
+        assert device.state.alarm_mode is ALARM_MODE.ONCE
+    asyncio.run(run())
+
+
+def test_coalesces_repeated_selects():
+    async def run():
+        device = _Device()
+        device.queue.async_set(DEVICE_FIELD.SAMPLING_INTERVAL, SAMPLING_INTERVAL.TWO)
+        device.queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        device.queue.async_set(DEVICE_FIELD.SAMPLING_INTERVAL, SAMPLING_INTERVAL.FIVE)
+        device.queue.async_set(DEVICE_FIELD.SAMPLING_INTERVAL, SAMPLING_INTERVAL.TEN)
+        await _settle(device.queue)
+        assert device.written == [ALARM_MODE.ONCE, SAMPLING_INTERVAL.TEN]
+        assert device.state.sampling_interval is SAMPLING_INTERVAL.TEN
+    asyncio.run(run())
+
+
+def test_rollback_without_answer():
+    async def run():
+        device = _Device(silent=True)
+        device.queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.EVERY_TIME)
+        await _settle(device.queue)
+        assert device.state.alarm_mode is ALARM_MODE.OFF
+        assert device.changes == [DEVICE_FIELD.ALARM_MODE, DEVICE_FIELD.ALARM_MODE]
+    asyncio.run(run())
+
+
+def test_stale_notification_keeps_optimistic_value():
+    async def run():
+        device = _Device(silent=True)
+        device.queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        # e.g. the state notified after connecting, before the write
+        assert device.notify(InkbirdNotification.create_response(ALARM_MODE.OFF)) == 0
+        assert device.state.alarm_mode is ALARM_MODE.ONCE
+        await device.queue.async_stop()
+    asyncio.run(run())
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_write_latency_and_task_factory():
+    async def run():
+        clock = _Clock()
+        metrics = InkbirdDeviceMetrics()
+        state = InkbirdIamT1Device(address="AA:BB", alarm_mode=ALARM_MODE.OFF)
+        names = []
+        queue = None
+
+        async def write(value):
+            clock.now += 2.5
+            state.update(InkbirdNotification.create_response(value))
+            queue.async_notified(DEVICE_FIELD.ALARM_MODE.value)
+
+        def create_task(coro, name):
+            names.append(name)
+            return asyncio.get_running_loop().create_task(coro)
+
+        queue = InkbirdCommandQueue(
+            _LOGGER, state, write, lambda field: None, metrics, create_task=create_task, clock=clock
+        )
+        queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.EVERY_TIME)
+        await _settle(queue)
+        assert names == ["AA:BB settings"]
+        assert metrics.writes == 1
+        assert metrics.write_latency == {"alarm_mode": 2.5}
+    asyncio.run(run())
+
+
+def test_failed_write_restores_notified_value():
+    async def run():
+        state = InkbirdIamT1Device(alarm_mode=ALARM_MODE.OFF)
+        changes = []
+
+        async def write(value):
+            raise OSError("not connected")
+
+        queue = InkbirdCommandQueue(_LOGGER, state, write, changes.append, clock=_Clock())
+        queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        await _settle(queue)
+        assert state.alarm_mode is ALARM_MODE.OFF
+        assert changes == [DEVICE_FIELD.ALARM_MODE, DEVICE_FIELD.ALARM_MODE]
+    asyncio.run(run())
+
+
+def test_stale_notification_after_write_is_no_answer():
+    async def run():
+        device = _Device(silent=True)
+        device.queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        await asyncio.sleep(0.02)
+        assert device.written == [ALARM_MODE.ONCE]
+        # e.g. the state notified after a reconnect, the device hasn't applied the write
+        assert device.notify(InkbirdNotification.create_response(ALARM_MODE.OFF)) == 0
+        assert device.state.alarm_mode is ALARM_MODE.ONCE
+        assert device.queue.pending
+        await _settle(device.queue)
+        # Not answered in time, the notified value is restored.
+        assert device.state.alarm_mode is ALARM_MODE.OFF
+    asyncio.run(run())
+
+
+def test_deadline_covers_waiting_for_the_connection():
+    async def run():
+        state = InkbirdIamT1Device(alarm_mode=ALARM_MODE.OFF)
+        changes = []
+
+        async def write(value):
+            # e.g. a reconnect backoff
+            await asyncio.sleep(3600)
+
+        queue = InkbirdCommandQueue(_LOGGER, state, write, changes.append, timeout=0.05)
+        queue.async_set(DEVICE_FIELD.ALARM_MODE, ALARM_MODE.ONCE)
+        async with asyncio.timeout(1):
+            await _settle(queue)
+        assert state.alarm_mode is ALARM_MODE.OFF
+        assert changes == [DEVICE_FIELD.ALARM_MODE, DEVICE_FIELD.ALARM_MODE]
+    asyncio.run(run())
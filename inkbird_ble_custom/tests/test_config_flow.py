@@ -0,0 +1,31 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from inkbird.config_flow import InspectorBLEConfigFlow
+from inkbird.const import DATA_PROBE_CACHE, PROBE_CACHE_TTL
+from inkbird.inkbird_ble_custom.parser import InkbirdIamT1Device
+
+
+def test_probe_cache_evicts_expired_entries():
+    now = time.monotonic()
+    fresh = InkbirdIamT1Device(address="AA:BB:CC:DD:EE:01")
+    cache = {
+        fresh.address: (now, fresh),
+        "AA:BB:CC:DD:EE:02": (now - PROBE_CACHE_TTL - 1, InkbirdIamT1Device(address="AA:BB:CC:DD:EE:02")),
+    }
+    flow = InspectorBLEConfigFlow()
+    flow.hass = SimpleNamespace(data={DATA_PROBE_CACHE: cache})
+
+    device = asyncio.run(flow._get_device_data(SimpleNamespace(address=fresh.address)))
+
+    assert device.address == fresh.address
+    assert list(cache) == [fresh.address]
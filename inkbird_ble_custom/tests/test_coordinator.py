@@ -0,0 +1,325 @@
+import asyncio
+import logging
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from bleak.exc import BleakError
+from bleak_retry_connector import BleakClientWithServiceCache
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from inkbird import coordinator as coordinator_module
+from inkbird.coordinator import ROLLING_CHANGED, InkbirdCoordinator
+from inkbird.hub import InkbirdHub
+from inkbird.inkbird_ble_custom.filters import InkbirdReadingFilter
+from inkbird.inkbird_ble_custom.parser import SAMPLING_INTERVAL, TEMPERATURE_UNIT, InkbirdIamT1Device
+from inkbird.inkbird_ble_custom.simulator import InkbirdSimulatedDevice, SimulatedBleakClient
+from inkbird.inkbird_ble_custom.timers import InkbirdTimerWheel
+from inkbird.scheduler import InkbirdScheduler
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+
+def _hold(monkeypatch, silent: bool, duration: float = 0.6) -> tuple[SimulatedBleakClient, InkbirdCoordinator]:
+    """Hold a connection to a device sending a frame every 10 ms, with a watchdog of 100 ms."""
+    # One minute sampling interval
+    monkeypatch.setattr(coordinator_module, "WATCHDOG_INTERVALS", 0.1 / 60)
+    clients = []
+    coordinators = []
+
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        client = SimulatedBleakClient(address, device=InkbirdSimulatedDevice(address), sensor_period=0.01,
+                                      connect_delay=0, **kwargs)
+        client.silent = silent
+        clients.append(client)
+        return client
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0))
+        hub.timers = InkbirdTimerWheel(hass.loop, resolution=0.01)
+        coordinator = InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=ADDRESS), hub,
+                                         client_factory=client_factory)
+        coordinators.append(coordinator)
+        coordinator.async_start()
+        await asyncio.sleep(duration)
+        await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+    asyncio.run(run())
+    return clients[0], coordinators[0]
+
+
+def test_connection_delivering_frames_is_held(monkeypatch):
+    client, coordinator = _hold(monkeypatch, silent=False)
+    assert client.connects == 1
+    assert client.frames_sent > 20
+    assert coordinator.metrics.reconnects == 0
+
+
+def test_silent_connection_is_reconnected(monkeypatch):
+    _, coordinator = _hold(monkeypatch, silent=True)
+    assert coordinator.metrics.reconnects >= 1
+
+
+def _duty_cycle(monkeypatch, silent: bool = False, duration: float = 0.55, sampling_seconds: float | None = None,
+                during=None) -> tuple[SimulatedBleakClient, InkbirdCoordinator]:
+    """Run a duty-cycled device, optionally with a sampling interval of sampling_seconds instead of minutes."""
+    if sampling_seconds is not None:
+        monkeypatch.setattr(InkbirdCoordinator, "sampling_seconds", property(lambda _: sampling_seconds))
+    clients = []
+    coordinators = []
+
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        # Only the state notified after connecting, no periodic sensor data.
+        client = SimulatedBleakClient(address, device=InkbirdSimulatedDevice(address), sensor_period=60,
+                                      connect_delay=0, **kwargs)
+        client.silent = silent
+        clients.append(client)
+        return client
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0))
+        hub.timers = InkbirdTimerWheel(hass.loop, resolution=0.01)
+        coordinator = InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=ADDRESS), hub,
+                                         duty_cycle=True, client_factory=client_factory)
+        coordinators.append(coordinator)
+        coordinator.async_start()
+        if during is not None:
+            await during(coordinator, clients[0])
+        else:
+            await asyncio.sleep(duration)
+        await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+    asyncio.run(run())
+    return clients[0], coordinators[0]
+
+
+def test_duty_cycle_connects_once_per_sampling_interval(monkeypatch):
+    client, coordinator = _duty_cycle(monkeypatch, sampling_seconds=0.1)
+    # Right away, then every 100 ms
+    assert 4 <= client.connects <= 7
+    assert coordinator.metrics.windows == client.connects
+    assert coordinator.metrics.reconnects == 0
+    # Connected only for the few ms each window takes
+    assert 0 < coordinator.duty_cycle_ratio < 0.5
+    assert coordinator.data.sampling_interval is not None
+
+
+def test_duty_cycle_window_without_sensor_data_times_out(monkeypatch):
+    monkeypatch.setattr(coordinator_module, "COLLECT_TIMEOUT", 0.05)
+    monkeypatch.setattr(coordinator_module, "RECONNECT_BACKOFF_MIN", 0.01)
+    client, coordinator = _duty_cycle(monkeypatch, silent=True, duration=0.4)
+    # Every window ran out of time, was disconnected and counts as failed.
+    assert client.connects >= 2
+    assert coordinator.metrics.windows == client.connects
+    assert coordinator.metrics.reconnects >= client.connects - 1
+    assert coordinator.duty_cycle_ratio < 1
+    assert coordinator.data.sampling_interval is None
+
+
+def test_duty_cycle_write_opens_an_early_window(monkeypatch):
+    connects = []
+
+    async def during(coordinator: InkbirdCoordinator, client: SimulatedBleakClient):
+        await asyncio.sleep(0.1)
+        connects.append(client.connects)
+        # The next window would be a minute away.
+        await coordinator.update_sampling_interval(SAMPLING_INTERVAL.TWO)
+        await asyncio.sleep(0.2)
+        connects.append(client.connects)
+
+    client, _ = _duty_cycle(monkeypatch, during=during)
+    assert connects == [1, 2]
+    assert client.device.sampling_interval == SAMPLING_INTERVAL.TWO
+
+
+def test_pending_call_given_up_is_skipped():
+    calls = []
+
+    async def call():
+        calls.append(1)
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test"))
+        coordinator = InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=ADDRESS), hub)
+        # e.g. a settings write running out of time while the device is reconnected
+        with pytest.raises(TimeoutError):
+            async with asyncio.timeout(0.01):
+                await coordinator._async_when_connected(call)
+        await coordinator._async_run_pending()
+        coordinator._fail_pending(RuntimeError("disconnected"))
+        hub.async_close()
+        await hass.async_stop(force=True)
+    asyncio.run(run())
+    assert calls == []
+
+
+def test_connection_loop_ends_before_unregistering():
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        return SimulatedBleakClient(address, device=InkbirdSimulatedDevice(address), sensor_period=0.01,
+                                    connect_delay=0, **kwargs)
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0))
+        coordinator = InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=ADDRESS), hub,
+                                         client_factory=client_factory)
+        running = []
+        unregister = hub.async_unregister
+        hub.async_unregister = lambda c: (running.append(c._connection_task is not None), unregister(c))
+        coordinator.async_start()
+        await asyncio.sleep(0.05)
+        await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+        return running
+
+    assert asyncio.run(run()) == [False]
+
+
+def test_filter_throttles_rolling_statistics():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test"))
+        device = InkbirdIamT1Device(address=ADDRESS, temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+        coordinator = InkbirdCoordinator(hass, logger, "inkbird", device, hub,
+                                         reading_filter=InkbirdReadingFilter((50, 50, 5000, 500)))
+        updates = []
+        coordinator.async_add_listener(lambda: updates.append(1), ROLLING_CHANGED)
+        simulated = InkbirdSimulatedDevice(ADDRESS, seed=1)
+        for frame in simulated.sensor_frames(20):
+            coordinator._handle_notification(bytearray(frame))
+            coordinator.async_flush_updates()
+        hub.async_close()
+        await hass.async_stop(force=True)
+        return updates
+
+    # The first frame publishes every reading, the small drifts after it are held back.
+    assert len(asyncio.run(run())) == 1
+
+
+def _bluetooth(monkeypatch, ble_devices: list, clients: list, calls: list):
+    """Let Home Assistant's Bluetooth stack see the devices in ble_devices, one per lookup, and connect to clients."""
+    monkeypatch.setattr(coordinator_module.bluetooth, "async_ble_device_from_address",
+                        lambda hass, address, connectable: ble_devices.pop(0) if ble_devices else None)
+
+    async def establish_connection(client_class, ble_device, name, **kwargs):
+        calls.append((client_class, ble_device, name, kwargs))
+        client = clients.pop(0)
+        await client.connect()
+        return client
+
+    monkeypatch.setattr(coordinator_module, "establish_connection", establish_connection)
+
+
+async def _async_coordinator() -> tuple[HomeAssistant, InkbirdHub, InkbirdCoordinator]:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    logger = logging.getLogger("inkbird.test")
+    hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0))
+    coordinator = InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=ADDRESS), hub)
+    return hass, hub, coordinator
+
+
+def test_out_of_range_fails_the_connect(monkeypatch):
+    monkeypatch.setattr(coordinator_module, "RECONNECT_BACKOFF_MIN", 60)
+    calls = []
+    _bluetooth(monkeypatch, [], [], calls)
+
+    async def run():
+        hass, hub, coordinator = await _async_coordinator()
+        assert not coordinator.is_connected
+        with pytest.raises(UpdateFailed):
+            await coordinator._async_establish_connection()
+        # A write waiting for the connection gets the reason it can't connect.
+        write = asyncio.ensure_future(coordinator._async_when_connected(lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0)
+        coordinator.async_start()
+        with pytest.raises(UpdateFailed):
+            async with asyncio.timeout(1):
+                await write
+        assert coordinator.metrics.reconnects == 1
+        await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+    # Not in range, not even tried.
+    assert calls == []
+
+
+def test_connects_through_the_bluetooth_stack(monkeypatch):
+    near, far = SimpleNamespace(name="near"), SimpleNamespace(name="far")
+    client = SimulatedBleakClient(ADDRESS, device=InkbirdSimulatedDevice(ADDRESS), sensor_period=0.01, connect_delay=0)
+    calls = []
+    _bluetooth(monkeypatch, [near], [client], calls)
+
+    async def run():
+        hass, hub, coordinator = await _async_coordinator()
+        coordinator.async_start()
+        await asyncio.sleep(0.05)
+        connected = coordinator.is_connected, coordinator.client is client
+        await coordinator.async_shutdown()
+        disconnected = coordinator.is_connected
+        hub.async_close()
+        await hass.async_stop(force=True)
+        return coordinator, connected, disconnected
+
+    coordinator, connected, disconnected = asyncio.run(run())
+    assert connected == (True, True)
+    assert not disconnected
+    ((client_class, ble_device, name, kwargs),) = calls
+    assert (client_class, ble_device, name) == (BleakClientWithServiceCache, near, ADDRESS)
+    assert kwargs["max_attempts"] == coordinator_module.CONNECT_ATTEMPTS
+    assert kwargs["disconnected_callback"] == coordinator._on_disconnected
+    # A retry goes to the adapter hearing the device now, or the one that did before if none does.
+    assert kwargs["ble_device_callback"]() is near
+    monkeypatch.setattr(coordinator_module.bluetooth, "async_ble_device_from_address", lambda *_, **__: far)
+    assert kwargs["ble_device_callback"]() is far
+
+
+def test_outdated_service_cache_is_cleared(monkeypatch):
+    monkeypatch.setattr(coordinator_module, "RECONNECT_BACKOFF_MIN", 60)
+
+    class CachedClient(SimulatedBleakClient, BleakClientWithServiceCache):
+        cleared = 0
+
+        async def start_notify(self, uuid, callback, **kwargs):
+            raise BleakError("Characteristic not found")
+
+        async def clear_cache(self) -> bool:
+            self.cleared += 1
+            return True
+
+    client = CachedClient(ADDRESS, device=InkbirdSimulatedDevice(ADDRESS), connect_delay=0)
+    _bluetooth(monkeypatch, [SimpleNamespace()], [client], [])
+
+    async def run():
+        hass, hub, coordinator = await _async_coordinator()
+        coordinator.async_start()
+        await asyncio.sleep(0.05)
+        await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+        return coordinator
+
+    coordinator = asyncio.run(run())
+    assert client.cleared == 1
+    assert coordinator.metrics.reconnects == 1
+    assert not client.is_connected
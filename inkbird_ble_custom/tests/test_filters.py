@@ -0,0 +1,45 @@
+from inkbird_ble_custom.filters import InkbirdReadingFilter
+from inkbird_ble_custom.parser import DEVICE_FIELD, InkbirdIamT1Device, READING
+
+def _update(device: InkbirdIamT1Device, timestamp: float, temperature: float, co2: int) -> int:
+    """Set the readings like a sensor frame, returns the changed DEVICE_FIELD flags."""
+    changed = 0
+    for reading, value in ((READING.TEMPERATURE, round(temperature * 10)), (READING.CO2, co2)):
+        if device.values[reading] != value or not device.valid & (1 << reading):
+            changed |= 1 << reading
+        device.values[reading] = value
+        device.updated[reading] = timestamp
+        device.valid |= 1 << reading
+    return changed
+
+def test_deadband():
+    device = InkbirdIamT1Device()
+    readings = InkbirdReadingFilter(deadband=(0.3, 0, 20, 0), heartbeat=3600)
+    assert readings.apply(device, _update(device, 0, 21.0, 600)) == DEVICE_FIELD.TEMPERATURE | DEVICE_FIELD.CO2
+    assert readings.apply(device, _update(device, 60, 21.1, 610)) == 0
+    # Measured from the last published value, not the last reading
+    assert readings.apply(device, _update(device, 120, 21.3, 615)) == DEVICE_FIELD.TEMPERATURE
+    assert readings.apply(device, _update(device, 180, 21.3, 620)) == DEVICE_FIELD.CO2
+
+def test_min_interval():
+    device = InkbirdIamT1Device()
+    readings = InkbirdReadingFilter(min_interval=(0, 0, 300, 0), heartbeat=3600)
+    readings.apply(device, _update(device, 0, 21.0, 600))
+    assert readings.apply(device, _update(device, 60, 21.1, 700)) == DEVICE_FIELD.TEMPERATURE
+    assert readings.apply(device, _update(device, 300, 21.1, 710)) == DEVICE_FIELD.CO2
+
+def test_heartbeat():
+    device = InkbirdIamT1Device()
+    readings = InkbirdReadingFilter(deadband=(1, 0, 0, 0), heartbeat=600)
+    readings.apply(device, _update(device, 0, 21.0, 600))
+    assert readings.apply(device, _update(device, 300, 21.2, 600)) == 0
+    assert readings.apply(device, _update(device, 600, 21.2, 600)) == DEVICE_FIELD.TEMPERATURE
+    # Unchanged values need no heartbeat
+    assert readings.apply(device, _update(device, 1800, 21.2, 600)) == 0
+
+def test_other_fields_pass():
+    device = InkbirdIamT1Device()
+    readings = InkbirdReadingFilter(deadband=(1, 1, 100, 1))
+    readings.apply(device, _update(device, 0, 21.0, 600))
+    changed = _update(device, 60, 21.1, 601) | DEVICE_FIELD.ALARM_MODE
+    assert readings.apply(device, changed) == DEVICE_FIELD.ALARM_MODE
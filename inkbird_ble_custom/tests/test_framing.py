@@ -0,0 +1,74 @@
+from inkbird_ble_custom.framing import InkbirdFrameDecoder, build_frame
+from inkbird_ble_custom.metrics import InkbirdDeviceMetrics
+from inkbird_ble_custom.parser import ALARM_MODE, InkbirdNotification
+
+SENSOR = bytes.fromhex("55aa011000010301fe028003eb010185")
+# Captured from a device showing Fahrenheit, its checksum is not the sum of the preceding bytes.
+SENSOR_FAHRENHEIT = bytes.fromhex("55aa011010031e027605ea03f101008d")
+ALARM = bytes.fromhex("55aa0409000000000c")
+
+def test_build_frame():
+    assert build_frame(0x04, b"\x00\x00\x00\x00") == ALARM
+    assert InkbirdNotification.create_response(ALARM_MODE.OFF) == ALARM
+
+def test_single_frame():
+    decoder = InkbirdFrameDecoder()
+    notification = bytearray(SENSOR)
+    (frame,) = decoder.feed(notification)
+    # No copy
+    assert frame.obj is notification
+    assert frame == SENSOR
+
+def test_several_frames():
+    decoder = InkbirdFrameDecoder()
+    assert [bytes(frame) for frame in decoder.feed(SENSOR + ALARM + SENSOR)] == [SENSOR, ALARM, SENSOR]
+    assert decoder.frames == 3
+
+def test_reassembly():
+    decoder = InkbirdFrameDecoder()
+    data = SENSOR + ALARM
+    for split in range(1, len(data)):
+        first = [bytes(frame) for frame in decoder.feed(data[:split])]
+        second = [bytes(frame) for frame in decoder.feed(data[split:])]
+        assert first + second == [SENSOR, ALARM], split
+    assert decoder.corrupt_frames == 0
+
+def test_captured_checksum_mismatch_is_kept():
+    metrics = InkbirdDeviceMetrics()
+    decoder = InkbirdFrameDecoder(metrics)
+    assert [bytes(frame) for frame in decoder.feed(SENSOR_FAHRENHEIT)] == [SENSOR_FAHRENHEIT]
+    assert [bytes(frame) for frame in decoder.feed(SENSOR + SENSOR_FAHRENHEIT + ALARM)] == [
+        SENSOR, SENSOR_FAHRENHEIT, ALARM
+    ]
+    data = SENSOR_FAHRENHEIT + ALARM
+    for split in range(1, len(data)):
+        assert [bytes(frame) for frame in decoder.feed(data[:split]) + decoder.feed(data[split:])] == [
+            SENSOR_FAHRENHEIT, ALARM
+        ], split
+    assert metrics.checksum_mismatches == 2 + len(data) - 1
+    assert metrics.corrupt_frames == 0
+
+def test_corrupt_frames():
+    metrics = InkbirdDeviceMetrics()
+    decoder = InkbirdFrameDecoder(metrics)
+    # Neither the checksum nor the length line up, the next header is one byte further.
+    bad_checksum = SENSOR[:-1] + b"\x00\x01"
+    assert [bytes(frame) for frame in decoder.feed(bad_checksum + ALARM)] == [ALARM]
+    bad_length = b"\x55\xaa\x01\x02" + ALARM
+    assert [bytes(frame) for frame in decoder.feed(bad_length)] == [ALARM]
+    assert metrics.corrupt_frames == 2
+    assert metrics.dropped_frames == 0
+
+def test_garbage():
+    metrics = InkbirdDeviceMetrics()
+    decoder = InkbirdFrameDecoder(metrics)
+    assert decoder.feed(b"\x01\x02\x55") == []
+    assert [bytes(frame) for frame in decoder.feed(b"\xaa" + SENSOR[2:])] == [SENSOR]
+    assert decoder.skipped_bytes == 2
+    assert metrics.dropped_frames == 1
+
+def test_reset():
+    decoder = InkbirdFrameDecoder()
+    decoder.feed(SENSOR[:5])
+    decoder.reset()
+    assert [bytes(frame) for frame in decoder.feed(ALARM)] == [ALARM]
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+import struct
+
+from inkbird_ble_custom.history import InkbirdHistoryDecoder
+
+INTERVAL = 60
+# 2024-01-01 12:29:00 UTC, so the current hour holds 30 samples
+END = datetime(2024, 1, 1, 12, 29, tzinfo=timezone.utc).timestamp()
+
+def history_frame(index: int, count: int, samples: list[int]) -> bytes:
+    frame = b"\x55\xaa\x07" + bytes([9 + 2 * len(samples)]) + struct.pack(f">HH{len(samples)}H", index, count, *samples)
+    return frame + bytes([sum(frame) & 0xff])
+
+def hour(h: int) -> datetime:
+    return datetime(2024, 1, 1, h, tzinfo=timezone.utc)
+
+def test_history_hourly_statistics():
+    decoder = InkbirdHistoryDecoder(END, INTERVAL)
+    # 30 samples of the current hour, which is left to the recorder, then 60 samples of 11:00 and 60 of 10:00.
+    samples = [400] * 30 + list(range(500, 560)) + [700] * 60
+    frames = [samples[i:i + 10] for i in range(0, len(samples), 10)]
+
+    for index, frame in enumerate(frames):
+        assert decoder.feed(history_frame(index, len(frames), frame)) is None
+
+    assert decoder.done
+    assert decoder.samples == 150
+    assert decoder.flush() == [
+        {"start": hour(11), "mean": 529.5, "min": 500, "max": 559},
+        {"start": hour(10), "mean": 700, "min": 700, "max": 700},
+    ]
+
+def test_history_batches():
+    decoder = InkbirdHistoryDecoder(END, INTERVAL, batch_hours=2)
+    # The current half hour, followed by six full hours.
+    frames = (30 + 6 * 60) // 10
+
+    batches = [decoder.feed(history_frame(index, frames, [600] * 10)) for index in range(frames)]
+
+    batches = [batch for batch in batches if batch]
+    assert [[stat["start"] for stat in batch] for batch in batches] == [[hour(11), hour(10)], [hour(9), hour(8)]]
+    assert [stat["start"] for stat in decoder.flush()] == [hour(7), hour(6)]
+
+def test_history_missed_frame_keeps_timestamps():
+    decoder = InkbirdHistoryDecoder(END, INTERVAL)
+
+    decoder.feed(history_frame(0, 3, [400] * 30))
+    decoder.feed(history_frame(2, 3, [800] * 30))
+
+    assert decoder.done
+    assert decoder.missed_frames == 1
+    assert decoder.flush() == [{"start": hour(11), "mean": 800, "min": 800, "max": 800}]
+
+def test_history_repeated_frame_ignored():
+    decoder = InkbirdHistoryDecoder(END, INTERVAL)
+
+    decoder.feed(history_frame(0, 2, [400] * 30))
+    decoder.feed(history_frame(0, 2, [400] * 30))
+
+    assert not decoder.done
+    assert decoder.samples == 30
+
+def test_history_samples_callback():
+    samples = []
+    decoder = InkbirdHistoryDecoder(END, INTERVAL, on_sample=lambda timestamp, co2: samples.append((timestamp, co2)))
+
+    decoder.feed(history_frame(0, 1, [500, 501]))
+
+    assert samples == [(END, 500), (END - INTERVAL, 501)]
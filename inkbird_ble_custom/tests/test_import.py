@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+from conftest import PACKAGE_DIR
+
+# Importing the codec must stay cheap, it is loaded with the integration and by every collector.
+HEAVY_MODULES = ("homeassistant", "bleak", "bluetooth_data_tools")
+
+_MEASURE = f"""
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location(
+    "inkbird_ble_custom", {str(PACKAGE_DIR / "__init__.py")!r}, submodule_search_locations=[{str(PACKAGE_DIR)!r}]
+)
+module = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = module
+spec.loader.exec_module(module)
+print(" ".join(sorted(name for name in sys.modules if name.split(".")[0] in {HEAVY_MODULES!r})))
+"""
+
+def test_import_is_light():
+    # Isolated, the working directory may be the integration, whose select.py shadows the standard library.
+    result = subprocess.run([sys.executable, "-I", "-c", _MEASURE], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from homeassistant.core import HomeAssistant
+
+import inkbird
+from inkbird.const import DATA_HUB, DOMAIN
+from inkbird.coordinator import InkbirdCoordinator
+from inkbird.hub import InkbirdHub
+from inkbird.inkbird_ble_custom.parser import InkbirdIamT1Device
+
+
+def test_unloading_the_last_entry_closes_the_hub():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+
+        async def unload_platforms(entry, platforms):
+            return True
+
+        hass.config_entries = SimpleNamespace(async_unload_platforms=unload_platforms)
+        logger = logging.getLogger("inkbird.test")
+        hub = hass.data[DATA_HUB] = InkbirdHub(hass, logger)
+        coordinators = hass.data[DOMAIN] = {
+            entry_id: InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=address), hub)
+            for entry_id, address in (("first", "AA:BB:CC:DD:EE:01"), ("second", "AA:BB:CC:DD:EE:02"))
+        }
+        shutdowns = []
+        for coordinator in coordinators.values():
+            coordinator.async_shutdown = lambda coordinator=coordinator: _record(shutdowns, coordinator)
+        closed = []
+        hub.async_close = lambda: closed.append(hub)
+        first, second = coordinators["first"], coordinators["second"]
+
+        # The unload callback runs after async_unload_entry
+        assert await inkbird.async_unload_entry(hass, SimpleNamespace(entry_id="first"))
+        await inkbird._async_shutdown(hass, "first", first)
+        assert hass.data[DATA_HUB] is hub
+        assert not closed
+
+        assert await inkbird.async_unload_entry(hass, SimpleNamespace(entry_id="second"))
+        await inkbird._async_shutdown(hass, "second", second)
+        assert DATA_HUB not in hass.data
+        assert closed == [hub]
+        assert shutdowns == [first, second]
+        await hass.async_stop(force=True)
+    asyncio.run(run())
+
+
+async def _record(shutdowns, coordinator):
+    shutdowns.append(coordinator)
@@ -0,0 +1,28 @@
+from inkbird_ble_custom.metrics import InkbirdDeviceMetrics
+
+
+def test_frames():
+    metrics = InkbirdDeviceMetrics()
+    assert metrics.mean_parse_us is None
+    metrics.record_frame(0x01, 2000)
+    metrics.record_frame(0x01, 4000)
+    metrics.record_frame(0x02, 6000)
+    assert metrics.frames == {0x01: 2, 0x02: 1}
+    assert metrics.total_frames == 3
+    assert metrics.mean_parse_us == 4
+    assert metrics.parse_ns_max == 6000
+    assert metrics.as_dict()["frames"] == {"0x01": 2, "0x02": 1}
+
+
+def test_connection():
+    metrics = InkbirdDeviceMetrics()
+    metrics.started = 0.0
+    metrics.record_connected(1.5)
+    metrics.connected_since = 10.0
+    assert metrics.uptime(now=15.0) == 5.0
+    assert metrics.duty_cycle_ratio(now=20.0) == 0.5
+    metrics.record_disconnected()
+    assert metrics.connected_since is None
+    assert metrics.connect_latency == metrics.connect_latency_max == 1.5
+    metrics.record_write("alarm_mode", 0.25)
+    assert metrics.as_dict()["write_latency_s"] == {"alarm_mode": 0.25}
@@ -1,5 +1,4 @@
-from parser import InkbirdIamT1Device, ALARM_MODE, SAMPLING_INTERVAL, TEMPERATURE_UNIT
-from homeassistant.components.sensor import SensorDeviceClass
+from inkbird_ble_custom.parser import InkbirdIamT1Device, ALARM_MODE, DEVICE_FIELD, READING, SAMPLING_INTERVAL, TEMPERATURE_UNIT
 import pytest
 
 def test_notification_sensor():
@@ -8,10 +7,10 @@ def test_notification_sensor():
 
     device.update(bytes.fromhex(notification))
 
-    assert device.sensors[SensorDeviceClass.TEMPERATURE] == 25.9
-    assert device.sensors[SensorDeviceClass.HUMIDITY] == 51
-    assert device.sensors[SensorDeviceClass.CO2] == 640
-    assert device.sensors[SensorDeviceClass.ATMOSPHERIC_PRESSURE] == 1003
+    assert device.reading(READING.TEMPERATURE) == 25.9
+    assert device.reading(READING.HUMIDITY) == 51
+    assert device.reading(READING.CO2) == 640
+    assert device.reading(READING.ATMOSPHERIC_PRESSURE) == 1003
 
 def test_notification_sensor_fahrenheit():
     device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.FAHRENHEIT)
@@ -19,10 +18,10 @@ def test_notification_sensor_fahrenheit():
 
     device.update(bytes.fromhex(notification))
 
-    assert device.sensors[SensorDeviceClass.TEMPERATURE] == 26.6
-    assert device.sensors[SensorDeviceClass.HUMIDITY] == 63
-    assert device.sensors[SensorDeviceClass.CO2] == 1514
-    assert device.sensors[SensorDeviceClass.ATMOSPHERIC_PRESSURE] == 1009
+    assert device.reading(READING.TEMPERATURE) == 26.6
+    assert device.reading(READING.HUMIDITY) == 63
+    assert device.reading(READING.CO2) == 1514
+    assert device.reading(READING.ATMOSPHERIC_PRESSURE) == 1009
 
 @pytest.mark.parametrize("notification, expected", [
     ("55aa0409000000000c", ALARM_MODE.OFF),
@@ -61,4 +60,55 @@ def test_notification_temperature_unit(notification, expected):
 
     device.update(bytes.fromhex(notification))
 
-    assert device.temperature_unit == expected
\ No newline at end of file
+    assert device.temperature_unit == expected
+def test_notification_sensor_zero_temperature():
+    device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    notification = "55aa011000000000fe028003eb010181"
+
+    device.update(bytes.fromhex(notification))
+
+    assert device.reading(READING.TEMPERATURE) == 0.0
+
+def test_update_reports_changed_fields():
+    device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+
+    assert device.update(bytes.fromhex("55aa011000010301fe028003eb010185")) == (
+        DEVICE_FIELD.TEMPERATURE | DEVICE_FIELD.HUMIDITY | DEVICE_FIELD.CO2 | DEVICE_FIELD.ATMOSPHERIC_PRESSURE
+    )
+    # Only the co2 value differs
+    assert device.update(bytes.fromhex("55aa011000010301fe028103eb010186")) == DEVICE_FIELD.CO2
+    assert device.update(bytes.fromhex("55aa011000010301fe028103eb010186")) == 0
+
+    assert device.update(bytes.fromhex("55aa0409010000000d")) == DEVICE_FIELD.ALARM_MODE
+    assert device.update(bytes.fromhex("55aa0409010000000d")) == 0
+    assert device.update(bytes.fromhex("55aa030d0000000000000000000000")) == 0
+
+def test_temperature_unknown_without_unit():
+    device = InkbirdIamT1Device()
+
+    assert device.update(bytes.fromhex("55aa011000010301fe028003eb010185")) == (
+        DEVICE_FIELD.HUMIDITY | DEVICE_FIELD.CO2 | DEVICE_FIELD.ATMOSPHERIC_PRESSURE
+    )
+    assert device.reading(READING.TEMPERATURE) is None
+    assert device.reading_updated(READING.TEMPERATURE) is None
+    assert device.reading_updated(READING.CO2) > 0
+
+def test_dict_round_trip():
+    device = InkbirdIamT1Device(model="Ink@IAM-T1", address="AA:BB", sampling_interval=SAMPLING_INTERVAL.FIVE,
+                                temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    device.update(bytes.fromhex("55aa011000010301fe028003eb010185"))
+
+    restored = InkbirdIamT1Device.from_dict(device.as_dict())
+
+    assert restored == device
+    assert restored.sampling_interval is SAMPLING_INTERVAL.FIVE
+    assert restored.alarm_mode is None
+    assert restored.reading(READING.TEMPERATURE) == 25.9
+    assert restored.reading(READING.CO2) == 640
+
+def test_from_dict_ignores_unknown_values():
+    device = InkbirdIamT1Device.from_dict({"address": "AA:BB", "alarm_mode": 9, "sensors": {}, "readings": {"x": [1, 0]}})
+
+    assert device.address == "AA:BB"
+    assert device.alarm_mode is None
+    assert device.valid == 0
@@ -0,0 +1,64 @@
+from inkbird_ble_custom.parser import InkbirdIamT1Device, READING, TEMPERATURE_UNIT
+from inkbird_ble_custom.rolling import InkbirdRollingStats, RollingWindow
+import pytest
+
+def test_window_statistics():
+    window = RollingWindow(duration=100, capacity=10)
+    assert window.mean is window.min is window.max is window.rate is None
+
+    for t, value in enumerate([5, 3, 8, 6]):
+        window.push(value, t * 10)
+
+    assert len(window) == 4
+    assert window.mean == 5.5
+    assert window.min == 3
+    assert window.max == 8
+    assert window.rate == pytest.approx(1 / 30)
+
+def test_window_drops_old_samples():
+    window = RollingWindow(duration=25, capacity=10)
+    for t, value in enumerate([1, 9, 2, 4, 3]):
+        window.push(value, t * 10)
+
+    # Samples at 20, 30 and 40 remain
+    assert len(window) == 3
+    assert window.mean == 3
+    assert window.min == 2
+    assert window.max == 4
+
+def test_window_capacity():
+    window = RollingWindow(duration=1000, capacity=3)
+    for t, value in enumerate([7, 1, 2, 3]):
+        window.push(value, t)
+
+    assert len(window) == 3
+    assert window.min == 1
+    assert window.max == 3
+    assert window.mean == 2
+
+def test_window_time_above_level():
+    window = RollingWindow(duration=35, capacity=10, level=1000)
+    for t, value in enumerate([900, 1100, 1200, 800, 1100]):
+        window.push(value, t * 10)
+    assert window.above_seconds == 20
+
+    # Drops the samples at 0 and 10, and the interval that started at 10 with them
+    window.push(700, 50)
+    assert window.above_seconds == 20
+
+def test_stats_from_device():
+    device = InkbirdIamT1Device(temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    stats = InkbirdRollingStats(co2_level=700)
+
+    device.update(bytes.fromhex("55aa011000010301fe028003eb010185"))
+    device.updated[READING.CO2] = 0
+    stats.push(device)
+    device.update(bytes.fromhex("55aa011000010401fe02bc03eb0101c2"))
+    device.updated[READING.CO2] = 600
+    stats.push(device)
+
+    assert stats.mean(READING.TEMPERATURE) == 25.95
+    assert stats.min(READING.CO2) == 640
+    assert stats.max(READING.CO2) == 700
+    assert stats.rate_per_hour(READING.CO2) == 360
+    assert stats.co2_above_seconds == 0
@@ -0,0 +1,198 @@
+import asyncio
+from contextlib import suppress
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from inkbird import scheduler as scheduler_module
+from inkbird.scheduler import COLLECT_WINDOW, InkbirdScheduler
+
+LOGGER = logging.getLogger("inkbird.test")
+
+
+class _Device:
+    """The parts of InkbirdCoordinator the scheduler looks at."""
+
+    def __init__(self, address: str):
+        self.data = type("Data", (), {"address": address})()
+        self.duty_cycle = False
+        self.sampling_seconds = 60
+        self.age = 0.0
+        self.reschedules = 0
+
+    def staleness(self, now: float) -> float:
+        return self.age
+
+    def async_reschedule(self) -> None:
+        self.reschedules += 1
+
+
+def test_worst_case_data_age():
+    scheduler = InkbirdScheduler(None, LOGGER, slots=1, adapter_resolver=lambda _: "hci0")
+    first, second = _Device("AA:BB:CC:DD:EE:01"), _Device("AA:BB:CC:DD:EE:02")
+    scheduler.async_register(first)
+    assert scheduler.worst_case_data_age(first) == 60
+
+    scheduler.async_register(second)
+    assert scheduler.worst_case_data_age(first) == 60 + COLLECT_WINDOW
+
+    scheduler.async_unregister(second)
+    # e.g. asked for the diagnostics while unloading
+    assert scheduler.worst_case_data_age(second) is None
+
+
+def _scheduler(slots: int, adapters: dict[str, str] | None = None) -> InkbirdScheduler:
+    """A scheduler on the running loop, devices are on hci0 unless adapters says otherwise."""
+    hass = SimpleNamespace(loop=asyncio.get_running_loop())
+    return InkbirdScheduler(hass, LOGGER, slots=slots, adapter_resolver=lambda address: (adapters or {}).get(address, "hci0"))
+
+
+async def _async_hold(scheduler: InkbirdScheduler, device: _Device, order: list[str], release: asyncio.Event) -> None:
+    async with scheduler.async_slot(device):
+        order.append(device.data.address)
+        await release.wait()
+
+
+def test_slots_are_capped_and_go_to_the_stalest():
+    async def run():
+        scheduler = _scheduler(slots=2)
+        devices = [_Device(f"AA:BB:CC:DD:EE:0{i}") for i in range(4)]
+        for device in devices:
+            scheduler.async_register(device)
+        devices[2].age, devices[3].age = 10, 100
+        order = []
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_async_hold(scheduler, device, order, release)) for device in devices]
+        await asyncio.sleep(0.01)
+        # Two slots, the first two got them in the order they asked.
+        assert order == [devices[0].data.address, devices[1].data.address]
+        release.set()
+        await asyncio.gather(*tasks)
+        return devices, order
+
+    devices, order = asyncio.run(run())
+    # The device with the older data is served first.
+    assert order[2:] == [devices[3].data.address, devices[2].data.address]
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        scheduler = _scheduler(slots=1)
+        first, second, third = (_Device(f"AA:BB:CC:DD:EE:0{i}") for i in range(3))
+        for device in (first, second, third):
+            scheduler.async_register(device)
+        order = []
+        release = asyncio.Event()
+        holding = asyncio.create_task(_async_hold(scheduler, first, order, release))
+        waiting = asyncio.create_task(_async_hold(scheduler, second, order, release))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with suppress(asyncio.CancelledError):
+            await waiting
+        release.set()
+        await holding
+        # The slot of the cancelled waiter isn't lost.
+        await asyncio.wait_for(_async_hold(scheduler, third, order, release), 0.1)
+        return order, first, third
+
+    order, first, third = asyncio.run(run())
+    assert order == [first.data.address, third.data.address]
+
+
+def test_slot_granted_while_cancelled_is_released():
+    async def run():
+        scheduler = _scheduler(slots=1)
+        first, second, third = (_Device(f"AA:BB:CC:DD:EE:0{i}") for i in range(3))
+        for device in (first, second, third):
+            scheduler.async_register(device)
+        order = []
+        slot = scheduler.async_slot(first)
+        await slot.__aenter__()
+        waiting = asyncio.create_task(_async_hold(scheduler, second, order, asyncio.Event()))
+        await asyncio.sleep(0.01)
+        # The slot is handed to the waiter, which is cancelled before it gets to run.
+        await slot.__aexit__(None, None, None)
+        waiting.cancel()
+        with suppress(asyncio.CancelledError):
+            await waiting
+        release = asyncio.Event()
+        release.set()
+        await asyncio.wait_for(_async_hold(scheduler, third, order, release), 0.1)
+        return order, third
+
+    order, third = asyncio.run(run())
+    assert order == [third.data.address]
+
+
+def test_devices_take_turns_beyond_the_slots():
+    scheduler = InkbirdScheduler(None, LOGGER, slots=2, adapter_resolver=lambda _: "hci0")
+    devices = [_Device(f"AA:BB:CC:DD:EE:0{i}") for i in range(3)]
+    for device in devices[:2]:
+        scheduler.async_register(device)
+    assert not any(scheduler.rotating(device) for device in devices[:2])
+    assert [device.reschedules for device in devices] == [0, 0, 0]
+
+    scheduler.async_register(devices[2])
+    assert all(scheduler.rotating(device) for device in devices)
+    # Every device of the adapter has to switch to taking turns.
+    assert [device.reschedules for device in devices] == [1, 1, 1]
+
+    scheduler.async_unregister(devices[2])
+    assert not scheduler.rotating(devices[0])
+    assert [device.reschedules for device in devices] == [2, 2, 1]
+    # Unregistering twice, e.g. on a failed setup, is harmless.
+    scheduler.async_unregister(devices[2])
+
+
+def test_duty_cycled_device_always_takes_turns():
+    scheduler = InkbirdScheduler(None, LOGGER, slots=3, adapter_resolver=lambda _: "hci0")
+    device = _Device("AA:BB:CC:DD:EE:01")
+    device.duty_cycle = True
+    scheduler.async_register(device)
+    assert scheduler.rotating(device)
+    assert scheduler.worst_case_data_age(device) == 60 + COLLECT_WINDOW
+
+
+def test_device_moves_to_another_adapter():
+    async def run():
+        adapters = {}
+        scheduler = _scheduler(slots=1, adapters=adapters)
+        first, second = _Device("AA:BB:CC:DD:EE:01"), _Device("AA:BB:CC:DD:EE:02")
+        scheduler.async_register(first)
+        scheduler.async_register(second)
+        assert scheduler.rotating(first)
+
+        # Now heard best by a proxy, where it has a slot of its own.
+        adapters[second.data.address] = "proxy"
+        order = []
+        release = asyncio.Event()
+        release.set()
+        await _async_hold(scheduler, second, order, release)
+        assert not scheduler.rotating(first)
+        assert not scheduler.rotating(second)
+
+        # An unknown adapter keeps the last known one.
+        adapters[second.data.address] = None
+        await _async_hold(scheduler, second, order, release)
+        assert scheduler._membership[second].name == "proxy"
+
+    asyncio.run(run())
+
+
+def test_startup_delays_are_staggered(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    scheduler = InkbirdScheduler(None, LOGGER, adapter_resolver=lambda _: "hci0", startup_stagger=2)
+    assert [scheduler.async_startup_delay() for _ in range(3)] == [0, 2, 4]
+    # A device starting once the others are through connects right away.
+    now[0] += 10
+    assert scheduler.async_startup_delay() == 0
+    now[0] += 1
+    assert scheduler.async_startup_delay() == 1
@@ -0,0 +1,127 @@
+import asyncio
+import cProfile
+import logging
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+
+from inkbird import services
+from inkbird.const import DATA_RECORDINGS, DOMAIN
+from inkbird.coordinator import InkbirdCoordinator
+from inkbird.hub import InkbirdHub
+from inkbird.inkbird_ble_custom.capture import read_capture
+from inkbird.inkbird_ble_custom.parser import InkbirdIamT1Device
+from inkbird.inkbird_ble_custom.simulator import InkbirdSimulatedDevice, SimulatedBleakClient
+from inkbird.inkbird_ble_custom.timers import InkbirdTimerWheel
+from inkbird.scheduler import InkbirdScheduler
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+
+def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+    return SimulatedBleakClient(address, device=InkbirdSimulatedDevice(address), sensor_period=0.01,
+                                connect_delay=0, **kwargs)
+
+
+async def _async_setup() -> tuple[HomeAssistant, InkbirdHub, InkbirdCoordinator]:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    logger = logging.getLogger("inkbird.test")
+    hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0))
+    hub.timers = InkbirdTimerWheel(hass.loop, resolution=0.01)
+    coordinator = InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=ADDRESS), hub,
+                                     client_factory=client_factory)
+    hass.data[DOMAIN] = {"entry": coordinator}
+    coordinator.async_start()
+    return hass, hub, coordinator
+
+
+async def _async_teardown(hass: HomeAssistant, hub: InkbirdHub, coordinator: InkbirdCoordinator) -> None:
+    await coordinator.async_shutdown()
+    hub.async_close()
+    await hass.async_stop(force=True)
+
+
+def test_capture_is_written_while_capturing(monkeypatch):
+    monkeypatch.setattr(services, "CAPTURE_FLUSH_INTERVAL", 0.1)
+
+    async def run():
+        hass, hub, coordinator = await _async_setup()
+        call = SimpleNamespace(data={services.ATTR_DURATION: 0.6})
+        # Returns right away, the capture runs in the background.
+        started = await asyncio.wait_for(services._async_capture_notifications(hass, call), 0.05)
+        sizes = []
+        for _ in range(2):
+            await asyncio.sleep(0.25)
+            sizes.append(os.path.getsize(started["path"]))
+        (task, _) = hass.data[DATA_RECORDINGS][services.SERVICE_CAPTURE_NOTIFICATIONS]
+        result = await task
+        assert coordinator.capture is None
+        assert services.SERVICE_CAPTURE_NOTIFICATIONS not in hass.data[DATA_RECORDINGS]
+        await _async_teardown(hass, hub, coordinator)
+        return started, sizes, result
+
+    started, sizes, result = asyncio.run(run())
+    assert result["path"] == started["path"]
+    assert 0 < sizes[0] < sizes[1]
+    assert len(list(read_capture(result["path"]))) == result["notifications"]
+    assert sizes[1] < os.path.getsize(result["path"])
+
+
+def test_profile_is_stopped_early():
+    async def run():
+        hass, hub, coordinator = await _async_setup()
+        call = SimpleNamespace(data={services.ATTR_DURATION: 3600})
+        started = await asyncio.wait_for(services._async_profile_notifications(hass, call), 0.05)
+        with pytest.raises(ServiceValidationError):
+            await services._async_profile_notifications(hass, call)
+        await asyncio.sleep(0.1)
+        result = await asyncio.wait_for(
+            services._async_stop_recording(hass, services.SERVICE_PROFILE_NOTIFICATIONS), 1
+        )
+        assert coordinator.profiler is None
+        with pytest.raises(ServiceValidationError):
+            await services._async_stop_recording(hass, services.SERVICE_PROFILE_NOTIFICATIONS)
+        # Can be started again once stopped.
+        await services._async_profile_notifications(hass, call)
+        await services._async_stop_recording(hass, services.SERVICE_PROFILE_NOTIFICATIONS)
+        await _async_teardown(hass, hub, coordinator)
+        return started, result
+
+    started, result = asyncio.run(run())
+    assert result["path"] == started["path"]
+    assert os.path.exists(result["path"])
+    assert result["frames"][ADDRESS] > 0
+    assert result["top"]
+
+
+def _light():
+    return sum(range(10))
+
+
+def _heavy():
+    return sum(sum(range(1000)) for _ in range(2000))
+
+
+def test_dump_stats_heaviest_first(tmp_path):
+    profiler = cProfile.Profile()
+    # The light function is profiled first, so it comes first in the unsorted stats.
+    profiler.runcall(_light)
+    profiler.runcall(_heavy)
+
+    top = services._dump_stats(profiler, str(tmp_path / "stats.prof"))
+
+    assert "_heavy" in top[0]
+    cumulative = [float(line.rsplit(", ", 1)[1].removesuffix(" ms")) for line in top]
+    assert cumulative == sorted(cumulative, reverse=True)
+    assert (tmp_path / "stats.prof").exists()
@@ -0,0 +1,48 @@
+from inkbird_ble_custom.parser import InkbirdIamT1Device, ALARM_MODE, READING, SAMPLING_INTERVAL, TEMPERATURE_UNIT
+from inkbird_ble_custom.history import InkbirdHistoryDecoder
+from inkbird_ble_custom.simulator import InkbirdSimulatedDevice
+from inkbird_ble_custom.const import CONNECT_WRITE_DATA
+import pytest
+
+@pytest.mark.parametrize("unit", [TEMPERATURE_UNIT.CELSIUS, TEMPERATURE_UNIT.FAHRENHEIT])
+def test_simulated_connect_burst(unit):
+    simulated = InkbirdSimulatedDevice("AA:BB", temperature=-3.5, humidity=51.2, co2=812, pressure=998,
+                                       sampling_interval=SAMPLING_INTERVAL.FIVE, temperature_unit=unit)
+    device = InkbirdIamT1Device()
+
+    for frame in simulated.handle_write(CONNECT_WRITE_DATA):
+        device.update(frame)
+
+    assert device.sampling_interval == SAMPLING_INTERVAL.FIVE
+    assert device.alarm_mode == ALARM_MODE.OFF
+    assert device.temperature_unit == unit
+    assert [device.reading(reading) for reading in READING] == [-3.5, 51.2, 812, 998]
+
+def test_simulated_setting_write_is_echoed():
+    simulated = InkbirdSimulatedDevice("AA:BB")
+    device = InkbirdIamT1Device()
+
+    for frame in simulated.handle_write(bytes.fromhex("55aa0409010100000e")):
+        device.update(frame)
+
+    assert simulated.alarm_mode == ALARM_MODE.EVERY_TIME
+    assert device.alarm_mode == ALARM_MODE.EVERY_TIME
+
+def test_simulated_history_dump():
+    simulated = InkbirdSimulatedDevice("AA:BB", history_samples=3 * 24 * 60)
+    decoder = InkbirdHistoryDecoder(0, 60, batch_hours=1000)
+
+    for frame in simulated.history_frames():
+        decoder.feed(frame)
+
+    assert decoder.done
+    assert decoder.samples == 3 * 24 * 60
+    assert decoder.missed_frames == 0
+
+def test_simulated_sensor_frame_matches_capture():
+    simulated = InkbirdSimulatedDevice("AA:BB", temperature=(79.8 - 32) / 1.8, humidity=63.0, co2=1514, pressure=1009,
+                                       temperature_unit=TEMPERATURE_UNIT.FAHRENHEIT)
+    assert simulated.sensor_frame() == bytes.fromhex("55aa011010031e027605ea03f101008d")
+
+    simulated = InkbirdSimulatedDevice("AA:BB", temperature=25.9, humidity=51.0, co2=640, pressure=1003)
+    assert simulated.sensor_frame() == bytes.fromhex("55aa011000010301fe028003eb010185")
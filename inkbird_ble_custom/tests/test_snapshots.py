@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import tempfile
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from homeassistant.core import HomeAssistant
+
+from inkbird.coordinator import InkbirdCoordinator
+from inkbird.hub import InkbirdHub
+from inkbird.inkbird_ble_custom.parser import READING, SAMPLING_INTERVAL, TEMPERATURE_UNIT, InkbirdIamT1Device
+from inkbird.inkbird_ble_custom.simulator import InkbirdSimulatedDevice, SimulatedBleakClient
+from inkbird.inkbird_ble_custom.timers import InkbirdTimerWheel
+from inkbird.scheduler import InkbirdScheduler
+from inkbird.snapshots import InkbirdSnapshots
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+
+def _reached() -> InkbirdIamT1Device:
+    """A device with readings and settings, as after its first connection."""
+    device = InkbirdIamT1Device(address=ADDRESS, model="IAM-T1", temperature_unit=TEMPERATURE_UNIT.CELSIUS)
+    device.update(InkbirdSimulatedDevice(ADDRESS).sensor_frame())
+    device.sampling_interval = SAMPLING_INTERVAL.FIVE
+    return device
+
+
+def test_snapshot_is_restored_after_a_restart():
+    config_dir = tempfile.mkdtemp()
+    reached = _reached()
+
+    async def save():
+        hass = HomeAssistant(config_dir)
+        await hass.async_start()
+        snapshots = InkbirdSnapshots(hass)
+        await snapshots.async_load()
+        snapshots.async_update(reached)
+        # Saving is delayed, stopping writes it.
+        await hass.async_stop()
+
+    async def restore() -> tuple[InkbirdIamT1Device, InkbirdIamT1Device]:
+        hass = HomeAssistant(config_dir)
+        snapshots = InkbirdSnapshots(hass)
+        await snapshots.async_load()
+        # As stored in the config entry
+        entry_device = InkbirdIamT1Device(address=ADDRESS, model="IAM-T2", sw_version="1.1")
+        unknown = InkbirdIamT1Device(address="AA:BB:CC:DD:EE:01")
+        restored = snapshots.restore(entry_device), snapshots.restore(unknown)
+        assert restored[1] is unknown
+        await hass.async_stop(force=True)
+        return restored
+
+    asyncio.run(save())
+    restored, _ = asyncio.run(restore())
+    assert restored.sampling_interval == SAMPLING_INTERVAL.FIVE
+    assert restored.temperature_unit == TEMPERATURE_UNIT.CELSIUS
+    assert restored.reading(READING.CO2) == reached.reading(READING.CO2)
+    assert restored.updated[READING.CO2] == reached.updated[READING.CO2]
+    # The config entry stays authoritative for what identifies the device.
+    assert (restored.model, restored.sw_version) == ("IAM-T2", "1.1")
+
+
+def test_removed_snapshot_is_not_restored():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        snapshots = InkbirdSnapshots(hass)
+        await snapshots.async_load()
+        snapshots.async_update(_reached())
+        snapshots.async_remove(ADDRESS)
+        # Removing an unknown device is harmless.
+        snapshots.async_remove("AA:BB:CC:DD:EE:01")
+        device = InkbirdIamT1Device(address=ADDRESS)
+        assert snapshots.restore(device) is device
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
+
+
+def test_restored_state_is_kept_while_out_of_range():
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        client = SimulatedBleakClient(address, device=InkbirdSimulatedDevice(address), connect_delay=0, **kwargs)
+        client.reachable = False
+        return client
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0))
+        restored = _reached()
+        coordinator = InkbirdCoordinator(hass, logger, "inkbird", restored, hub, client_factory=client_factory)
+        # Doesn't wait for the device.
+        coordinator.async_start()
+        await asyncio.sleep(0.05)
+        assert not coordinator.is_connected
+        assert coordinator.metrics.reconnects >= 1
+        await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+        return restored, coordinator.data
+
+    restored, data = asyncio.run(run())
+    assert data is restored
+    assert data.sampling_interval == SAMPLING_INTERVAL.FIVE
+    assert data.reading(READING.CO2) is not None
+
+
+def test_devices_starting_together_connect_apart():
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        return SimulatedBleakClient(address, device=InkbirdSimulatedDevice(address), sensor_period=0.01,
+                                    connect_delay=0, **kwargs)
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        logger = logging.getLogger("inkbird.test")
+        hub = InkbirdHub(hass, logger, InkbirdScheduler(hass, logger, adapter_resolver=lambda _: "test", startup_stagger=0.2))
+        hub.timers = InkbirdTimerWheel(hass.loop, resolution=0.01)
+        coordinators = [
+            InkbirdCoordinator(hass, logger, "inkbird", InkbirdIamT1Device(address=address), hub,
+                               client_factory=client_factory)
+            for address in ("AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02")
+        ]
+        for coordinator in coordinators:
+            coordinator.async_start()
+        await asyncio.sleep(0.1)
+        connected = [[coordinator.is_connected for coordinator in coordinators]]
+        await asyncio.sleep(0.2)
+        connected.append([coordinator.is_connected for coordinator in coordinators])
+        for coordinator in coordinators:
+            await coordinator.async_shutdown()
+        hub.async_close()
+        await hass.async_stop(force=True)
+        return connected
+
+    assert asyncio.run(run()) == [[True, False], [True, True]]
@@ -0,0 +1,79 @@
+import asyncio
+
+from inkbird_ble_custom.timers import InkbirdTimerWheel
+
+
+def test_timers_in_one_slot_fire_together():
+    fired = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        wheel = InkbirdTimerWheel(loop, resolution=0.05)
+        now = loop.time()
+        for i in range(20):
+            wheel.call_at(now + 0.01 + i * 0.001, fired.append, i)
+        wheel.call_at(now + 0.2, fired.append, "late")
+        assert len(wheel) == 21
+        await asyncio.sleep(0.12)
+        assert sorted(fired) == list(range(20))
+        assert wheel.wakeups <= 2
+        await asyncio.sleep(0.15)
+        assert fired[-1] == "late"
+        assert len(wheel) == 0
+    asyncio.run(run())
+
+
+def test_cancelled_timers_dont_fire():
+    fired = []
+
+    async def run():
+        wheel = InkbirdTimerWheel(asyncio.get_running_loop(), resolution=0.01)
+        first = wheel.call_later(0.02, fired.append, "first")
+        wheel.call_later(0.03, fired.append, "second")
+        first.cancel()
+        first.cancel()
+        assert len(wheel) == 1
+        await asyncio.sleep(0.08)
+    asyncio.run(run())
+    assert fired == ["second"]
+
+
+def test_earlier_timer_rearms():
+    fired = []
+
+    async def run():
+        wheel = InkbirdTimerWheel(asyncio.get_running_loop(), resolution=0.01)
+        wheel.call_later(10, fired.append, "later")
+        wheel.call_later(0.02, fired.append, "earlier")
+        await asyncio.sleep(0.08)
+        assert fired == ["earlier"]
+        wheel.close()
+        assert len(wheel) == 0
+    asyncio.run(run())
+
+
+def test_timer_scheduled_from_callback():
+    fired = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        wheel = InkbirdTimerWheel(loop, resolution=0.01)
+        wheel.call_later(0.01, lambda: wheel.call_later(0.01, fired.append, "rearmed"))
+        await asyncio.sleep(0.08)
+    asyncio.run(run())
+    assert fired == ["rearmed"]
+
+
+def test_sleep():
+    async def run():
+        loop = asyncio.get_running_loop()
+        wheel = InkbirdTimerWheel(loop, resolution=0.01)
+        started = loop.time()
+        await asyncio.gather(*(wheel.sleep(0.03) for _ in range(10)))
+        assert 0.03 <= loop.time() - started < 0.2
+        task = asyncio.create_task(wheel.sleep(10))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert len(wheel) == 0
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+from inkbird_ble_custom.timeseries import RECORD, InkbirdTimeSeries, Tier, as_readings, downsample
+
+_DAY = 24 * 3600
+ALL = 0b1111
+CO2 = 0b0100
+
+TIERS = (Tier(0, _DAY, 2 * _DAY), Tier(3600, 10 * _DAY, None))
+
+
+def _record(timestamp, co2, valid=ALL):
+    return (timestamp, 215, 450, co2, 1003, valid)
+
+
+def test_append_and_query(tmp_path):
+    store = InkbirdTimeSeries(tmp_path, TIERS)
+    store.write([_record(t, 400 + t // 60) for t in range(0, 3 * 3600, 60)], now=0)
+    store.write([_record(t, 400 + t // 60) for t in range(3 * 3600, 6 * 3600, 60)], now=0)
+
+    records = store.query(3600, 3600 + 600)
+
+    assert [record[0] for record in records] == list(range(3600, 4200, 60))
+    assert (tmp_path / "tier0" / "0.bin").stat().st_size == 6 * 60 * RECORD.size
+
+
+def test_insert_older_records(tmp_path):
+    store = InkbirdTimeSeries(tmp_path, TIERS)
+    store.write([_record(120, 500), _record(240, 520)], now=0)
+    # e.g. from a history dump, newest first
+    store.write([_record(180, 900, CO2), _record(60, 800, CO2), _record(120, 510)], now=0)
+
+    assert [(record[0], record[3]) for record in store.query(0, 300)] == [(60, 800), (120, 510), (180, 900), (240, 520)]
+
+
+def test_fill_skips_recorded_time(tmp_path):
+    store = InkbirdTimeSeries(tmp_path, TIERS)
+    # Recorded live from 2 h on
+    store.write([_record(t, 600) for t in range(7200, 4 * 3600, 60)], now=0)
+    # A history download of the last 4 h, stamped a few seconds off the live readings
+    history = [(t, 0, 0, 900, 0, CO2) for t in range(17, 4 * 3600, 60)]
+
+    assert store.fill(history, 60, now=0) == 120
+    # Downloading again adds nothing
+    assert store.fill([(t + 13, *rest) for t, *rest in history], 60, now=0) == 0
+
+    records = store.query(0, 4 * 3600)
+    assert len(records) == 240
+    assert {record[3] for record in records if record[0] < 7200} == {900}
+    assert {record[3] for record in records if record[0] >= 7200} == {600}
+
+
+def test_segments_age_into_coarser_tier(tmp_path):
+    store = InkbirdTimeSeries(tmp_path, TIERS)
+    store.write([_record(t, 400 + (t % 3600) // 60) for t in range(0, 4 * _DAY, 60)], now=0)
+
+    store.compact(now=4 * _DAY)
+
+    # The first two days are hourly means now
+    assert sorted(path.name for path in (tmp_path / "tier0").iterdir()) == [f"{2 * _DAY}.bin", f"{3 * _DAY}.bin"]
+    records = store.query(0, 4 * _DAY)
+    assert len(records) == 48 + 2 * 24 * 60
+    assert records[0] == (0, 215, 450, round(400 + 59 / 2), 1003, ALL)
+    assert records[48][0] == 2 * _DAY
+
+
+def test_downsample_keeps_known_readings_only():
+    records = [(0, 200, 0, 400, 0, 0b0101), (60, 220, 0, 600, 0, 0b0101), (120, 0, 0, 700, 0, CO2)]
+
+    assert downsample(records, 3600) == [(0, 210, 0, 567, 0, 0b0101)]
+    assert as_readings([(0, 210, 0, 567, 0, 0b0101)]) == [{"timestamp": 0, "temperature": 21.0, "co2": 567}]
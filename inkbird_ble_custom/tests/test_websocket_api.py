@@ -0,0 +1,129 @@
+import asyncio
+import tempfile
+from typing import Any
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from conftest import load_integration
+
+load_integration()
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from inkbird import websocket_api
+from inkbird.const import SIGNAL_READINGS
+from inkbird.inkbird_ble_custom.parser import READING, InkbirdIamT1Device
+from inkbird.inkbird_ble_custom.simulator import InkbirdSimulatedDevice
+
+FIRST = "AA:BB:CC:DD:EE:01"
+SECOND = "AA:BB:CC:DD:EE:02"
+
+
+class _Connection:
+    """The parts of ActiveConnection the subscription uses, keeping what was sent."""
+
+    def __init__(self):
+        self.subscriptions: dict[int, Any] = {}
+        self.results: list[int] = []
+        self.events: list[dict[str, Any]] = []
+
+    def send_result(self, msg_id: int, result: Any = None) -> None:
+        self.results.append(msg_id)
+
+    def send_message(self, message: dict[str, Any]) -> None:
+        assert message["id"] == 1
+        self.events.append(message["event"])
+
+    def readings(self) -> list[list[list[Any]]]:
+        return [event["readings"] for event in self.events if "readings" in event]
+
+
+def _device(address: str) -> InkbirdIamT1Device:
+    device = InkbirdIamT1Device(address=address)
+    device.update(InkbirdSimulatedDevice(address).sensor_frame())
+    return device
+
+
+def _subscribe(hass: HomeAssistant, **msg: Any) -> _Connection:
+    connection = _Connection()
+    websocket_api.ws_subscribe_readings(hass, connection, {"id": 1, "window": 1.0, **msg})
+    return connection
+
+
+def test_readings_are_batched_per_window():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        connection = _subscribe(hass, window=0.05)
+        first, second = _device(FIRST), _device(SECOND)
+        async_dispatcher_send(hass, SIGNAL_READINGS, first)
+        async_dispatcher_send(hass, SIGNAL_READINGS, second)
+        sent_right_away = connection.readings()
+        await asyncio.sleep(0.1)
+        await hass.async_stop(force=True)
+        return connection, first, sent_right_away
+
+    connection, first, sent_right_away = asyncio.run(run())
+    assert connection.results == [1]
+    assert connection.events[0] == {"fields": websocket_api.FIELDS}
+    assert sent_right_away == []
+    ((reading, other),) = connection.readings()
+    assert reading == [FIRST, round(max(first.updated), 3), *(first.reading(r) for r in READING)]
+    assert other[0] == SECOND
+    assert len(reading) == len(websocket_api.FIELDS)
+
+
+def test_only_the_selected_devices_are_sent():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        connection = _subscribe(hass, addresses=[FIRST.lower()], window=0)
+        async_dispatcher_send(hass, SIGNAL_READINGS, _device(SECOND))
+        async_dispatcher_send(hass, SIGNAL_READINGS, _device(FIRST))
+        await hass.async_stop(force=True)
+        return connection
+
+    assert [[reading[0] for reading in batch] for batch in asyncio.run(run()).readings()] == [[FIRST]]
+
+
+def test_without_window_every_reading_is_sent_right_away():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        connection = _subscribe(hass, window=0)
+        for _ in range(3):
+            async_dispatcher_send(hass, SIGNAL_READINGS, _device(FIRST))
+        await hass.async_stop(force=True)
+        return connection
+
+    assert [len(batch) for batch in asyncio.run(run()).readings()] == [1, 1, 1]
+
+
+def test_full_batch_is_sent_before_the_window_ends(monkeypatch):
+    monkeypatch.setattr(websocket_api, "MAX_BATCH", 3)
+
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        connection = _subscribe(hass, window=60)
+        for _ in range(4):
+            async_dispatcher_send(hass, SIGNAL_READINGS, _device(FIRST))
+        sent = connection.readings()
+        await hass.async_stop(force=True)
+        return sent
+
+    # The fourth reading waits for the window.
+    assert [len(batch) for batch in asyncio.run(run())] == [3]
+
+
+def test_unsubscribe_drops_the_pending_batch():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp())
+        connection = _subscribe(hass, window=0.05)
+        async_dispatcher_send(hass, SIGNAL_READINGS, _device(FIRST))
+        connection.subscriptions.pop(1)()
+        async_dispatcher_send(hass, SIGNAL_READINGS, _device(FIRST))
+        await asyncio.sleep(0.1)
+        await hass.async_stop(force=True)
+        return connection
+
+    assert asyncio.run(run()).readings() == []
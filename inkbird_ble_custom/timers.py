@@ -0,0 +1,117 @@
+"""
+Timer wheel sharing a single event loop timer between the timers of many devices.
+
+Deadlines are rounded up to the next multiple of the resolution. Timers falling into the same slot fire together,
+so the event loop is woken once per slot instead of once per timer, and at most one loop timer is armed at any time.
+Cancelled timers stay in their slot until it is due, cancelling is O(1).
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import math
+from typing import Any, Callable
+
+# Granularity of the deadlines (seconds). The connection timers of the devices are tens of seconds or longer.
+RESOLUTION = 1.0
+
+
+class InkbirdTimer:
+    __slots__ = ("_wheel", "_callback", "_args", "when", "cancelled")
+
+    def __init__(self, wheel: InkbirdTimerWheel, when: float, callback: Callable[..., Any], args: tuple):
+        self._wheel = wheel
+        self._callback = callback
+        self._args = args
+        self.when = when
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        if not self.cancelled:
+            self.cancelled = True
+            self._wheel._pending -= 1
+
+    def _run(self) -> None:
+        self.cancelled = True
+        self._callback(*self._args)
+
+
+class InkbirdTimerWheel:
+    def __init__(self, loop: asyncio.AbstractEventLoop, resolution: float = RESOLUTION):
+        """Times are in loop.time(), which is time.monotonic() on the default event loops."""
+        self._loop = loop
+        self._resolution = resolution
+        self._slots: dict[int, list[InkbirdTimer]] = {}
+        # Indices of the slots in _slots
+        self._heap: list[int] = []
+        self._handle: asyncio.TimerHandle | None = None
+        self._armed: int | None = None
+        self._pending = 0
+        # Loop wake-ups, i.e. slots that fired
+        self.wakeups = 0
+
+    def __len__(self) -> int:
+        """The timers that are neither cancelled nor fired yet."""
+        return self._pending
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> InkbirdTimer:
+        timer = InkbirdTimer(self, when, callback, args)
+        index = math.ceil(when / self._resolution)
+        slot = self._slots.get(index)
+        if slot is None:
+            slot = self._slots[index] = []
+            heapq.heappush(self._heap, index)
+        slot.append(timer)
+        self._pending += 1
+        if self._armed is None or index < self._armed:
+            self._arm(index)
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> InkbirdTimer:
+        return self.call_at(self._loop.time() + delay, callback, *args)
+
+    async def sleep(self, delay: float) -> None:
+        """asyncio.sleep on the wheel."""
+        future = self._loop.create_future()
+        timer = self.call_later(delay, _set_done, future)
+        try:
+            await future
+        finally:
+            timer.cancel()
+
+    def close(self) -> None:
+        """Cancel all timers."""
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._armed = None
+        for slot in self._slots.values():
+            for timer in slot:
+                timer.cancel()
+        self._slots.clear()
+        self._heap.clear()
+
+    def _arm(self, index: int) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed = index
+        self._handle = self._loop.call_at(index * self._resolution, self._run)
+
+    def _run(self) -> None:
+        self._handle = self._armed = None
+        self.wakeups += 1
+        now = self._loop.time()
+        while self._heap and self._heap[0] * self._resolution <= now:
+            for timer in self._slots.pop(heapq.heappop(self._heap)):
+                if not timer.cancelled:
+                    self._pending -= 1
+                    timer._run()
+        # Skip the slots that only hold cancelled timers.
+        while self._heap and not any(not timer.cancelled for timer in self._slots[self._heap[0]]):
+            del self._slots[heapq.heappop(self._heap)]
+        if self._heap and self._armed is None:
+            self._arm(self._heap[0])
+
+
+def _set_done(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
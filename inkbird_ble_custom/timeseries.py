@@ -0,0 +1,293 @@
+"""
+On-disk time series of the readings of a device.
+
+Each record has a fixed width: timestamp, the four readings in READING_SCALE units and the DEVICE_FIELD flags
+of the readings it holds. Records are kept in tiers of increasing resolution:
+
+    tier 0: every reading, for RAW_RETENTION
+    tier 1: 15 minute means
+    tier 2: hourly means, kept forever
+
+Every tier is split into segment files covering a fixed time span, sorted by time. Segments that age out of their
+tier are averaged into the next one and deleted. Reads memory map the segments and bisect them by timestamp.
+
+All methods do blocking file I/O, run them in an executor.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+import math
+import mmap
+import os
+from pathlib import Path
+import struct
+import threading
+import time
+from typing import Any, NamedTuple
+
+from .parser import DEVICE_FIELD, READING, READING_SCALE
+
+_DAY = 24 * 3600
+
+# timestamp (s), temperature, humidity, co2, pressure, valid flags, padded to 16 bytes
+RECORD = struct.Struct("<IhHHHBxxx")
+
+# (timestamp, temperature, humidity, co2, pressure, valid)
+Record = tuple[int, int, int, int, int, int]
+
+
+class Tier(NamedTuple):
+    # Seconds per record, 0 keeps every record
+    resolution: int
+    # Seconds covered by one segment file
+    segment: int
+    # Seconds a record stays in this tier, None keeps it forever
+    retention: int | None
+
+
+RAW_RETENTION = 90 * _DAY
+
+TIERS = (
+    Tier(0, 7 * _DAY, RAW_RETENTION),
+    Tier(15 * 60, 91 * _DAY, 2 * 365 * _DAY),
+    Tier(3600, 364 * _DAY, None),
+)
+
+# Aging segments are moved to the next tier at most this often (seconds).
+COMPACT_INTERVAL = _DAY
+
+_RECORD_SIZE = RECORD.size
+_TIMESTAMP = struct.Struct("<I")
+_SEGMENT_SUFFIX = ".bin"
+
+
+def _read_timestamp(buffer: Any, index: int) -> int:
+    return _TIMESTAMP.unpack_from(buffer, index * _RECORD_SIZE)[0]
+
+
+@contextmanager
+def _mapped(path: Path) -> Iterator[mmap.mmap | None]:
+    """Read-only memory map of a segment, None for an empty one."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield None
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def _bisect(buffer: Any, count: int, timestamp: int) -> int:
+    """Index of the first record at or after timestamp."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if _read_timestamp(buffer, middle) < timestamp:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def downsample(records: Iterable[Record], resolution: int) -> list[Record]:
+    """Mean of every reading per bucket of resolution seconds, stamped with the start of the bucket."""
+    buckets: dict[int, list[int]] = {}
+    for timestamp, *values, valid in records:
+        bucket = buckets.get(timestamp - timestamp % resolution)
+        if bucket is None:
+            # sums and counts per reading
+            bucket = buckets[timestamp - timestamp % resolution] = [0] * (2 * len(READING))
+        for index, value in enumerate(values):
+            if valid & (1 << index):
+                bucket[index] += value
+                bucket[len(READING) + index] += 1
+
+    downsampled = []
+    for start in sorted(buckets):
+        bucket = buckets[start]
+        values = [0] * len(READING)
+        valid = 0
+        for index in range(len(READING)):
+            count = bucket[len(READING) + index]
+            if count:
+                values[index] = round(bucket[index] / count)
+                valid |= 1 << index
+        downsampled.append((start, *values, valid))
+    return downsampled
+
+
+def as_readings(records: Iterable[Record]) -> list[dict[str, Any]]:
+    """Records in the units of InkbirdIamT1Device.reading, unknown readings are left out."""
+    readings = []
+    for timestamp, *values, valid in records:
+        reading = {"timestamp": timestamp}
+        for index, value in enumerate(values):
+            if valid & (1 << index):
+                scale = READING_SCALE[index]
+                reading[READING(index).name.lower()] = value / scale if scale != 1 else value
+        readings.append(reading)
+    return readings
+
+
+class InkbirdTimeSeries:
+    def __init__(self, directory: str | os.PathLike, tiers: tuple[Tier, ...] = TIERS):
+        self.directory = Path(directory)
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self._compacted = 0.0
+        # Last timestamp per segment file, to tell appends from inserts
+        self._last: dict[Path, int] = {}
+
+    def write(self, records: Iterable[Record], now: float | None = None) -> None:
+        """Add records, in any order, and age out old segments once in a while."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._insert(0, records)
+            if now - self._compacted >= COMPACT_INTERVAL:
+                self._compact(now)
+                self._compacted = now
+
+    def fill(self, records: Iterable[Record], resolution: float, now: float | None = None) -> int:
+        """
+        Add the co2 records that fall into gaps of the recorded co2 readings, e.g. a downloaded history overlapping
+        the readings recorded live or an earlier download. Records closer than half of resolution to a recorded
+        co2 reading are dropped. Returns the number of records added.
+        """
+        records = sorted(records)
+        if not records:
+            return 0
+        margin = resolution / 2
+        recorded = [
+            record[0]
+            for record in self.query(records[0][0] - margin, records[-1][0] + margin + 1)
+            if record[5] & DEVICE_FIELD.CO2.value
+        ]
+        gaps = []
+        for record in records:
+            index = bisect_left(recorded, record[0])
+            if index < len(recorded) and recorded[index] - record[0] <= margin:
+                continue
+            if index > 0 and record[0] - recorded[index - 1] <= margin:
+                continue
+            gaps.append(record)
+        if gaps:
+            self.write(gaps, now)
+        return len(gaps)
+
+    def query(self, start: float, end: float) -> list[Record]:
+        """
+        Records from start (inclusive) to end (exclusive), sorted by time.
+        Each time span is served from the finest tier holding it.
+        """
+        return list(RECORD.iter_unpack(self.query_buffer(start, end)))
+
+    def query_buffer(self, start: float, end: float) -> bytes:
+        """The records of query as packed RECORDs, e.g. for numpy.frombuffer."""
+        with self._lock:
+            chunks: list[bytes] = []
+            # Coarser tiers only hold the time before the finer ones begin.
+            boundary = end
+            for index in range(len(self.tiers)):
+                segments = self._segments(index)
+                if not segments:
+                    continue
+                chunks[:0] = self._read_range(segments, start, min(end, boundary))
+                first = self._first_timestamp(segments[0][1])
+                if first is not None:
+                    boundary = min(boundary, first)
+            return b"".join(chunks)
+
+    def compact(self, now: float | None = None) -> None:
+        with self._lock:
+            self._compact(time.time() if now is None else now)
+
+    def _segment_path(self, tier: int, timestamp: int) -> Path:
+        span = self.tiers[tier].segment
+        return self.directory / f"tier{tier}" / f"{timestamp - timestamp % span}{_SEGMENT_SUFFIX}"
+
+    def _segments(self, tier: int) -> list[tuple[int, Path]]:
+        """(start, path) of the segments of a tier, oldest first."""
+        directory = self.directory / f"tier{tier}"
+        if not directory.is_dir():
+            return []
+        return sorted(
+            (int(path.stem), path)
+            for path in directory.iterdir()
+            if path.suffix == _SEGMENT_SUFFIX and path.stem.isdigit()
+        )
+
+    def _insert(self, tier: int, records: Iterable[Record]) -> None:
+        by_segment: dict[Path, list[Record]] = {}
+        # One record per timestamp, the last one wins.
+        for record in sorted({record[0]: record for record in records}.values()):
+            by_segment.setdefault(self._segment_path(tier, record[0]), []).append(record)
+        for path, segment_records in by_segment.items():
+            last = self._last.get(path)
+            if last is None:
+                last = self._last_timestamp(path)
+            if last is None or segment_records[0][0] > last:
+                self._append(path, segment_records)
+            else:
+                self._merge(path, segment_records)
+            self._last[path] = max(segment_records[-1][0], last or 0)
+
+    def _append(self, path: Path, records: list[Record]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as file:
+            file.write(b"".join(RECORD.pack(*record) for record in records))
+
+    def _merge(self, path: Path, records: list[Record]) -> None:
+        """Rewrite a segment with records falling in between, the new records win on equal timestamps."""
+        merged = {record[0]: record for record in self._read(path)}
+        merged.update((record[0], record) for record in records)
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as file:
+            file.write(b"".join(RECORD.pack(*merged[timestamp]) for timestamp in sorted(merged)))
+        os.replace(temporary, path)
+
+    def _compact(self, now: float) -> None:
+        for index, tier in enumerate(self.tiers[:-1]):
+            if tier.retention is None:
+                continue
+            resolution = self.tiers[index + 1].resolution
+            for start, path in self._segments(index):
+                if start + tier.segment > now - tier.retention:
+                    break
+                self._insert(index + 1, downsample(self._read(path), resolution))
+                path.unlink()
+                self._last.pop(path, None)
+
+    def _read(self, path: Path) -> list[Record]:
+        data = path.read_bytes()
+        data = data[:len(data) - len(data) % _RECORD_SIZE]
+        return list(RECORD.iter_unpack(data))
+
+    def _read_range(self, segments: list[tuple[int, Path]], start: float, end: float) -> list[bytes]:
+        """The packed records of each segment in the range."""
+        start, end = int(start), math.ceil(end)
+        chunks: list[bytes] = []
+        for index, (segment_start, path) in enumerate(segments):
+            segment_end = segments[index + 1][0] if index + 1 < len(segments) else None
+            if segment_start >= end or (segment_end is not None and segment_end <= start):
+                continue
+            with _mapped(path) as buffer:
+                if buffer is None:
+                    continue
+                count = len(buffer) // _RECORD_SIZE
+                first = _bisect(buffer, count, start)
+                last = _bisect(buffer, count, end)
+                if last > first:
+                    chunks.append(buffer[first * _RECORD_SIZE:last * _RECORD_SIZE])
+        return chunks
+
+    def _first_timestamp(self, path: Path) -> int | None:
+        with _mapped(path) as buffer:
+            return _read_timestamp(buffer, 0) if buffer is not None and len(buffer) >= _RECORD_SIZE else None
+
+    def _last_timestamp(self, path: Path) -> int | None:
+        if not path.exists():
+            return None
+        with _mapped(path) as buffer:
+            count = 0 if buffer is None else len(buffer) // _RECORD_SIZE
+            return _read_timestamp(buffer, count - 1) if count else None
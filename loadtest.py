@@ -0,0 +1,209 @@
+"""
+Load test running simulated IAM-T1 devices against real coordinators, without any Bluetooth hardware.
+
+    python -m custom_components.inkbird.loadtest --devices 30 --adapters 2 --duration 120
+
+With --replay the devices notify the traffic of a capture file (see inkbird_ble_custom/capture.py) instead.
+
+Reports the notification-to-state latency, event loop lag, CPU time per frame and how the coordinators
+recover from dropped connections. Use it to size hosts and to catch performance regressions offline.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, MAX_CONNECTIONS_PER_ADAPTER, STARTUP_STAGGER
+from .coordinator import SENSOR_FRAME_TYPE, InkbirdCoordinator
+from .inkbird_ble_custom import DEVICE_FIELD, InkbirdIamT1Device
+from .inkbird_ble_custom.const import CHAR_WRITE_UUID, HISTORY_WRITE_DATA
+from .inkbird_ble_custom.capture import read_capture
+from .inkbird_ble_custom.simulator import InkbirdSimulatedDevice, ReplayBleakClient, SimulatedBleakClient
+from .hub import InkbirdHub
+from .scheduler import InkbirdScheduler
+
+_LOGGER = logging.getLogger(f"{DOMAIN}.loadtest")
+
+# Resolution of the event loop lag probe (seconds).
+LAG_PROBE_INTERVAL = 0.05
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+async def _async_probe_loop_lag(samples: list[float]):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        samples.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+
+
+async def _async_drop_connections(clients: list[SimulatedBleakClient], drop_rate: float):
+    """Drop each connected link with a probability of drop_rate per second."""
+    while True:
+        await asyncio.sleep(1)
+        for client in clients:
+            if client.is_connected and random.random() < drop_rate:
+                client.drop()
+
+
+async def async_run(
+    devices: int,
+    duration: float,
+    sensor_period: float,
+    adapters: int = 1,
+    slots: int = MAX_CONNECTIONS_PER_ADAPTER,
+    drop_rate: float = 0.0,
+    duty_cycle: bool = False,
+    history_samples: int = 0,
+    startup_stagger: float = 0.0,
+    replay: str | None = None,
+    speed: float | None = None,
+) -> dict[str, Any]:
+    hass = HomeAssistant(tempfile.mkdtemp())
+    if replay is not None:
+        notifications = list(read_capture(replay))
+        addresses = sorted({notification.address for notification in notifications})
+        devices = len(addresses)
+    else:
+        addresses = [f"AA:BB:CC:DD:{i // 256:02X}:{i % 256:02X}" for i in range(devices)]
+    adapter_of = {address: f"sim{i % adapters}" for i, address in enumerate(addresses)}
+    scheduler = InkbirdScheduler(hass, _LOGGER, slots, adapter_resolver=adapter_of.get, startup_stagger=startup_stagger)
+    hub = InkbirdHub(hass, _LOGGER, scheduler)
+
+    clients: list[SimulatedBleakClient] = []
+    def client_factory(address: str, **kwargs) -> SimulatedBleakClient:
+        if replay is not None:
+            client = ReplayBleakClient(address, notifications=notifications, speed=speed, **kwargs)
+        else:
+            device = InkbirdSimulatedDevice(address, history_samples=history_samples, seed=len(clients))
+            client = SimulatedBleakClient(address, device=device, sensor_period=sensor_period, **kwargs)
+        clients.append(client)
+        return client
+
+    latencies: list[float] = []
+    coordinators: list[InkbirdCoordinator] = []
+    for address in addresses:
+        device = InkbirdIamT1Device(manufacturer="INKBIRD", model="Ink@IAM-T1", address=address)
+        coordinator = InkbirdCoordinator(hass, _LOGGER, DOMAIN, device, hub, duty_cycle, client_factory)
+        client = coordinator.client
+        # The co2 reading changes with nearly every frame, so its listener sees almost every notification.
+        coordinator.async_add_listener(
+            lambda client=client: latencies.append(time.perf_counter() - client.last_notification),
+            DEVICE_FIELD.CO2,
+        )
+        coordinators.append(coordinator)
+
+    lag: list[float] = []
+    helpers = [
+        asyncio.create_task(_async_probe_loop_lag(lag)),
+        asyncio.create_task(_async_drop_connections(clients, drop_rate)),
+    ]
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    try:
+        for coordinator in coordinators:
+            coordinator.async_start()
+        # Until every device delivered its first sensor data
+        while any(SENSOR_FRAME_TYPE not in coordinator.metrics.frames for coordinator in coordinators):
+            if time.monotonic() - start > duration:
+                break
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+        first_data = time.monotonic() - start
+        if history_samples:
+            # Without a recorder the dumps are not imported, but still go through the notification path.
+            await asyncio.gather(*(
+                coordinator._async_when_connected(
+                    lambda client=coordinator.client: client.write_gatt_char(CHAR_WRITE_UUID, HISTORY_WRITE_DATA)
+                )
+                for coordinator in coordinators
+            ))
+        await asyncio.sleep(max(0, duration - (time.monotonic() - start)))
+        data_ages = [coordinator.connection_diagnostics()["seconds_since_sensor_data"] for coordinator in coordinators]
+        reconnects = sum(coordinator.metrics.reconnects for coordinator in coordinators)
+        parse_ns = sum(coordinator.metrics.parse_ns for coordinator in coordinators)
+        parsed = sum(coordinator.metrics.total_frames for coordinator in coordinators)
+        connect_latency = [coordinator.metrics.connect_latency_max for coordinator in coordinators]
+        duty_cycle_ratio = sum(coordinator.duty_cycle_ratio for coordinator in coordinators) / devices
+        timer_wakeups = hub.timers.wakeups
+    finally:
+        for task in helpers:
+            task.cancel()
+        await asyncio.gather(*(coordinator.async_shutdown() for coordinator in coordinators))
+        hub.async_close()
+        await hass.async_stop(force=True)
+    cpu = time.process_time() - cpu_start
+    elapsed = time.monotonic() - start
+
+    frames = sum(client.frames_sent for client in clients)
+    recovery = [seconds for client in clients for seconds in client.recovery_times]
+    return {
+        "devices": devices,
+        "adapters": adapters,
+        "slots_per_adapter": slots,
+        "duration_s": round(elapsed, 1),
+        "first_data_s": round(first_data, 2),
+        "frames": frames,
+        "frames_per_s": round(frames / elapsed, 1),
+        "latency_ms_p50": round(_percentile(latencies, 50) * 1000, 2),
+        "latency_ms_p95": round(_percentile(latencies, 95) * 1000, 2),
+        "latency_ms_max": round(max(latencies, default=float("nan")) * 1000, 2),
+        "loop_lag_ms_p50": round(_percentile(lag, 50) * 1000, 2),
+        "loop_lag_ms_p95": round(_percentile(lag, 95) * 1000, 2),
+        "loop_lag_ms_max": round(max(lag, default=float("nan")) * 1000, 2),
+        # Includes the simulated devices, so this is an upper bound of the integration's share.
+        "cpu_us_per_frame": round(cpu / max(frames, 1) * 1e6, 1),
+        "parse_us_per_frame": round(parse_ns / max(parsed, 1) / 1000, 2),
+        "connect_latency_s_max": round(max(connect_latency, default=float("nan")), 2),
+        "connects": sum(client.connects for client in clients),
+        "drops": sum(client.drops for client in clients),
+        "failed_attempts": reconnects,
+        "recovery_s_p50": round(_percentile(recovery, 50), 2),
+        "recovery_s_max": round(max(recovery, default=float("nan")), 2),
+        "max_data_age_s": max((age for age in data_ages if age is not None), default=None),
+        "never_updated": sum(age is None for age in data_ages),
+        "mean_duty_cycle_ratio": round(duty_cycle_ratio, 3),
+        "timer_wakeups_per_s": round(timer_wakeups / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--sensor-period", type=float, default=1.0, help="seconds between sensor frames per device")
+    parser.add_argument("--adapters", type=int, default=1)
+    parser.add_argument("--slots", type=int, default=MAX_CONNECTIONS_PER_ADAPTER, help="connection slots per adapter")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability per second of losing a link")
+    parser.add_argument("--duty-cycle", action="store_true", help="connect only for each sensor update")
+    parser.add_argument("--history-samples", type=int, default=0, help="also dump this many history samples per device")
+    parser.add_argument("--startup-stagger", type=float, default=0.0,
+                        help=f"seconds between the first connects, the integration uses {STARTUP_STAGGER}")
+    parser.add_argument("--replay", help="notify the traffic of this capture file instead of simulated data")
+    parser.add_argument("--speed", type=float, help="replay this many times as fast as captured, default as fast as possible")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    report = asyncio.run(async_run(
+        args.devices, args.duration, args.sensor_period, args.adapters, args.slots,
+        args.drop_rate, args.duty_cycle, args.history_samples, args.startup_stagger, args.replay, args.speed,
+    ))
+    width = max(len(key) for key in report)
+    for key, value in report.items():
+        print(f"{key:<{width}}  {value}")
+
+
+if __name__ == "__main__":
+    main()
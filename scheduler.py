@@ -0,0 +1,189 @@
+"""Share the connection slots of the Bluetooth adapters and proxies between all INKBIRD devices."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from logging import Logger
+import math
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable
+
+from homeassistant.components import bluetooth
+from homeassistant.core import HomeAssistant, callback
+
+from .const import MAX_CONNECTIONS_PER_ADAPTER, STARTUP_STAGGER
+
+if TYPE_CHECKING:
+    from .coordinator import InkbirdCoordinator
+
+# Upper bound of a connect/collect/disconnect window (seconds). Used to estimate the data age.
+COLLECT_WINDOW = 15
+
+UNKNOWN_ADAPTER = "unknown"
+
+
+class _Adapter:
+    """Connection slots of a single adapter or proxy and the devices it serves."""
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = slots
+        self.in_use = 0
+        self.members: set[InkbirdCoordinator] = set()
+        self.waiters: list[tuple[InkbirdCoordinator, asyncio.Future[None]]] = []
+
+    @property
+    def rotating(self) -> bool:
+        """Whether there are more devices than slots, so the devices have to take turns."""
+        return len(self.members) > self.slots
+
+
+class InkbirdScheduler:
+    """
+    Caps the number of concurrent connections per adapter.
+    As long as an adapter has a slot for each of its devices they stay connected.
+    Otherwise all of its devices take turns: they connect once per sampling interval,
+    collect the current state and disconnect again. Devices configured to be duty cycled always take turns.
+    Free slots go to the device with the stalest data.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        logger: Logger,
+        slots: int = MAX_CONNECTIONS_PER_ADAPTER,
+        adapter_resolver: Callable[[str], str | None] | None = None,
+        startup_stagger: float = STARTUP_STAGGER,
+    ):
+        """adapter_resolver maps an address to its adapter. Defaults to asking the Bluetooth integration."""
+        self.hass = hass
+        self.logger = logger
+        self._slots = slots
+        self._adapter_resolver = adapter_resolver or self._async_bluetooth_adapter
+        self._adapters: dict[str, _Adapter] = {}
+        self._membership: dict[InkbirdCoordinator, _Adapter] = {}
+        self._startup_stagger = startup_stagger
+        self._next_start = 0.0
+
+    @callback
+    def async_register(self, coordinator: InkbirdCoordinator) -> None:
+        self._async_assign(coordinator, self._adapter_name(coordinator))
+
+    @callback
+    def async_unregister(self, coordinator: InkbirdCoordinator) -> None:
+        adapter = self._membership.pop(coordinator, None)
+        if adapter is None:
+            return
+        was_rotating = adapter.rotating
+        adapter.members.discard(coordinator)
+        self._async_members_changed(adapter, was_rotating)
+
+    @callback
+    def async_startup_delay(self) -> float:
+        """Seconds a device starting now should wait, so devices starting together don't connect at once."""
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self._startup_stagger
+        return start - now
+
+    def rotating(self, coordinator: InkbirdCoordinator) -> bool:
+        """Whether the device has to disconnect after each window."""
+        if coordinator.duty_cycle:
+            return True
+        adapter = self._membership.get(coordinator)
+        return adapter is not None and adapter.rotating
+
+    def worst_case_data_age(self, coordinator: InkbirdCoordinator) -> float | None:
+        """Estimate how old the data of a device can get (seconds). None if the device isn't registered."""
+        adapter = self._membership.get(coordinator)
+        if adapter is None:
+            return None
+        interval = coordinator.sampling_seconds
+        if not adapter.rotating:
+            return interval + COLLECT_WINDOW if coordinator.duty_cycle else interval
+        rounds = math.ceil(len(adapter.members) / adapter.slots)
+        return max(interval, rounds * COLLECT_WINDOW) + COLLECT_WINDOW
+
+    @asynccontextmanager
+    async def async_slot(self, coordinator: InkbirdCoordinator) -> AsyncIterator[None]:
+        """Hold a connection slot on the adapter the device is currently reachable through."""
+        # Devices can move between adapters and proxies, e.g. when their signal changes.
+        name = self._adapter_name(coordinator)
+        if name != UNKNOWN_ADAPTER and name != self._membership[coordinator].name:
+            self._async_assign(coordinator, name)
+        adapter = self._membership[coordinator]
+        await self._async_acquire(adapter, coordinator)
+        try:
+            yield
+        finally:
+            self._release(adapter)
+
+    def _adapter_name(self, coordinator: InkbirdCoordinator) -> str:
+        name = self._adapter_resolver(coordinator.data.address)
+        if name is None:
+            return self._membership[coordinator].name if coordinator in self._membership else UNKNOWN_ADAPTER
+        return name
+
+    def _async_bluetooth_adapter(self, address: str) -> str | None:
+        ble_device = bluetooth.async_ble_device_from_address(self.hass, address, connectable=True)
+        if ble_device is None or not isinstance(ble_device.details, dict):
+            return None
+        return ble_device.details.get("source")
+
+    @callback
+    def _async_assign(self, coordinator: InkbirdCoordinator, name: str) -> None:
+        previous = self._membership.get(coordinator)
+        if previous is not None:
+            was_rotating = previous.rotating
+            previous.members.discard(coordinator)
+            self._async_members_changed(previous, was_rotating)
+
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            adapter = self._adapters[name] = _Adapter(name, self._slots)
+        was_rotating = adapter.rotating
+        adapter.members.add(coordinator)
+        self._membership[coordinator] = adapter
+        self._async_members_changed(adapter, was_rotating)
+
+    @callback
+    def _async_members_changed(self, adapter: _Adapter, was_rotating: bool) -> None:
+        if adapter.rotating == was_rotating:
+            return
+        if adapter.rotating:
+            rounds = math.ceil(len(adapter.members) / adapter.slots)
+            self.logger.info(
+                "Adapter %s serves %s devices with %s connection slots, devices take turns (%s windows per round)",
+                adapter.name, len(adapter.members), adapter.slots, rounds,
+            )
+        else:
+            self.logger.info("Adapter %s has a connection slot for each of its %s devices", adapter.name, len(adapter.members))
+        for coordinator in adapter.members:
+            coordinator.async_reschedule()
+
+    async def _async_acquire(self, adapter: _Adapter, coordinator: InkbirdCoordinator) -> None:
+        if adapter.in_use < adapter.slots and not adapter.waiters:
+            adapter.in_use += 1
+            return
+        future: asyncio.Future[None] = self.hass.loop.create_future()
+        adapter.waiters.append((coordinator, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before the cancellation.
+                self._release(adapter)
+            else:
+                adapter.waiters.remove((coordinator, future))
+            raise
+
+    def _release(self, adapter: _Adapter) -> None:
+        adapter.in_use -= 1
+        now = time.monotonic()
+        while adapter.in_use < adapter.slots and adapter.waiters:
+            stalest = max(range(len(adapter.waiters)), key=lambda i: adapter.waiters[i][0].staleness(now))
+            _, future = adapter.waiters.pop(stalest)
+            if future.done():
+                continue
+            adapter.in_use += 1
+            future.set_result(None)
@@ -1,6 +1,6 @@
 from .coordinator import InkbirdCoordinator
 
-from .inkbird_ble_custom import InkbirdIamT1Device, ALARM_MODE, SAMPLING_INTERVAL
+from .inkbird_ble_custom import InkbirdIamT1Device, ALARM_MODE, DEVICE_FIELD, SAMPLING_INTERVAL
 
 from homeassistant.components.select import SelectEntity
 from homeassistant.core import HomeAssistant
@@ -26,7 +26,7 @@ async def async_setup_entry(
 
 class InkbirdAlarmSelectEntity(CoordinatorEntity[InkbirdCoordinator], SelectEntity):
     def __init__(self, coordinator: InkbirdCoordinator, device: InkbirdIamT1Device):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=DEVICE_FIELD.ALARM_MODE)
         self._attr_name = f"{device.model} Alarm Mode"
         self._attr_unique_id = f"{device.model}_{device.address}_alarm_mode"
         self._attr_options = [mode.name for mode in ALARM_MODE]
@@ -44,7 +44,7 @@ class InkbirdAlarmSelectEntity(CoordinatorEntity[InkbirdCoordinator], SelectEnti
             
 class InkbirdSamplingIntervalSelectEntity(CoordinatorEntity[InkbirdCoordinator], SelectEntity):
     def __init__(self, coordinator: InkbirdCoordinator, device: InkbirdIamT1Device):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=DEVICE_FIELD.SAMPLING_INTERVAL)
         self._attr_name = f"{device.model} Sampling Interval"
         self._attr_unique_id = f"{device.model}_{device.address}_sampling_inteval"
         self._attr_options = [interval.name for interval in SAMPLING_INTERVAL]
@@ -1,8 +1,13 @@
 """Support for inkbird ble sensors."""
 
-from .coordinator import InkbirdCoordinator
+from collections.abc import Callable
+from dataclasses import dataclass
 
-from .inkbird_ble_custom import InkbirdIamT1Device
+from .coordinator import METRICS_CHANGED, ROLLING_CHANGED, InkbirdCoordinator
+from .inkbird_ble_custom.metrics import InkbirdDeviceMetrics
+from .inkbird_ble_custom.rolling import CO2_LEVEL, ROLLING_WINDOW, InkbirdRollingStats
+
+from .inkbird_ble_custom import DEVICE_FIELD, InkbirdIamT1Device, READING
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -11,10 +16,12 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import (
+    EntityCategory,
     PERCENTAGE,
     CONCENTRATION_PARTS_PER_MILLION,
     UnitOfTemperature,
-    UnitOfPressure
+    UnitOfPressure,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -53,6 +60,142 @@ SENSOR_DESCRIPTIONS = [
     )
 ]
 
+SENSOR_READINGS = {
+    SensorDeviceClass.TEMPERATURE:          READING.TEMPERATURE,
+    SensorDeviceClass.HUMIDITY:             READING.HUMIDITY,
+    SensorDeviceClass.CO2:                  READING.CO2,
+    SensorDeviceClass.ATMOSPHERIC_PRESSURE: READING.ATMOSPHERIC_PRESSURE,
+}
+
+@dataclass(frozen=True, kw_only=True)
+class InkbirdMetricSensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[InkbirdDeviceMetrics], float | int | None]
+
+# Disabled by default, they are meant for troubleshooting.
+METRIC_DESCRIPTIONS = [
+    InkbirdMetricSensorEntityDescription(
+        key="frames",
+        name="Frames received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.total_frames,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="unknown_frames",
+        name="Unknown frames",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.unknown_frames,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="dropped_frames",
+        name="Dropped frames",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.dropped_frames,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="corrupt_frames",
+        name="Corrupt frames",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.corrupt_frames,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="parse_time",
+        name="Mean parse time",
+        native_unit_of_measurement=UnitOfTime.MICROSECONDS,
+        suggested_display_precision=1,
+        value_fn=lambda metrics: metrics.mean_parse_us,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="connect_latency",
+        name="Connect latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=2,
+        value_fn=lambda metrics: metrics.connect_latency,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="reconnects",
+        name="Reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.reconnects,
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="uptime",
+        name="Connected time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        suggested_display_precision=0,
+        value_fn=lambda metrics: metrics.uptime(),
+    ),
+    InkbirdMetricSensorEntityDescription(
+        key="write_latency",
+        name="Write latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_display_precision=2,
+        value_fn=lambda metrics: max(metrics.write_latency.values(), default=None),
+    ),
+]
+
+@dataclass(frozen=True, kw_only=True)
+class InkbirdRollingSensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[InkbirdRollingStats], float | None]
+
+_ROLLING_LABELS = {
+    READING.TEMPERATURE:            "Temperature",
+    READING.HUMIDITY:               "Humidity",
+    READING.CO2:                    "CO2",
+    READING.ATMOSPHERIC_PRESSURE:   "Pressure",
+}
+
+def _rolling_descriptions() -> list[InkbirdRollingSensorEntityDescription]:
+    """Mean, min, max and rate of change of every reading over the last ROLLING_WINDOW."""
+    window = f"{ROLLING_WINDOW // 60} min"
+    descriptions = []
+    for base in SENSOR_DESCRIPTIONS:
+        reading = SENSOR_READINGS[base.device_class]
+        label = _ROLLING_LABELS[reading]
+        # Only the co2 mean is enabled by default.
+        for statistic, value_fn, enabled in (
+            ("mean", lambda stats, reading=reading: stats.mean(reading), reading is READING.CO2),
+            ("min", lambda stats, reading=reading: stats.min(reading), False),
+            ("max", lambda stats, reading=reading: stats.max(reading), False),
+        ):
+            descriptions.append(InkbirdRollingSensorEntityDescription(
+                key=f"{base.key}_{statistic}",
+                name=f"{label} {statistic} ({window})",
+                device_class=base.device_class,
+                native_unit_of_measurement=base.native_unit_of_measurement,
+                state_class=SensorStateClass.MEASUREMENT,
+                suggested_display_precision=1,
+                entity_registry_enabled_default=enabled,
+                value_fn=value_fn,
+            ))
+        descriptions.append(InkbirdRollingSensorEntityDescription(
+            key=f"{base.key}_rate",
+            name=f"{label} rate of change ({window})",
+            native_unit_of_measurement=f"{base.native_unit_of_measurement}/h",
+            state_class=SensorStateClass.MEASUREMENT,
+            suggested_display_precision=1,
+            entity_registry_enabled_default=False,
+            value_fn=lambda stats, reading=reading: stats.rate_per_hour(reading),
+        ))
+    descriptions.append(InkbirdRollingSensorEntityDescription(
+        key=f"{SensorDeviceClass.CO2}_above_{CO2_LEVEL}",
+        name=f"CO2 above {CO2_LEVEL} ppm ({window})",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        value_fn=lambda stats: stats.co2_above_seconds / 60,
+    ))
+    return descriptions
+
+ROLLING_DESCRIPTIONS = _rolling_descriptions()
+
+def sensor_unique_id(device: InkbirdIamT1Device, entity_description: SensorEntityDescription) -> str:
+    return f"{device.model} {device.address}_{entity_description.key}"
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: InkbirdConfigEntry,
@@ -61,6 +204,8 @@ async def async_setup_entry(
     """Set up the INKBIRD BLE sensors."""
     coordinator: InkbirdCoordinator = hass.data[DOMAIN][entry.entry_id]
     entities = [InkbirdSensorEntity(coordinator, coordinator.data, desc) for desc in SENSOR_DESCRIPTIONS]
+    entities += [InkbirdRollingSensorEntity(coordinator, coordinator.data, desc) for desc in ROLLING_DESCRIPTIONS]
+    entities += [InkbirdMetricSensorEntity(coordinator, coordinator.data, desc) for desc in METRIC_DESCRIPTIONS]
     async_add_entities(entities)
 
 
@@ -74,9 +219,11 @@ class InkbirdSensorEntity(CoordinatorEntity[InkbirdCoordinator], SensorEntity):
         entity_description: SensorEntityDescription,
     ) -> None:
         """Populate the entity with relevant data."""
-        super().__init__(coordinator)
+        self._reading = SENSOR_READINGS[entity_description.device_class]
+        # Only written when the coordinator reports this value to have changed.
+        super().__init__(coordinator, context=DEVICE_FIELD(1 << self._reading))
         self.entity_description = entity_description
-        self._attr_unique_id = f"{device.model} {device.address}_{entity_description.key}"
+        self._attr_unique_id = sensor_unique_id(device, entity_description)
 
         self._id = device.address
         self._attr_device_info = DeviceInfo(
@@ -93,10 +240,49 @@ class InkbirdSensorEntity(CoordinatorEntity[InkbirdCoordinator], SensorEntity):
         )
 
     @property
-    def native_value(self) -> float:
+    def native_value(self) -> float | None:
         """Return the value reported by the sensor."""
-        try:
-            return self.coordinator.data.sensors[self.entity_description.device_class]
-        except KeyError:
-            return None
-        
\ No newline at end of file
+        return self.coordinator.data.reading(self._reading)
+        
+
+
+class InkbirdMetricSensorEntity(CoordinatorEntity[InkbirdCoordinator], SensorEntity):
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: InkbirdMetricSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: InkbirdCoordinator,
+        device: InkbirdIamT1Device,
+        entity_description: InkbirdMetricSensorEntityDescription,
+    ) -> None:
+        super().__init__(coordinator, context=METRICS_CHANGED)
+        self.entity_description = entity_description
+        self._attr_unique_id = sensor_unique_id(device, entity_description)
+        self._attr_device_info = DeviceInfo(connections={(CONNECTION_BLUETOOTH, device.address)})
+
+    @property
+    def native_value(self) -> float | int | None:
+        return self.entity_description.value_fn(self.coordinator.metrics)
+
+
+class InkbirdRollingSensorEntity(CoordinatorEntity[InkbirdCoordinator], SensorEntity):
+    _attr_has_entity_name = True
+    entity_description: InkbirdRollingSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: InkbirdCoordinator,
+        device: InkbirdIamT1Device,
+        entity_description: InkbirdRollingSensorEntityDescription,
+    ) -> None:
+        super().__init__(coordinator, context=ROLLING_CHANGED)
+        self.entity_description = entity_description
+        self._attr_unique_id = sensor_unique_id(device, entity_description)
+        self._attr_device_info = DeviceInfo(connections={(CONNECTION_BLUETOOTH, device.address)})
+
+    @property
+    def native_value(self) -> float | None:
+        return self.entity_description.value_fn(self.coordinator.rolling)
@@ -0,0 +1,273 @@
+"""Services of the INKBIRD integration."""
+import asyncio
+from collections.abc import Callable, Coroutine
+import cProfile
+import logging
+import pstats
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_RECORDINGS, DOMAIN
+from .coordinator import InkbirdCoordinator
+from .inkbird_ble_custom.analytics import CO2_LEVELS
+from .inkbird_ble_custom.capture import InkbirdCapture
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PROFILE_NOTIFICATIONS = "profile_notifications"
+SERVICE_STOP_PROFILE_NOTIFICATIONS = "stop_profile_notifications"
+SERVICE_GET_READINGS = "get_readings"
+SERVICE_CAPTURE_NOTIFICATIONS = "capture_notifications"
+SERVICE_STOP_CAPTURE_NOTIFICATIONS = "stop_capture_notifications"
+SERVICE_CO2_ANALYTICS = "co2_analytics"
+
+ATTR_ADDRESS = "address"
+ATTR_DURATION = "duration"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LEVELS = "levels"
+
+# The captured notifications are appended to the file this often while capturing (seconds).
+CAPTURE_FLUSH_INTERVAL = 10
+
+PROFILE_NOTIFICATIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ADDRESS): cv.string,
+        vol.Optional(ATTR_DURATION, default=60): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+    }
+)
+
+CAPTURE_NOTIFICATIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ADDRESS): cv.string,
+        vol.Optional(ATTR_DURATION, default=600): vol.All(vol.Coerce(int), vol.Range(min=1, max=86400)),
+    }
+)
+
+STOP_RECORDING_SCHEMA = vol.Schema({})
+
+GET_READINGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ADDRESS): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+CO2_ANALYTICS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ADDRESS): cv.string,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_LEVELS, default=list(CO2_LEVELS)): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(int), vol.Range(min=400, max=5000))]
+        ),
+    }
+)
+
+
+def _coordinators(hass: HomeAssistant, address: str | None) -> list[InkbirdCoordinator]:
+    coordinators: list[InkbirdCoordinator] = list(hass.data.get(DOMAIN, {}).values())
+    if address is not None:
+        coordinators = [c for c in coordinators if c.data.address.upper() == address.upper()]
+    if not coordinators:
+        raise ServiceValidationError(f"No INKBIRD device {address or ''} set up")
+    return coordinators
+
+
+def _dump_stats(profiler: cProfile.Profile, path: str) -> list[str]:
+    profiler.dump_stats(path)
+    # Nothing was profiled if the profiling was stopped before the first notification.
+    if not profiler.stats:
+        return []
+    stats = pstats.Stats(profiler).sort_stats(pstats.SortKey.CUMULATIVE)
+    # sort_stats only orders fcn_list, stats keeps the order the functions were profiled in.
+    top = []
+    for func in stats.fcn_list[:10]:
+        _, calls, _, cumulative, _ = stats.stats[func]
+        top.append(f"{pstats.func_std_string(func)}: {calls} calls, {cumulative * 1000:.3f} ms")
+    return top
+
+
+def _async_start_recording(
+    hass: HomeAssistant, service: str, record: Callable[[asyncio.Event], Coroutine[Any, Any, dict[str, Any]]]
+) -> None:
+    """Run a recording in the background until it expires or is stopped by its stop service."""
+    recordings: dict[str, tuple[asyncio.Task, asyncio.Event]] = hass.data.setdefault(DATA_RECORDINGS, {})
+    if service in recordings:
+        raise ServiceValidationError(f"{service} is already running, stop it first")
+    stop = asyncio.Event()
+    task = hass.async_create_background_task(record(stop), f"{DOMAIN} {service}")
+    recordings[service] = (task, stop)
+    task.add_done_callback(lambda _: recordings.pop(service, None))
+
+
+async def _async_stop_recording(hass: HomeAssistant, service: str) -> ServiceResponse:
+    """Stop a running recording and return its result."""
+    recording = hass.data.get(DATA_RECORDINGS, {}).get(service)
+    if recording is None:
+        raise ServiceValidationError(f"{service} is not running")
+    task, stop = recording
+    stop.set()
+    return await task
+
+
+async def _async_wait(stop: asyncio.Event, timeout: float) -> bool:
+    """Wait for the timeout, returns whether stop was set before."""
+    try:
+        async with asyncio.timeout(timeout):
+            await stop.wait()
+    except TimeoutError:
+        return False
+    return True
+
+
+async def _async_profile_notifications(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Start profiling the notification handling of the devices for a while."""
+    coordinators = _coordinators(hass, call.data.get(ATTR_ADDRESS))
+    path = hass.config.path(f"{DOMAIN}_notifications_{int(time.time())}.prof")
+
+    async def record(stop: asyncio.Event) -> dict[str, Any]:
+        profiler = cProfile.Profile()
+        for coordinator in coordinators:
+            coordinator.profiler = profiler
+        try:
+            await _async_wait(stop, call.data[ATTR_DURATION])
+        finally:
+            for coordinator in coordinators:
+                coordinator.profiler = None
+        top = await hass.async_add_executor_job(_dump_stats, profiler, path)
+        _LOGGER.info("Notification profile written to %s", path)
+        return {
+            "path": path,
+            "frames": {c.data.address: c.metrics.total_frames for c in coordinators},
+            "top": top,
+        }
+
+    _async_start_recording(hass, SERVICE_PROFILE_NOTIFICATIONS, record)
+    return {"path": path}
+
+
+async def _async_capture_notifications(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Start recording the raw notifications of the devices for a while, to replay them offline."""
+    coordinators = _coordinators(hass, call.data.get(ATTR_ADDRESS))
+    path = hass.config.path(f"{DOMAIN}_capture_{int(time.time())}.bin")
+
+    async def record(stop: asyncio.Event) -> dict[str, Any]:
+        capture = InkbirdCapture(path)
+        for coordinator in coordinators:
+            coordinator.capture = capture
+        deadline = time.monotonic() + call.data[ATTR_DURATION]
+        try:
+            while (remaining := deadline - time.monotonic()) > 0:
+                if await _async_wait(stop, min(remaining, CAPTURE_FLUSH_INTERVAL)):
+                    break
+                await hass.async_add_executor_job(capture.flush)
+        finally:
+            for coordinator in coordinators:
+                coordinator.capture = None
+            await hass.async_add_executor_job(capture.flush)
+        _LOGGER.info("%d notifications captured to %s", capture.notifications, path)
+        return {"path": path, "notifications": capture.notifications}
+
+    _async_start_recording(hass, SERVICE_CAPTURE_NOTIFICATIONS, record)
+    return {"path": path}
+
+
+async def _async_get_readings(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Recorded readings of a device, straight from its time series."""
+    coordinator = _coordinators(hass, call.data[ATTR_ADDRESS])[0]
+    start = dt_util.as_utc(call.data[ATTR_START])
+    end = dt_util.as_utc(call.data.get(ATTR_END) or dt_util.utcnow())
+    if end <= start:
+        raise ServiceValidationError("end must be after start")
+    readings = await coordinator.async_get_readings(start.timestamp(), end.timestamp())
+    for reading in readings:
+        reading["timestamp"] = dt_util.utc_from_timestamp(reading["timestamp"]).isoformat()
+    return {"readings": readings}
+
+
+async def _async_co2_analytics(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Co2 exposure analytics of every matching device, computed over its recorded readings."""
+    start = dt_util.as_utc(call.data[ATTR_START])
+    end = dt_util.as_utc(call.data.get(ATTR_END) or dt_util.utcnow())
+    if end <= start:
+        raise ServiceValidationError("end must be after start")
+    # Days are local days.
+    time_zone = dt_util.get_default_time_zone()
+    coordinators = _coordinators(hass, call.data.get(ATTR_ADDRESS))
+    results = await asyncio.gather(*(
+        coordinator.async_co2_analytics(start.timestamp(), end.timestamp(), call.data[ATTR_LEVELS], time_zone)
+        for coordinator in coordinators
+    ))
+    return {coordinator.data.address: result for coordinator, result in zip(coordinators, results)}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    async def profile_notifications(call: ServiceCall) -> ServiceResponse:
+        return await _async_profile_notifications(hass, call)
+
+    async def stop_profile_notifications(call: ServiceCall) -> ServiceResponse:
+        return await _async_stop_recording(hass, SERVICE_PROFILE_NOTIFICATIONS)
+
+    async def capture_notifications(call: ServiceCall) -> ServiceResponse:
+        return await _async_capture_notifications(hass, call)
+
+    async def stop_capture_notifications(call: ServiceCall) -> ServiceResponse:
+        return await _async_stop_recording(hass, SERVICE_CAPTURE_NOTIFICATIONS)
+
+    async def get_readings(call: ServiceCall) -> ServiceResponse:
+        return await _async_get_readings(hass, call)
+
+    async def co2_analytics(call: ServiceCall) -> ServiceResponse:
+        return await _async_co2_analytics(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE_NOTIFICATIONS,
+        profile_notifications,
+        schema=PROFILE_NOTIFICATIONS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_PROFILE_NOTIFICATIONS,
+        stop_profile_notifications,
+        schema=STOP_RECORDING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CAPTURE_NOTIFICATIONS,
+        capture_notifications,
+        schema=CAPTURE_NOTIFICATIONS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_CAPTURE_NOTIFICATIONS,
+        stop_capture_notifications,
+        schema=STOP_RECORDING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_READINGS,
+        get_readings,
+        schema=GET_READINGS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CO2_ANALYTICS,
+        co2_analytics,
+        schema=CO2_ANALYTICS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
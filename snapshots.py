@@ -0,0 +1,46 @@
+"""Persisted last known state of the devices."""
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import SNAPSHOT_SAVE_DELAY, SNAPSHOT_STORAGE_KEY, SNAPSHOT_STORAGE_VERSION
+from .inkbird_ble_custom import InkbirdIamT1Device
+
+
+class InkbirdSnapshots:
+    """InkbirdIamT1Device.as_dict of every device by address, shared by all config entries in one file."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store: Store[dict[str, dict[str, Any]]] = Store(hass, SNAPSHOT_STORAGE_VERSION, SNAPSHOT_STORAGE_KEY)
+        self._snapshots: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        self._snapshots = await self._store.async_load() or {}
+
+    def restore(self, device: InkbirdIamT1Device) -> InkbirdIamT1Device:
+        """The last known state of the device, or the device itself if there is none."""
+        snapshot = self._snapshots.get(device.address)
+        if snapshot is None:
+            return device
+        restored = InkbirdIamT1Device.from_dict(snapshot)
+        # The config entry stays authoritative for what identifies the device.
+        restored.manufacturer = device.manufacturer or restored.manufacturer
+        restored.sw_version = device.sw_version or restored.sw_version
+        restored.model = device.model or restored.model
+        restored.address = device.address
+        return restored
+
+    @callback
+    def async_update(self, device: InkbirdIamT1Device) -> None:
+        self._snapshots[device.address] = device.as_dict()
+        self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def async_remove(self, address: str) -> None:
+        if self._snapshots.pop(address, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        return self._snapshots
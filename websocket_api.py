@@ -0,0 +1,86 @@
+"""
+Websocket subscription to the readings of the devices, without going through entity states and the recorder.
+
+    {"id": 1, "type": "inkbird/subscribe_readings", "addresses": ["AA:BB:CC:DD:EE:FF"], "window": 1}
+
+Every sensor update is pushed, in batches collected for up to window seconds. The first event names the fields
+of each reading, the following ones hold the readings as lists in that order:
+
+    {"fields": ["address", "timestamp", "temperature", "humidity", "co2", "atmospheric_pressure"]}
+    {"readings": [["AA:BB:CC:DD:EE:FF", 1700000000.123, 21.5, 45.2, 812, 1013], ...]}
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, SIGNAL_READINGS
+from .inkbird_ble_custom import InkbirdIamT1Device, READING
+
+# A batch is sent right away once it holds this many readings.
+MAX_BATCH = 500
+
+FIELDS = ["address", "timestamp", *(reading.name.lower() for reading in READING)]
+
+
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    websocket_api.async_register_command(hass, ws_subscribe_readings)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_readings",
+        vol.Optional("addresses"): [cv.string],
+        vol.Optional("window", default=1.0): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+    }
+)
+@callback
+def ws_subscribe_readings(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Push the readings of the selected devices, all of them if no addresses are given."""
+    msg_id: int = msg["id"]
+    addresses = {address.upper() for address in msg["addresses"]} if "addresses" in msg else None
+    window: float = msg["window"]
+    batch: list[list[Any]] = []
+    flush_handle: asyncio.TimerHandle | None = None
+
+    @callback
+    def flush() -> None:
+        nonlocal batch, flush_handle
+        flush_handle = None
+        if batch:
+            connection.send_message(websocket_api.event_message(msg_id, {"readings": batch}))
+            batch = []
+
+    @callback
+    def on_readings(device: InkbirdIamT1Device) -> None:
+        nonlocal flush_handle
+        if addresses is not None and device.address.upper() not in addresses:
+            return
+        batch.append([device.address, round(max(device.updated), 3), *(device.reading(reading) for reading in READING)])
+        if len(batch) >= MAX_BATCH or not window:
+            if flush_handle is not None:
+                flush_handle.cancel()
+            flush()
+        elif flush_handle is None:
+            flush_handle = hass.loop.call_later(window, flush)
+
+    unsubscribe_readings = async_dispatcher_connect(hass, SIGNAL_READINGS, on_readings)
+
+    @callback
+    def unsubscribe() -> None:
+        unsubscribe_readings()
+        if flush_handle is not None:
+            flush_handle.cancel()
+
+    connection.subscriptions[msg_id] = unsubscribe
+    connection.send_result(msg_id)
+    connection.send_message(websocket_api.event_message(msg_id, {"fields": FIELDS}))